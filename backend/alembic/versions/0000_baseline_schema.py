@@ -0,0 +1,310 @@
+"""Baseline schema
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-17
+
+The schema from before the changes in 0001 and later, as create_all built
+it at boot back then. migrate.py stamps a database that predates Alembic at this
+revision only after checking that all of these tables and columns are
+there; new databases get their tables from here.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('organizations',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('activity_categories',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('color', sa.String(length=7), nullable=True),
+    sa.Column('sort_order', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('admins',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('full_name', sa.String(length=255), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_admins_email'), 'admins', ['email'], unique=True)
+    op.create_table('construction_sites',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('client_name', sa.String(length=255), nullable=True),
+    sa.Column('panel_count', sa.Integer(), nullable=True),
+    sa.Column('system_power_kw', sa.Float(), nullable=True),
+    sa.Column('installation_type', sa.String(length=100), nullable=True),
+    sa.Column('county', sa.String(length=100), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('geofence_radius', sa.Integer(), nullable=True),
+    sa.Column('work_start_time', sa.Time(), nullable=True),
+    sa.Column('work_end_time', sa.Time(), nullable=True),
+    sa.Column('max_overtime_minutes', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('roles',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('is_employee', sa.Boolean(), nullable=False),
+    sa.Column('permissions', sa.Text(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('sites',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('geofence_radius', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('activities',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('category_id', sa.String(length=36), nullable=True),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('unit_type', sa.String(length=50), nullable=False),
+    sa.Column('quantity_rules', sa.Text(), nullable=True),
+    sa.Column('sort_order', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['activity_categories.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('role_id', sa.String(length=36), nullable=False),
+    sa.Column('employee_code', sa.String(length=50), nullable=False),
+    sa.Column('pin_hash', sa.String(length=255), nullable=True),
+    sa.Column('full_name', sa.String(length=255), nullable=False),
+    sa.Column('birth_date', sa.Date(), nullable=True),
+    sa.Column('cnp', sa.String(length=13), nullable=True),
+    sa.Column('birth_place', sa.String(length=255), nullable=True),
+    sa.Column('id_card_series', sa.String(length=20), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('avatar_path', sa.String(length=500), nullable=True),
+    sa.Column('id_card_path', sa.String(length=500), nullable=True),
+    sa.Column('contract_path', sa.String(length=500), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cnp'),
+    sa.UniqueConstraint('employee_code')
+    )
+    op.create_table('site_photos',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('site_id', sa.String(length=36), nullable=False),
+    sa.Column('uploaded_by_user_id', sa.String(length=36), nullable=True),
+    sa.Column('photo_path', sa.String(length=500), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['site_id'], ['construction_sites.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['uploaded_by_user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('teams',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('team_leader_id', sa.String(length=36), nullable=False),
+    sa.Column('site_id', sa.String(length=36), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['site_id'], ['sites.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['team_leader_id'], ['users.id'], ondelete='RESTRICT'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('team_daily_compositions',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('team_id', sa.String(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('site_id', sa.String(length=36), nullable=True),
+    sa.Column('member_ids', sa.Text(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['site_id'], ['sites.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('team_members',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('team_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('joined_date', sa.Date(), nullable=False),
+    sa.Column('left_date', sa.Date(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('timesheets',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('organization_id', sa.String(length=36), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('owner_type', sa.String(length=10), nullable=False),
+    sa.Column('owner_user_id', sa.String(length=36), nullable=True),
+    sa.Column('owner_team_id', sa.String(length=36), nullable=True),
+    sa.Column('team_category', sa.String(length=10), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('note_text', sa.Text(), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by_user_id', sa.String(length=36), nullable=True),
+    sa.Column('unlocked_at', sa.DateTime(), nullable=True),
+    sa.Column('unlocked_by_user_id', sa.String(length=36), nullable=True),
+    sa.Column('unlock_reason', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['locked_by_user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['owner_team_id'], ['teams.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['owner_user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['unlocked_by_user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('timesheet_photos',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('timesheet_id', sa.String(length=36), nullable=True),
+    sa.Column('site_id', sa.String(length=36), nullable=False),
+    sa.Column('uploaded_by', sa.String(length=36), nullable=True),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('file_size', sa.Integer(), nullable=True),
+    sa.Column('thumbnail_path', sa.String(length=500), nullable=True),
+    sa.Column('uploaded_at', sa.DateTime(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['site_id'], ['construction_sites.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['timesheet_id'], ['timesheets.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['uploaded_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('timesheet_segments',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('timesheet_id', sa.String(length=36), nullable=False),
+    sa.Column('site_id', sa.String(length=36), nullable=False),
+    sa.Column('check_in_time', sa.DateTime(), nullable=False),
+    sa.Column('break_start_time', sa.DateTime(), nullable=True),
+    sa.Column('break_end_time', sa.DateTime(), nullable=True),
+    sa.Column('check_out_time', sa.DateTime(), nullable=True),
+    sa.Column('segment_note', sa.Text(), nullable=True),
+    sa.Column('check_in_latitude', sa.Float(), nullable=True),
+    sa.Column('check_in_longitude', sa.Float(), nullable=True),
+    sa.Column('check_out_latitude', sa.Float(), nullable=True),
+    sa.Column('check_out_longitude', sa.Float(), nullable=True),
+    sa.Column('break_start_latitude', sa.Float(), nullable=True),
+    sa.Column('break_start_longitude', sa.Float(), nullable=True),
+    sa.Column('is_within_geofence', sa.Boolean(), nullable=True),
+    sa.Column('distance_from_site', sa.Float(), nullable=True),
+    sa.Column('last_ping_at', sa.DateTime(), nullable=True),
+    sa.Column('overtime_minutes', sa.Integer(), nullable=True),
+    sa.Column('overtime_approved', sa.Boolean(), nullable=True),
+    sa.Column('overtime_approved_by', sa.String(length=36), nullable=True),
+    sa.Column('overtime_approved_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['overtime_approved_by'], ['admins.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['site_id'], ['construction_sites.id'], ondelete='RESTRICT'),
+    sa.ForeignKeyConstraint(['timesheet_id'], ['timesheets.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('geofence_pauses',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('segment_id', sa.String(length=36), nullable=False),
+    sa.Column('pause_start', sa.DateTime(), nullable=False),
+    sa.Column('pause_end', sa.DateTime(), nullable=True),
+    sa.Column('distance_at_pause', sa.Float(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['segment_id'], ['timesheet_segments.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('timesheet_lines',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('timesheet_id', sa.String(length=36), nullable=False),
+    sa.Column('segment_id', sa.String(length=36), nullable=False),
+    sa.Column('activity_id', sa.String(length=36), nullable=False),
+    sa.Column('quantity_numeric', sa.Numeric(precision=12, scale=4), nullable=False),
+    sa.Column('unit_type', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ondelete='RESTRICT'),
+    sa.ForeignKeyConstraint(['segment_id'], ['timesheet_segments.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['timesheet_id'], ['timesheets.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('timesheet_lines')
+    op.drop_table('geofence_pauses')
+    op.drop_table('timesheet_segments')
+    op.drop_table('timesheet_photos')
+    op.drop_table('timesheets')
+    op.drop_table('team_members')
+    op.drop_table('team_daily_compositions')
+    op.drop_table('teams')
+    op.drop_table('site_photos')
+    op.drop_table('users')
+    op.drop_table('activities')
+    op.drop_table('sites')
+    op.drop_table('roles')
+    op.drop_table('construction_sites')
+    op.drop_table('admins')
+    op.drop_table('activity_categories')
+    op.drop_table('organizations')
@@ -0,0 +1,47 @@
+"""Persisted per-segment time totals
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-17
+
+break_seconds / geofence_pause_seconds are maintained incrementally by the
+clock-in endpoints; worked_seconds is set when the segment is closed.
+Segments closed before this revision keep worked_seconds NULL (the readers
+compute those from the raw times) until they are filled with:
+
+    python scripts/backfill_segment_totals.py
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = "0000"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column("break_seconds", sa.Float(), nullable=False, server_default=sa.text("0")),
+    sa.Column("geofence_pause_seconds", sa.Float(), nullable=False, server_default=sa.text("0")),
+    sa.Column("worked_seconds", sa.Float(), nullable=True),
+]
+
+
+def _existing_columns(table: str) -> set:
+    if op.get_context().as_sql:
+        return set()  # offline (--sql): nothing to inspect, emit everything
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    # Skip columns a database already got by hand before this revision existed
+    existing = _existing_columns("timesheet_segments")
+    with op.batch_alter_table("timesheet_segments") as batch_op:
+        for column in COLUMNS:
+            if column.name not in existing:
+                batch_op.add_column(column)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("timesheet_segments") as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,95 @@
+"""Daily rollup tables (see app/rollups.py)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Closed days are rolled up by the background refresh (last 14 days) and
+read from here by the stats endpoints. Fill existing history with:
+
+    python scripts/rebuild_rollups.py
+
+Releases that still ran create_all at boot may have created these tables
+already; they are skipped then.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables() -> set:
+    if op.get_context().as_sql:
+        return set()  # offline (--sql): nothing to inspect, emit everything
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    existing = _existing_tables()
+
+    if "rollup_days" not in existing:
+        op.create_table(
+            "rollup_days",
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("source_version", sa.String(length=255), nullable=False),
+            sa.Column("built_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("date"),
+        )
+
+    if "rollup_worker_days" not in existing:
+        op.create_table(
+            "rollup_worker_days",
+            sa.Column("user_id", sa.String(length=36), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("organization_id", sa.String(length=36), nullable=False),
+            sa.Column("worked_seconds", sa.Float(), nullable=False),
+            sa.Column("break_seconds", sa.Float(), nullable=False),
+            sa.Column("geofence_pause_seconds", sa.Float(), nullable=False),
+            sa.Column("overtime_seconds", sa.Float(), nullable=False),
+            sa.Column("segment_count", sa.Integer(), nullable=False),
+            sa.Column("first_check_in", sa.DateTime(), nullable=True),
+            sa.Column("last_check_out", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("user_id", "date"),
+        )
+
+    if "rollup_site_days" not in existing:
+        op.create_table(
+            "rollup_site_days",
+            sa.Column("site_id", sa.String(length=36), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("organization_id", sa.String(length=36), nullable=False),
+            sa.Column("headcount", sa.Integer(), nullable=False),
+            sa.Column("worked_seconds", sa.Float(), nullable=False),
+            sa.Column("segment_count", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["site_id"], ["construction_sites.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("site_id", "date"),
+        )
+
+    if "rollup_activity_days" not in existing:
+        op.create_table(
+            "rollup_activity_days",
+            sa.Column("activity_id", sa.String(length=36), nullable=False),
+            sa.Column("site_id", sa.String(length=36), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("organization_id", sa.String(length=36), nullable=False),
+            sa.Column("unit_type", sa.String(length=50), nullable=True),
+            sa.Column("quantity", sa.Numeric(precision=14, scale=4), nullable=False),
+            sa.ForeignKeyConstraint(["activity_id"], ["activities.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["site_id"], ["construction_sites.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("activity_id", "site_id", "date"),
+        )
+
+    for table in ("rollup_worker_days", "rollup_site_days", "rollup_activity_days"):
+        op.create_index(f"ix_{table}_org_date", table, ["organization_id", "date"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    for table in ("rollup_activity_days", "rollup_site_days", "rollup_worker_days", "rollup_days"):
+        op.drop_table(table)
@@ -0,0 +1,53 @@
+"""Append-only shift event log (see app/shift_events.py)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Written by the clock-in, break, geofence and activity endpoints and the
+auto clock-out sweeper; read by /api/admin/notifications/feed by id.
+Seed it from existing segments with:
+
+    python scripts/backfill_shift_events.py
+
+Skipped if a release that ran create_all at boot already created it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables() -> set:
+    if op.get_context().as_sql:
+        return set()  # offline (--sql): nothing to inspect, emit everything
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    if "shift_events" not in _existing_tables():
+        op.create_table(
+            "shift_events",
+            # BIGSERIAL on PostgreSQL, INTEGER PRIMARY KEY (rowid) on SQLite
+            sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), autoincrement=True, nullable=False),
+            sa.Column("organization_id", sa.String(length=36), nullable=False),
+            sa.Column("user_id", sa.String(length=36), nullable=False),
+            sa.Column("type", sa.String(length=30), nullable=False),
+            sa.Column("occurred_at", sa.DateTime(), nullable=False),
+            sa.Column("segment_id", sa.String(length=36), nullable=True),
+            sa.Column("site_id", sa.String(length=36), nullable=True),
+            sa.Column("detail", sa.String(length=255), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["site_id"], ["construction_sites.id"], ondelete="SET NULL"),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    op.create_index("ix_shift_events_org_id", "shift_events", ["organization_id", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("shift_events")
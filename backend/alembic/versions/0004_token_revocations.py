@@ -0,0 +1,41 @@
+"""Access-token revocation list (see app/revocations.py)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+Written when a user is deactivated or changes role; every web worker syncs
+it into memory so token claims can be trusted without a DB lookup. Rows
+older than the access-token lifetime are pruned by the sync.
+
+Skipped if a release that ran create_all at boot already created it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables() -> set:
+    if op.get_context().as_sql:
+        return set()  # offline (--sql): nothing to inspect, emit everything
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    if "token_revocations" not in _existing_tables():
+        op.create_table(
+            "token_revocations",
+            sa.Column("user_id", sa.String(length=36), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), nullable=False),
+            sa.Column("reason", sa.String(length=30), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("user_id"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("token_revocations")
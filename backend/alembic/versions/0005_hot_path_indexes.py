@@ -0,0 +1,65 @@
+"""Indexes for the hot query shapes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+Composite and partial indexes matching how the app filters:
+
+  timesheets          (owner_user_id, date, status)   worker's day, history, clock-in
+                      (date, owner_type)              dashboards, rollups, live views
+  timesheet_segments  (timesheet_id, check_out_time)  segments of a timesheet
+                      (timesheet_id) WHERE open       active shift, registry load, sweeper
+  timesheet_lines     (timesheet_id)                  activities of a timesheet
+  geofence_pauses     (segment_id, pause_end)         (already created by add_geofence_pauses.sql)
+                      (segment_id) WHERE open         the open pause of a segment
+  site_photos         (site_id, created_at)           newest photos of a site
+
+The same indexes are declared on the models, so databases built by
+create_all before migrations may already have them: every index is
+created IF NOT EXISTS. On PostgreSQL they are built CONCURRENTLY (outside
+a transaction) so the tables stay writable during the deploy. A concurrent
+build that fails leaves an INVALID index behind; drop it before running
+the upgrade again.
+
+scripts/check_query_plans.py verifies the planner uses them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+OPEN_SEGMENT = sa.text("check_out_time IS NULL")
+OPEN_PAUSE = sa.text("pause_end IS NULL")
+
+# (name, table, columns, partial WHERE)
+INDEXES = [
+    ("ix_timesheets_owner_date_status", "timesheets", ["owner_user_id", "date", "status"], None),
+    ("ix_timesheets_date_owner_type", "timesheets", ["date", "owner_type"], None),
+    ("ix_timesheet_segments_timesheet_checkout", "timesheet_segments", ["timesheet_id", "check_out_time"], None),
+    ("ix_timesheet_segments_open", "timesheet_segments", ["timesheet_id"], OPEN_SEGMENT),
+    ("ix_timesheet_lines_timesheet", "timesheet_lines", ["timesheet_id"], None),
+    ("idx_geofence_pauses_active", "geofence_pauses", ["segment_id", "pause_end"], None),
+    ("ix_geofence_pauses_open", "geofence_pauses", ["segment_id"], OPEN_PAUSE),
+    ("ix_site_photos_site_created", "site_photos", ["site_id", "created_at"], None),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, if_not_exists=True,
+                postgresql_concurrently=True, postgresql_where=where, sqlite_where=where,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            if name == "idx_geofence_pauses_active":
+                continue  # belongs to add_geofence_pauses.sql
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
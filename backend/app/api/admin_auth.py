@@ -10,6 +10,7 @@ import os
 from app.database import get_db
 from app.models import Admin
 from app.config import settings
+from app import data_version, principal_cache
 
 router = APIRouter()
 
@@ -84,13 +85,14 @@ def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends
     except JWTError:
         raise credentials_exception
     
-    admin = db.query(Admin).filter(Admin.id == admin_id).first()
+    admin = principal_cache.get_admin(db, admin_id)
     if admin is None:
         raise credentials_exception
     
     if not admin.is_active:
         raise HTTPException(status_code=400, detail="Inactive admin account")
     
+    data_version.track(db, admin.organization_id)
     return admin
 
 
@@ -0,0 +1,93 @@
+"""
+Admin API endpoints for background Excel exports (see app/export_jobs.py)
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from pydantic import BaseModel
+from datetime import date
+
+from app.database import get_db
+from app.models import Admin
+from app.api.admin_auth import get_current_admin
+from app.api.timesheets import timesheet_export_range
+from app import export_jobs
+from app.storage import read_file
+
+router = APIRouter(prefix="/admin/exports", tags=["admin-exports"])
+
+
+class ExportJobCreate(BaseModel):
+    kind: Literal["timesheets", "report"]
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    employee_id: Optional[str] = None
+    site_id: Optional[str] = None
+
+
+def _job_for_admin(job_id: str, admin: Admin) -> export_jobs.ExportJob:
+    job = export_jobs.get_job(job_id)
+    if not job or job.organization_id != admin.organization_id:
+        raise HTTPException(status_code=404, detail="Exportul nu a fost găsit")
+    return job
+
+
+@router.post("/")
+def create_export(
+    data: ExportJobCreate,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Start a background export; returns the job to poll"""
+    try:
+        if data.kind == "timesheets":
+            start, end = timesheet_export_range(data.date_from, data.date_to)
+            params = {"date_from": start.isoformat(), "date_to": end.isoformat(), "site_id": data.site_id}
+        else:
+            for value in (data.date_from, data.date_to):
+                if value:
+                    date.fromisoformat(value)
+            params = {"date_from": data.date_from, "date_to": data.date_to,
+                      "employee_id": data.employee_id, "site_id": data.site_id}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dată invalidă (format așteptat: AAAA-LL-ZZ)")
+
+    version = export_jobs.data_version(db, params["date_from"], params["date_to"])
+    try:
+        job = export_jobs.enqueue(data.kind, params, current_admin.organization_id, version)
+    except export_jobs.ExportQueueFull:
+        raise HTTPException(status_code=429, detail="Prea multe exporturi în lucru. Încercați din nou în câteva minute.")
+    return job.to_dict()
+
+
+@router.get("/{job_id}")
+def get_export(
+    job_id: str,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Export job status and progress"""
+    return _job_for_admin(job_id, current_admin).to_dict()
+
+
+@router.get("/{job_id}/download")
+def download_export(
+    job_id: str,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Download a finished export"""
+    job = _job_for_admin(job_id, current_admin)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Exportul nu este gata")
+    try:
+        content = read_file(job.path)
+    except Exception:
+        raise HTTPException(status_code=410, detail="Exportul a expirat. Generați-l din nou.")
+
+    params = job.params
+    filename = f"pontaje_{params.get('date_from') or 'all'}_{params.get('date_to') or 'all'}.xlsx"
+    return Response(
+        content,
+        media_type=export_jobs.XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
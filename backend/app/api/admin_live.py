@@ -0,0 +1,107 @@
+"""
+Admin live monitoring stream (Server-Sent Events, see app/live_bus.py)
+
+GET /api/admin/live/stream sends
+
+  event: snapshot   the active-workers payload for today (on connect, after a
+                    check-in or activity, and when data or time moved on)
+  event: worker     a status delta: worker_id, status, is_on_break,
+                    is_outside_geofence and the event that caused it
+
+plus a keepalive comment every KEEPALIVE_SECONDS. Snapshots are shared per
+organization and data version, so hundreds of open dashboards cost one
+query batch per change, not one per tab.
+"""
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db, SessionLocal
+from app.models import Admin
+from app.api.admin_auth import get_current_admin
+from app.api.timesheets import build_active_workers
+from app.timezone import today_ro
+from app import data_version, live_bus
+
+router = APIRouter(prefix="/admin/live", tags=["admin-live"])
+
+KEEPALIVE_SECONDS = 15
+SNAPSHOT_EVENTS = ("check_in", "activity_added")  # new rows / activity lists: resend the snapshot
+
+_snapshots: Dict[Optional[str], Tuple[str, dict]] = {}  # organization_id -> (key, payload)
+_snapshot_locks: Dict[Optional[str], asyncio.Lock] = {}
+
+
+def _snapshot_key(organization_id: Optional[str]) -> str:
+    return f"{data_version.version(organization_id)}:{today_ro()}:{data_version.live_bucket()}"
+
+
+def _build_snapshot(organization_id: Optional[str]) -> dict:
+    db = SessionLocal()
+    try:
+        return build_active_workers(db, None, organization_id)
+    finally:
+        db.close()
+
+
+async def snapshot(organization_id: Optional[str]) -> Tuple[str, dict]:
+    """Today's active-workers payload, built once per organization and key"""
+    lock = _snapshot_locks.setdefault(organization_id, asyncio.Lock())
+    async with lock:
+        key = _snapshot_key(organization_id)  # read before loading (see data_version.conditional)
+        cached = _snapshots.get(organization_id)
+        if cached and cached[0] == key:
+            return cached
+        payload = await run_in_threadpool(_build_snapshot, organization_id)
+        live_bus.seed_flags(organization_id, payload["active_workers"])
+        _snapshots[organization_id] = (key, payload)
+        return key, payload
+
+
+@router.get("/stream")
+async def live_stream(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Live worker status for the admin dashboards (replaces 30 s polling)"""
+    org_id = current_admin.organization_id
+    db.close()  # auth only: don't hold a pooled connection for the life of the stream
+    sub = live_bus.subscribe(org_id)
+
+    async def events():
+        try:
+            sent_key, payload = await snapshot(org_id)
+            yield live_bus.sse("snapshot", payload)
+            while not await request.is_disconnected():
+                try:
+                    delta = await asyncio.wait_for(sub.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Quiet period: refresh hours / GPS loss if the snapshot moved on
+                    if _snapshot_key(org_id) != sent_key:
+                        sent_key, payload = await snapshot(org_id)
+                        yield live_bus.sse("snapshot", payload)
+                    else:
+                        yield ": keepalive\n\n"
+                    continue
+
+                if sub.stale or delta["event"]["type"] in SNAPSHOT_EVENTS:
+                    # Deltas were dropped (slow client) or the row itself changed
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    sub.stale = False
+                    sent_key, payload = await snapshot(org_id)
+                    yield live_bus.sse("snapshot", payload)
+                else:
+                    yield live_bus.sse("worker", delta)
+        finally:
+            live_bus.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # no proxy buffering
+    })
@@ -0,0 +1,36 @@
+"""
+Admin API endpoint for per-request SQL metrics (see app/instrumentation.py)
+"""
+from fastapi import APIRouter, Depends, Query
+
+from app.models import Admin
+from app.api.admin_auth import get_current_admin
+from app import instrumentation
+
+router = APIRouter(prefix="/admin/metrics", tags=["admin-metrics"])
+
+
+@router.get("/requests")
+def get_request_metrics(
+    limit: int = Query(50, ge=1, le=instrumentation.RING_SIZE),
+    n_plus_one: bool = Query(False, description="Doar cererile suspecte de N+1"),
+    path: str = Query(None, description="Filtrează după prefixul căii"),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Most recent requests that hit the database, newest first"""
+    records = []
+    for stats in reversed(instrumentation.recent_requests()):
+        if path and not stats.path.startswith(path):
+            continue
+        entry = stats.to_dict()
+        if n_plus_one and not entry["n_plus_one"]:
+            continue
+        records.append(entry)
+        if len(records) >= limit:
+            break
+
+    return {
+        "requests": records,
+        "n_plus_one_threshold": instrumentation.N_PLUS_ONE_THRESHOLD,
+        "buffer_size": instrumentation.RING_SIZE
+    }
@@ -0,0 +1,72 @@
+"""
+Admin API endpoint for workers-on-site headcount over time (see app/occupancy.py)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Literal, Optional
+
+from app.database import get_db
+from app.models import Admin, ConstructionSite, Team
+from app.api.admin_auth import get_current_admin
+from app.timezone import today_ro
+from app import occupancy
+
+router = APIRouter(prefix="/admin/occupancy", tags=["admin-occupancy"])
+
+MAX_RANGE_DAYS = 31
+
+
+@router.get("")
+def get_occupancy(
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    site_id: Optional[str] = Query(None),
+    resolution: int = Query(60, description="Minute: 60, 15 sau 5"),
+    group_by: Optional[Literal["site", "team"]] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Workers counted at each sample time (breaks and geofence pauses excluded)"""
+    if resolution not in occupancy.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="Rezoluție invalidă (60, 15 sau 5 minute)")
+    try:
+        end = date.fromisoformat(date_to) if date_to else today_ro()
+        start = date.fromisoformat(date_from) if date_from else end
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dată invalidă (format așteptat: AAAA-LL-ZZ)")
+    if start > end:
+        raise HTTPException(status_code=400, detail="Data de început este după data de sfârșit")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Intervalul maxim este de {MAX_RANGE_DAYS} de zile")
+
+    intervals = occupancy.load_intervals(db, start, end, current_admin.organization_id, site_id)
+    samples = occupancy.sample_times(start, end, resolution)
+    total = occupancy.headcount(intervals, samples)
+
+    groups = []
+    if group_by == "site":
+        by_site = occupancy.headcount(intervals, samples, intervals.site_ids)
+        names = dict(db.query(ConstructionSite.id, ConstructionSite.name).filter(
+            ConstructionSite.id.in_(list(by_site))
+        ).all()) if by_site else {}
+        groups = [{"id": key, "name": names.get(key, "—"), "counts": counts.tolist()}
+                  for key, counts in by_site.items()]
+    elif group_by == "team":
+        teams = occupancy.user_teams(db, intervals.user_ids)
+        by_team = occupancy.headcount(intervals, samples, [teams.get(u) for u in intervals.user_ids])
+        team_ids = [key for key in by_team if key]
+        names = dict(db.query(Team.id, Team.name).filter(Team.id.in_(team_ids)).all()) if team_ids else {}
+        groups = [{"id": key, "name": names.get(key, "—") if key else "Fără echipă", "counts": counts.tolist()}
+                  for key, counts in by_team.items()]
+    groups.sort(key=lambda g: -max(g["counts"], default=0))
+
+    return {
+        "date_from": start.isoformat(),
+        "date_to": end.isoformat(),
+        "resolution": resolution,
+        "times": [t.isoformat() for t in samples],
+        "total": total.tolist(),
+        "peak": int(total.max()) if len(total) else 0,
+        "groups": groups
+    }
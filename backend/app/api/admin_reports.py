@@ -1,112 +1,155 @@
 """
-Admin Reports: Preview & Excel export for timesheets
+Admin Reports: Preview, Excel & CSV export for timesheets
 Works with actual schema: Timesheet → TimesheetSegment → ConstructionSite
 """
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
 from app.timezone import now_ro, today_ro
 from typing import Optional
+import csv
 import io
 
-from app.database import get_db
+from app.database import SessionLocal, get_db, get_async_db
 from app.models import (
     Timesheet, User, ConstructionSite, TimesheetSegment,
-    TimesheetLine, Activity, Role, GeofencePause, Admin
+    TimesheetLine, Activity, Role, Admin
 )
 from app.api.admin_auth import get_current_admin
+from app import shift_metrics
+from app.excel_export import XlsxExport, Column, xlsx_response
 
 router = APIRouter()
 
 
-def _build_report_data(db: Session, date_from=None, date_to=None, employee_id=None, site_id=None):
-    """Build report data from timesheets + segments"""
-    query = db.query(Timesheet).filter(Timesheet.owner_type == "USER")
-
+def _report_timesheets(date_from=None, date_to=None, employee_id=None, site_id=None):
+    """Filtered report timesheets, newest first: (id, date, name, code, role,
+    site of the first segment). Only timesheets with segments; the site
+    filter matches the first segment."""
+    filters = [Timesheet.owner_type == "USER"]
     if date_from:
-        query = query.filter(Timesheet.date >= datetime.strptime(date_from, "%Y-%m-%d").date())
+        filters.append(Timesheet.date >= datetime.strptime(date_from, "%Y-%m-%d").date())
     if date_to:
-        query = query.filter(Timesheet.date <= datetime.strptime(date_to, "%Y-%m-%d").date())
+        filters.append(Timesheet.date <= datetime.strptime(date_to, "%Y-%m-%d").date())
     if employee_id:
-        query = query.filter(Timesheet.owner_user_id == employee_id)
-
-    timesheets = query.order_by(Timesheet.date.desc()).all()
+        filters.append(Timesheet.owner_user_id == employee_id)
+
+    # First segment per timesheet, ranked only within the filtered timesheets.
+    # The inner join below also drops timesheets without segments.
+    first_seg = select(
+        TimesheetSegment.timesheet_id,
+        TimesheetSegment.site_id,
+        func.row_number().over(
+            partition_by=TimesheetSegment.timesheet_id,
+            order_by=TimesheetSegment.check_in_time.asc()
+        ).label("position")
+    ).join(
+        Timesheet, Timesheet.id == TimesheetSegment.timesheet_id
+    ).where(*filters).subquery()
+
+    query = select(
+        Timesheet.id, Timesheet.date, User.full_name, User.employee_code, Role.name, ConstructionSite.name
+    ).join(
+        first_seg, and_(first_seg.c.timesheet_id == Timesheet.id, first_seg.c.position == 1)
+    ).join(
+        User, User.id == Timesheet.owner_user_id
+    ).outerjoin(
+        Role, Role.id == User.role_id
+    ).outerjoin(
+        ConstructionSite, ConstructionSite.id == first_seg.c.site_id
+    ).where(*filters)
+
+    if site_id:
+        query = query.where(first_seg.c.site_id == site_id)
+
+    return query.order_by(Timesheet.date.desc(), Timesheet.id.desc())
+
+
+def _after_cursor(query, cursor: str):
+    """Keyset condition: rows strictly after `cursor` in (date desc, id desc) order"""
+    try:
+        cursor_date, cursor_id = cursor.split("_", 1)
+        cursor_date = date.fromisoformat(cursor_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor invalid")
+    return query.where(or_(
+        Timesheet.date < cursor_date,
+        and_(Timesheet.date == cursor_date, Timesheet.id < cursor_id)
+    ))
+
+
+def _build_report_data(db: Session, date_from=None, date_to=None, employee_id=None, site_id=None,
+                       limit: Optional[int] = None, cursor: Optional[str] = None):
+    """Build report data from timesheets + segments.
+
+    Runs three queries whatever the range: the filtered timesheets (with
+    worker, role and first site), their segments' times as epoch columns
+    (shift_metrics.load_segments, no segment objects) and the activity
+    lines. A fourth loads geofence pauses, only when some segment is still
+    open or was closed before the totals were stored. The related queries
+    select by the timesheet query itself, not by an id list.
+
+    Hours follow shift_metrics: geofence pause time inside the meal break
+    is subtracted once, as break. Builders before the bulk report
+    subtracted it twice, so days with such overlaps now report more worked
+    hours than they did; that is intended.
+    """
+    query = _report_timesheets(date_from, date_to, employee_id, site_id)
+    if cursor:
+        query = _after_cursor(query, cursor)
+    if limit:
+        query = query.limit(limit)
+    heads = db.execute(query).all()
+    if not heads:
+        return []
+    return _report_rows(db, heads, select(query.subquery().c.id))
+
+
+def _report_rows(db: Session, heads, ts_ids) -> list:
+    """Report rows for `heads` (rows of _report_timesheets). `ts_ids` selects
+    the same timesheets for the related queries: a subquery, or a list of ids."""
+    # Epoch columns straight from SQL: no segment objects for a whole range
+    arrays = shift_metrics.load_segments(db, TimesheetSegment.timesheet_id.in_(ts_ids))
+    spans = arrays.spans()
+    totals_by_ts = shift_metrics.compute(arrays, now_ro(), shift_metrics.load_pauses(db, arrays)).totals()
+
+    activities = {}
+    for ts_id, act_name, quantity, unit_type in db.execute(
+        select(TimesheetLine.timesheet_id, Activity.name, TimesheetLine.quantity_numeric, TimesheetLine.unit_type).join(
+            Activity, Activity.id == TimesheetLine.activity_id
+        ).where(TimesheetLine.timesheet_id.in_(ts_ids))
+    ):
+        activities.setdefault(ts_id, []).append(f"{act_name}: {quantity or 0} {unit_type or ''}")
 
     results = []
-    now = now_ro()
-
-    for ts in timesheets:
-        user = db.query(User).filter(User.id == ts.owner_user_id).first()
-        if not user:
-            continue
-
-        role = db.query(Role).filter(Role.id == user.role_id).first()
-
-        segments = db.query(TimesheetSegment).filter(
-            TimesheetSegment.timesheet_id == ts.id
-        ).order_by(TimesheetSegment.check_in_time.asc()).all()
 
-        if not segments:
+    for ts_id, ts_date, full_name, employee_code, role_name, site_name in heads:
+        span = spans.get(ts_id)
+        if not span:
             continue
 
-        first_seg = segments[0]
-        last_seg = segments[-1]
+        total_worked = totals_by_ts[ts_id].worked / 3600
+        total_break = totals_by_ts[ts_id].break_ / 3600
 
-        # Filter by site if requested
-        seg_site = db.query(ConstructionSite).filter(
-            ConstructionSite.id == first_seg.site_id
-        ).first()
-
-        if site_id and first_seg.site_id != site_id:
-            continue
-
-        # Calculate hours
-        total_worked = 0
-        total_break = 0
-        for seg in segments:
-            end_time = seg.check_out_time or now
-            seg_hours = (end_time - seg.check_in_time).total_seconds() / 3600
-
-            seg_break = 0
-            if seg.break_start_time:
-                break_end = seg.break_end_time or now
-                seg_break = (break_end - seg.break_start_time).total_seconds() / 3600
-
-            # Geofence pauses
-            geo_pauses = db.query(GeofencePause).filter(GeofencePause.segment_id == seg.id).all()
-            geo_secs = sum((
-                (gp.pause_end or now) - gp.pause_start
-            ).total_seconds() for gp in geo_pauses)
-
-            total_worked += max(0, seg_hours - seg_break - geo_secs / 3600)
-            total_break += seg_break
-
-        # Activities
-        activity_lines = db.query(TimesheetLine).filter(
-            TimesheetLine.timesheet_id == ts.id
-        ).all()
-        activities = []
-        for tl in activity_lines:
-            act = db.query(Activity).filter(Activity.id == tl.activity_id).first()
-            if act:
-                activities.append(f"{act.name}: {tl.quantity_numeric or 0} {tl.unit_type or ''}")
-
-        check_in_str = first_seg.check_in_time.strftime("%H:%M") if first_seg.check_in_time else None
-        check_out_str = last_seg.check_out_time.strftime("%H:%M") if last_seg.check_out_time else "—"
+        ts_activities = activities.get(ts_id)
+        check_in_str = span.check_in.strftime("%H:%M")
+        check_out_str = span.check_out.strftime("%H:%M") if span.check_out else "—"
 
         results.append({
-            "id": ts.id,
-            "date": ts.date.isoformat() if ts.date else None,
-            "employee_name": user.full_name,
-            "employee_code": user.employee_code,
-            "role": role.name if role else "—",
-            "site_name": seg_site.name if seg_site else "Necunoscut",
+            "id": ts_id,
+            "date": ts_date.isoformat() if ts_date else None,
+            "employee_name": full_name,
+            "employee_code": employee_code,
+            "role": role_name or "—",
+            "site_name": site_name or "Necunoscut",
             "check_in": check_in_str,
             "check_out": check_out_str,
             "break_minutes": round(total_break * 60, 0),
             "hours_worked": round(total_worked, 2),
-            "activities": "; ".join(activities) if activities else "—"
+            "activities": "; ".join(ts_activities) if ts_activities else "—"
         })
 
     return results
@@ -118,22 +161,38 @@ async def preview_timesheets(
     date_to: Optional[str] = Query(None),
     employee_id: Optional[str] = Query(None),
     site_id: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
     admin: Admin = Depends(get_current_admin)
 ):
-    """Preview timesheet data"""
-    results = _build_report_data(db, date_from, date_to, employee_id, site_id)
+    """Preview timesheet data.
+
+    Without `limit` the whole range is returned. With `limit`, one page is
+    returned plus `next_cursor` for the following page (null on the last);
+    `total` and `total_hours` then cover that page only.
+    """
+    # One extra row tells whether another page exists
+    results = await db.run_sync(
+        _build_report_data, date_from, date_to, employee_id, site_id,
+        limit + 1 if limit else None, cursor
+    )
+    next_cursor = None
+    if limit and len(results) > limit:
+        results = results[:limit]
+        next_cursor = f"{results[-1]['date']}_{results[-1]['id']}"
     total_hours = sum(r["hours_worked"] for r in results)
 
     return {
         "timesheets": results,
         "total": len(results),
-        "total_hours": round(total_hours, 2)
+        "total_hours": round(total_hours, 2),
+        "next_cursor": next_cursor
     }
 
 
 @router.get("/timesheets/excel")
-async def export_timesheets_excel(
+def export_timesheets_excel(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
     employee_id: Optional[str] = Query(None),
@@ -142,67 +201,104 @@ async def export_timesheets_excel(
     admin: Admin = Depends(get_current_admin)
 ):
     """Export timesheets to Excel"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-
-    results = _build_report_data(db, date_from, date_to, employee_id, site_id)
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Pontaje"
-
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="0f172a", end_color="1e3a5f", fill_type="solid")
-    header_align = Alignment(horizontal="center", vertical="center")
-    border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
+    export = build_report_export(db, date_from, date_to, employee_id, site_id)
+    filename = f"pontaje_{date_from or 'all'}_{date_to or 'all'}.xlsx"
+    return xlsx_response(export, filename)
 
-    headers = ["Data", "Angajat", "Cod", "Rol", "Șantier", "Intrare", "Ieșire", "Pauză (min)", "Ore Lucrate", "Activități"]
 
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=h)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_align
-        cell.border = border
+EXPORT_PAGE = 2000  # report rows built per round in the Excel export
 
-    total_hours = 0
-    for row_idx, r in enumerate(results, 2):
-        total_hours += r["hours_worked"]
-        row_data = [
-            r["date"], r["employee_name"], r["employee_code"], r["role"],
-            r["site_name"], r["check_in"], r["check_out"],
-            int(r["break_minutes"]), r["hours_worked"], r["activities"]
-        ]
-        for col, val in enumerate(row_data, 1):
-            cell = ws.cell(row=row_idx, column=col, value=val)
-            cell.border = border
-
-    # Total row
-    if results:
-        tr = len(results) + 2
-        ws.cell(row=tr, column=1, value="TOTAL").font = Font(bold=True)
-        ws.cell(row=tr, column=9, value=round(total_hours, 2)).font = Font(bold=True)
-        for col in range(1, 11):
-            ws.cell(row=tr, column=col).border = border
-            ws.cell(row=tr, column=col).fill = PatternFill(start_color="E7E6E6", fill_type="solid")
-
-    # Column widths
-    widths = {1: 12, 2: 22, 3: 12, 4: 15, 5: 25, 6: 8, 7: 8, 8: 10, 9: 10, 10: 40}
-    for col, w in widths.items():
-        ws.column_dimensions[get_column_letter(col)].width = w
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
 
-    filename = f"pontaje_{date_from or 'all'}_{date_to or 'all'}.xlsx"
+def build_report_export(db: Session, date_from=None, date_to=None, employee_id=None, site_id=None,
+                        progress=None) -> XlsxExport:
+    """Render the report export page by page (keyset cursor), so only one
+    page of rows is in memory. `progress(done, total)` is called per page."""
+    export = XlsxExport("Pontaje", [
+        Column("Data", 12), Column("Angajat", 22), Column("Cod", 12), Column("Rol", 15),
+        Column("Șantier", 25), Column("Intrare", 8), Column("Ieșire", 8),
+        Column("Pauză (min)", 10), Column("Ore Lucrate", 10), Column("Activități", 40)
+    ], header_color="0F172A")
+
+    total = 0
+    if progress:
+        total = db.execute(select(func.count()).select_from(
+            _report_timesheets(date_from, date_to, employee_id, site_id).subquery()
+        )).scalar()
+
+    total_hours = 0
+    cursor = None
+    while True:
+        page = _build_report_data(db, date_from, date_to, employee_id, site_id, EXPORT_PAGE, cursor)
+        for r in page:
+            total_hours += r["hours_worked"]
+            export.append([
+                r["date"], r["employee_name"], r["employee_code"], r["role"],
+                r["site_name"], r["check_in"], r["check_out"],
+                int(r["break_minutes"]), r["hours_worked"], r["activities"]
+            ])
+        if progress:
+            progress(export.rows, total)
+        if len(page) < EXPORT_PAGE:
+            break
+        cursor = f"{page[-1]['date']}_{page[-1]['id']}"
+
+    if export.rows:
+        export.append_total(["TOTAL", None, None, None, None, None, None, None, round(total_hours, 2), None])
+    return export
+
+
+CSV_BATCH = 1000  # timesheets per round in the CSV stream
+CSV_COLUMNS = ["data", "cod_angajat", "angajat", "rol", "santier", "intrare", "iesire",
+               "pauza_minute", "ore_lucrate", "activitati"]
+
+
+def _report_csv(date_from=None, date_to=None, employee_id=None, site_id=None):
+    """Yield the report as CSV chunks. Timesheets come from a server-side
+    cursor (yield_per) and are turned into rows CSV_BATCH at a time by _report_rows,
+    so memory stays flat whatever the range. Runs in the threadpool with its
+    own session: the request's session is closed before the body streams."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    yield out.getvalue()
+
+    db = SessionLocal()
+    try:
+        query = _report_timesheets(date_from, date_to, employee_id, site_id)
+        heads = db.execute(query.execution_options(yield_per=CSV_BATCH))
+        for batch in heads.partitions():
+            out.seek(0)
+            out.truncate()
+            for r in _report_rows(db, batch, [h[0] for h in batch]):
+                writer.writerow([
+                    r["date"], r["employee_code"], r["employee_name"], r["role"], r["site_name"],
+                    r["check_in"] or "", r["check_out"], int(r["break_minutes"]), r["hours_worked"],
+                    r["activities"]
+                ])
+            yield out.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/timesheets/csv")
+def export_timesheets_csv(
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    employee_id: Optional[str] = Query(None),
+    site_id: Optional[str] = Query(None),
+    admin: Admin = Depends(get_current_admin)
+):
+    """Stream timesheets as CSV (payroll). Same rows and hours as the report."""
+    for value in (date_from, date_to):
+        if value:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Dată invalidă (format așteptat: AAAA-LL-ZZ)")
+
+    filename = f"pontaje_{date_from or 'all'}_{date_to or 'all'}.csv"
     return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        _report_csv(date_from, date_to, employee_id, site_id),
+        media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -13,6 +13,7 @@ import logging
 from app.database import get_db
 from app.models import ConstructionSite, Admin
 from app.api.admin_auth import get_current_admin
+from app import shift_registry, site_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin/sites", tags=["admin-sites"])
@@ -251,6 +252,7 @@ def create_site(
     db.add(new_site)
     db.commit()
     db.refresh(new_site)
+    site_index.invalidate(new_site.organization_id)
     
     return site_to_dict(new_site)
 
@@ -330,6 +332,8 @@ def update_site(
     
     db.commit()
     db.refresh(site)
+    shift_registry.drop_site_shifts(site.id)
+    site_index.invalidate(site.organization_id)
     
     return site_to_dict(site)
 
@@ -350,6 +354,8 @@ def delete_site(
     # Soft delete
     site.status = "suspended"
     db.commit()
+    shift_registry.drop_site_shifts(site.id)
+    site_index.invalidate(site.organization_id)
     
     return {"message": "Site deleted successfully"}
 
@@ -0,0 +1,113 @@
+"""
+Admin API endpoints for historical statistics, read from the daily rollups
+(see app/rollups.py)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+from typing import Optional
+
+from app.database import get_db
+from app.models import Admin, User
+from app.api.admin_auth import get_current_admin
+from app.timezone import today_ro
+from app import rollups
+
+router = APIRouter(prefix="/admin/stats", tags=["admin-stats"])
+
+MAX_RANGE_DAYS = 731
+
+
+def _parse_range(date_from: Optional[str], date_to: Optional[str]):
+    """[date_from, date_to], defaulting to the last 30 days"""
+    try:
+        end = date.fromisoformat(date_to) if date_to else today_ro()
+        start = date.fromisoformat(date_from) if date_from else end - timedelta(days=29)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dată invalidă (format așteptat: AAAA-LL-ZZ)")
+    if start > end:
+        raise HTTPException(status_code=400, detail="Data de început este după data de sfârșit")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail="Intervalul maxim este de 2 ani")
+    return start, end
+
+
+@router.get("/daily")
+def get_daily_stats(
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    site_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Hours and workers per day (chart data)"""
+    start, end = _parse_range(date_from, date_to)
+    days = rollups.daily_totals(db, start, end, current_admin.organization_id, site_id)
+    return {
+        "date_from": start.isoformat(),
+        "date_to": end.isoformat(),
+        "days": [{
+            "date": d["date"].isoformat(),
+            "hours": round(d["worked_seconds"] / 3600, 2),
+            "break_hours": round(d["break_seconds"] / 3600, 2),
+            "geofence_pause_hours": round(d["geofence_pause_seconds"] / 3600, 2),
+            "overtime_hours": round(d["overtime_seconds"] / 3600, 2),
+            "workers": d["workers"],
+            "source": d["source"]
+        } for d in days],
+        "total_hours": round(sum(d["worked_seconds"] for d in days) / 3600, 2)
+    }
+
+
+@router.get("/workers")
+def get_worker_stats(
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Per-worker totals over the range, most hours first"""
+    start, end = _parse_range(date_from, date_to)
+    totals = rollups.worker_totals(db, start, end, current_admin.organization_id)
+    users = {}
+    if totals:
+        users = {u.id: u for u in db.query(User).filter(User.id.in_(list(totals))).all()}
+
+    workers = []
+    for user_id, t in totals.items():
+        user = users.get(user_id)
+        workers.append({
+            "user_id": user_id,
+            "full_name": user.full_name if user else "Necunoscut",
+            "employee_code": user.employee_code if user else None,
+            "days": t["days"],
+            "hours": round(t["worked_seconds"] / 3600, 2),
+            "break_hours": round(t["break_seconds"] / 3600, 2),
+            "geofence_pause_hours": round(t["geofence_pause_seconds"] / 3600, 2),
+            "overtime_hours": round(t["overtime_seconds"] / 3600, 2)
+        })
+    workers.sort(key=lambda w: -w["hours"])
+    return {"date_from": start.isoformat(), "date_to": end.isoformat(), "workers": workers}
+
+
+@router.get("/activities")
+def get_activity_stats(
+    date_from: Optional[str] = Query(None),
+    date_to: Optional[str] = Query(None),
+    site_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """Activity quantities over the range"""
+    start, end = _parse_range(date_from, date_to)
+    activities = rollups.activity_totals(db, start, end, current_admin.organization_id, site_id)
+    return {
+        "date_from": start.isoformat(),
+        "date_to": end.isoformat(),
+        "activities": [{
+            "activity_id": a["activity_id"],
+            "name": a["name"],
+            "unit_type": a["unit_type"],
+            "quantity": round(a["quantity"], 2)
+        } for a in activities]
+    }
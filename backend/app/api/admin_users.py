@@ -3,8 +3,7 @@ Admin API endpoints for user management
 Includes: CRUD, ID card upload with OCR (easyocr), Excel import/export, avatar extraction
 """
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import or_, func
 from typing import List, Optional
 from pydantic import BaseModel, Field
@@ -19,6 +18,8 @@ import io
 from app.database import get_db
 from app.models import User, Role, Admin
 from app.api.admin_auth import get_current_admin
+from app import shift_registry, principal_cache, revocations
+from app.excel_export import XlsxExport, Column, xlsx_response
 from app.storage import upload_file, delete_file, get_content_type
 
 router = APIRouter(prefix="/admin/users", tags=["admin-users"])
@@ -406,32 +407,17 @@ def export_users_excel(
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Export all users to Excel"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-    users = db.query(User).join(Role).all()
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Angajați"
-
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-
-    headers = ["Cod Angajat", "Nume", "Prenume", "Rol", "CNP", "Serie Buletin",
-               "Data Nașterii", "Loc Naștere", "Telefon", "Email", "Adresă", "Status"]
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = thin_border
-
-    for row_idx, user in enumerate(users, 2):
+    export = XlsxExport("Angajați", [
+        Column("Cod Angajat", 14), Column("Nume", 20), Column("Prenume", 20), Column("Rol", 18),
+        Column("CNP", 16), Column("Serie Buletin", 15), Column("Data Nașterii", 15),
+        Column("Loc Naștere", 20), Column("Telefon", 16), Column("Email", 28),
+        Column("Adresă", 40), Column("Status", 10)
+    ], header_color="4472C4")
+
+    users = db.query(User).join(Role).options(contains_eager(User.role)).yield_per(500)
+    for user in users:
         last_name, first_name = split_full_name(user.full_name)
-        row_data = [
+        export.append([
             user.employee_code, last_name, first_name,
             user.role.name if user.role else '',
             user.cnp or '', getattr(user, 'id_card_series', '') or '',
@@ -439,24 +425,10 @@ def export_users_excel(
             getattr(user, 'birth_place', '') or '',
             user.phone or '', user.email or '', user.address or '',
             'Activ' if user.is_active else 'Inactiv'
-        ]
-        for col, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_idx, column=col, value=value)
-            cell.border = thin_border
-
-    for col in ws.columns:
-        max_length = 0
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[col[0].column_letter].width = min(max_length + 3, 40)
-
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+        ])
+
     filename = f"angajati_{now_ro().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    return StreamingResponse(buffer, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                             headers={"Content-Disposition": f"attachment; filename={filename}"})
+    return xlsx_response(export, filename)
 
 
 @router.post("/import/excel")
@@ -509,6 +481,7 @@ async def import_users_excel(
     roles = {r.name.lower(): r for r in db.query(Role).all()}
     default_role = db.query(Role).first()
     created, updated, errors = 0, 0, []
+    updated_ids = []
 
     def get_val(row, key):
         if key not in header_map:
@@ -544,6 +517,7 @@ async def import_users_excel(
                 bd = get_val(row, 'birth_date')
                 if bd:
                     existing.birth_date = bd
+                updated_ids.append(existing.id)
                 updated += 1
             else:
                 new_user = User(
@@ -564,6 +538,7 @@ async def import_users_excel(
             errors.append(f"Rândul {row_idx}: {str(e)}")
 
     db.commit()
+    principal_cache.drop_users(updated_ids)
     return {"message": f"Import finalizat: {created} creați, {updated} actualizați", "created": created, "updated": updated, "errors": errors[:10]}
 
 
@@ -628,8 +603,12 @@ def update_user(user_id: str, user_data: UserUpdate, db: Session = Depends(get_d
         role = db.query(Role).filter(Role.id == user_data.role_id).first()
         if not role:
             raise HTTPException(status_code=400, detail="Invalid role ID")
+        if user.role_id != user_data.role_id:
+            revocations.revoke(db, user.id, "role_changed")  # tokens carry the old role_code
         user.role_id = user_data.role_id
 
+    if user_data.is_active is False and user.is_active:
+        revocations.revoke(db, user.id, "deactivated")
     for field in ['is_active', 'cnp', 'birth_place', 'id_card_series', 'phone', 'email', 'address']:
         val = getattr(user_data, field, None)
         if val is not None:
@@ -648,6 +627,8 @@ def update_user(user_id: str, user_data: UserUpdate, db: Session = Depends(get_d
 
     db.commit()
     db.refresh(user)
+    shift_registry.drop_shift(user.id)
+    principal_cache.drop_user(user.id)
     return build_user_response(user)
 
 
@@ -658,6 +639,7 @@ def reset_user_pin(user_id: str, pin_data: UserPinReset, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="User not found")
     user.pin_hash = hash_pin(pin_data.new_pin)
     db.commit()
+    principal_cache.drop_user(user.id)
     return {"message": "PIN resetat cu succes"}
 
 
@@ -719,6 +701,7 @@ async def upload_id_card(user_id: str, file: UploadFile = File(...), db: Session
             user.id_card_series = ocr_result["id_card_series"]
 
     db.commit()
+    principal_cache.drop_user(user.id)
 
     return {
         "message": "Carte de identitate încărcată cu succes",
@@ -748,6 +731,7 @@ async def upload_contract(user_id: str, file: UploadFile = File(...), db: Sessio
     contract_url = upload_file(content, storage_path, content_type)
     user.contract_path = contract_url
     db.commit()
+    principal_cache.drop_user(user.id)
 
     return {
         "message": "Contract încărcat cu succes",
@@ -763,6 +747,7 @@ async def delete_contract(user_id: str, db: Session = Depends(get_db), current_a
         raise HTTPException(status_code=404, detail="User not found")
     user.contract_path = None
     db.commit()
+    principal_cache.drop_user(user.id)
     return {"message": "Contract șters cu succes"}
 
 
@@ -796,7 +781,10 @@ def delete_user(user_id: str, db: Session = Depends(get_db), current_admin: Admi
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.is_active = False
+    revocations.revoke(db, user.id, "deactivated")
     db.commit()
+    shift_registry.drop_shift(user.id)
+    principal_cache.drop_user(user.id)
     return {"message": "Utilizator dezactivat cu succes"}
 
 
@@ -820,5 +808,6 @@ async def upload_avatar(
     avatar_url = upload_file(contents, f"avatars/{avatar_filename}", content_type)
     user.avatar_path = avatar_url
     db.commit()
+    principal_cache.drop_user(user.id)
     
     return {"avatar_path": avatar_url}
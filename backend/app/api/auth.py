@@ -21,7 +21,7 @@ class LoginResponse(BaseModel):
     user: dict
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+def login(request: LoginRequest, db: Session = Depends(get_db)):
     """Employee login with code + PIN"""
     
     # Find user by employee code
@@ -81,11 +81,7 @@ async def logout():
 @router.get("/me")
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current user info"""
-    role = None
-    if current_user.role_id:
-        from app.database import get_db as _get_db
-        db = next(_get_db())
-        role = db.query(Role).filter(Role.id == current_user.role_id).first()
+    role = current_user.role  # loaded with the principal (app/principal_cache.py)
     
     return {
         "id": str(current_user.id),
@@ -4,19 +4,25 @@ Clock-In/Out API endpoints with GPS tracking and geofencing
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, date, time as dtime, timedelta
-from typing import Optional
+from typing import Optional, List
 from math import radians, cos, sin, asin, sqrt
 
-from app.timezone import now_ro, today_ro
+from app.timezone import now_ro, today_ro, to_ro_naive
 
 from app.database import get_db
-from app.models import User, ConstructionSite, Timesheet, TimesheetSegment, GeofencePause, Role, TimesheetLine, Activity
+from app.models import User, ConstructionSite, Timesheet, TimesheetSegment, GeofencePause, TimesheetLine, Activity, generate_uuid
 from app.api.auth import get_current_user
+from app.auth import get_claims, Claims
+from app import shift_registry, ping_buffer, shift_metrics, shift_events
+from app.shift_registry import ActiveShift
+from app.segment_time import close_segment, refresh_totals
 
 router = APIRouter()
 
+GEOFENCE_ROLES = ("WORKER", "TEAM_LEAD")
+
 
 # Pydantic Models
 class ClockInRequest(BaseModel):
@@ -41,6 +47,16 @@ class LocationPingRequest(BaseModel):
     longitude: float
 
 
+class LocationFix(BaseModel):
+    latitude: float
+    longitude: float
+    recorded_at: datetime  # when the phone took the fix (ISO, with or without offset)
+
+
+class LocationPingBatchRequest(BaseModel):
+    fixes: List[LocationFix] = Field(..., min_length=1, max_length=2880)  # 24h of 30s pings
+
+
 class ActiveShiftResponse(BaseModel):
     timesheet_id: str
     segment_id: str
@@ -84,26 +100,87 @@ def verify_geofence(employee_lat: float, employee_lon: float,
     return distance <= radius, distance
 
 
-def get_geofence_pause_seconds(db: Session, segment_id: str) -> float:
-    """Calculate total geofence pause time for a segment in seconds"""
-    pauses = db.query(GeofencePause).filter(
-        GeofencePause.segment_id == segment_id
-    ).all()
-    total = 0.0
-    now = now_ro()
-    for p in pauses:
-        end = p.pause_end or now
-        total += (end - p.pause_start).total_seconds()
-    return total
-
+def get_active_segment(db: Session, user: User) -> Optional[TimesheetSegment]:
+    """Return the user's open segment on today's DRAFT timesheet, if any"""
+    shift = shift_registry.resolve_shift(db, user)
+    if not shift:
+        return None
+    segment = db.query(TimesheetSegment).filter(
+        TimesheetSegment.id == shift.segment_id,
+        TimesheetSegment.check_out_time == None
+    ).first()
+    if not segment:
+        # Closed elsewhere since it was registered — forget the stale entry
+        shift_registry.drop_shift(user.id)
+    return segment
+
+
+def mark_ping(db: Session, shift: ActiveShift, at: datetime) -> bool:
+    """Record last_ping_at and the closed-pause total on the still-open segment
+    (single UPDATE, no SELECT). Returns False when the segment was closed
+    elsewhere (stale registry entry)."""
+    touched = db.query(TimesheetSegment).filter(
+        TimesheetSegment.id == shift.segment_id,
+        TimesheetSegment.check_out_time == None
+    ).update({
+        "last_ping_at": at,
+        "geofence_pause_seconds": shift.closed_pause_seconds
+    }, synchronize_session=False)
+    if touched:
+        shift.last_ping_at = at
+    return touched > 0
+
+
+def apply_location_fix(db: Session, shift: ActiveShift,
+                       latitude: float, longitude: float, at: datetime):
+    """Run one GPS fix through the geofence state machine (no commit).
+    Opens or closes a GeofencePause at `at`, the time the fix was taken, and
+    mirrors the change on `shift` (a private registry copy).
+    Returns (is_within, distance, transition) where transition is
+    "PAUSED", "RESUMED" or None."""
+    distance = calculate_distance(latitude, longitude, shift.site_latitude, shift.site_longitude)
+    is_within = distance <= (shift.site_geofence_radius or 300)
+
+    if not is_within and not shift.open_pause_id:
+        # Worker left the zone — open a pause
+        new_pause = GeofencePause(
+            id=generate_uuid(),
+            segment_id=shift.segment_id,
+            pause_start=at,
+            distance_at_pause=round(distance, 1),
+            latitude=latitude,
+            longitude=longitude
+        )
+        db.add(new_pause)
+        shift.open_pause_id = new_pause.id
+        shift.open_pause_start = at
+        shift.open_pause_distance = new_pause.distance_at_pause
+        return is_within, distance, "PAUSED"
 
-def is_geofence_applicable(db: Session, user: User) -> bool:
-    """Check if geofence auto-pause applies to this user's role.
-    Only applies to WORKER and TEAM_LEAD roles."""
-    role = db.query(Role).filter(Role.id == user.role_id).first()
-    if not role:
-        return False
-    return role.code in ("WORKER", "TEAM_LEAD")
+    if is_within and shift.open_pause_id:
+        # Worker returned — close the pause
+        pause_end = max(at, shift.open_pause_start)
+        db.query(GeofencePause).filter(
+            GeofencePause.id == shift.open_pause_id
+        ).update({"pause_end": pause_end}, synchronize_session=False)
+        shift.closed_pause_seconds += (pause_end - shift.open_pause_start).total_seconds()
+        shift.open_pause_id = None
+        shift.open_pause_start = None
+        shift.open_pause_distance = None
+        return is_within, distance, "RESUMED"
+
+    return is_within, distance, None
+
+
+def record_geofence_event(db: Session, user: User, shift: ActiveShift,
+                          transition: str, distance: float, at: datetime) -> None:
+    """Log a geofence transition in the shift event log (no commit)"""
+    if transition == "PAUSED":
+        shift_events.record(db, "geofence_exit", user.organization_id, user.id, at,
+                            segment_id=shift.segment_id, site_id=shift.site_id, detail=f"{int(distance)}m")
+    else:
+        shift_events.record(db, "geofence_return", user.organization_id, user.id, at,
+                            segment_id=shift.segment_id, site_id=shift.site_id)
 
 
 # API Endpoints
@@ -111,6 +188,7 @@ def is_geofence_applicable(db: Session, user: User) -> bool:
 def clock_in(
     request: ClockInRequest,
     current_user: User = Depends(get_current_user),
+    claims: Claims = Depends(get_claims),
     db: Session = Depends(get_db)
 ):
     """Start a new work shift with GPS verification"""
@@ -230,9 +308,31 @@ def clock_in(
     )
     
     db.add(segment)
+    db.flush()
+    shift_events.record(
+        db, "check_in", current_user.organization_id, current_user.id, effective_checkin,
+        segment_id=segment.id, site_id=site.id
+    )
     db.commit()
     db.refresh(segment)
     
+    shift_registry.put_shift(ActiveShift(
+        user_id=current_user.id,
+        role_code=claims.role_code,
+        timesheet_id=active_timesheet.id,
+        date=active_timesheet.date,
+        segment_id=segment.id,
+        check_in_time=segment.check_in_time,
+        site_id=site.id,
+        site_name=site.name,
+        site_latitude=site.latitude,
+        site_longitude=site.longitude,
+        site_geofence_radius=site.geofence_radius,
+        work_start_time=site.work_start_time,
+        work_end_time=site.work_end_time,
+        max_overtime_minutes=site.max_overtime_minutes,
+    ))
+    
     return {
         "timesheet_id": active_timesheet.id,
         "segment_id": segment.id,
@@ -255,73 +355,53 @@ def clock_out(
     """End current work shift with GPS verification"""
     
     # Find active segment
-    today = today_ro()
-    active_timesheet = db.query(Timesheet).filter(
-        Timesheet.owner_user_id == current_user.id,
-        Timesheet.date == today,
-        Timesheet.status == "DRAFT"
-    ).first()
-    
-    if not active_timesheet:
-        raise HTTPException(status_code=404, detail="Nu ai o tură activă")
-    
-    active_segment = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id == active_timesheet.id,
-        TimesheetSegment.check_out_time == None
-    ).order_by(TimesheetSegment.check_in_time.desc()).first()
+    shift = shift_registry.resolve_shift(db, current_user)
+    active_segment = get_active_segment(db, current_user) if shift else None
     
     if not active_segment:
         raise HTTPException(status_code=404, detail="Nu ai o tură activă")
     
-    # End any active break
-    if active_segment.break_start_time and not active_segment.break_end_time:
-        active_segment.break_end_time = now_ro()
+    now = now_ro()
     
     # Close any active geofence pause
-    active_geo_pause = db.query(GeofencePause).filter(
-        GeofencePause.segment_id == active_segment.id,
-        GeofencePause.pause_end == None
-    ).first()
-    if active_geo_pause:
-        active_geo_pause.pause_end = now_ro()
-    
-    # Update segment with clock-out
-    active_segment.check_out_time = now_ro()
+    if shift.open_pause_id:
+        db.query(GeofencePause).filter(
+            GeofencePause.id == shift.open_pause_id
+        ).update({"pause_end": now}, synchronize_session=False)
+    active_segment.geofence_pause_seconds = shift.geofence_pause_seconds(now)
+    
+    # Update segment with clock-out (ends any active break, finalizes totals)
+    close_segment(db, active_segment, now, open_pauses=[])
     if request.latitude is not None:
         active_segment.check_out_latitude = request.latitude
     if request.longitude is not None:
         active_segment.check_out_longitude = request.longitude
     
-    # Calculate total hours
-    duration = active_segment.check_out_time - active_segment.check_in_time
-    total_hours = duration.total_seconds() / 3600
-    
-    # Calculate break hours
-    break_hours = 0
-    if active_segment.break_start_time and active_segment.break_end_time:
-        break_duration = active_segment.break_end_time - active_segment.break_start_time
-        break_hours = break_duration.total_seconds() / 3600
-    
-    # Calculate geofence pause hours
-    geofence_pause_secs = get_geofence_pause_seconds(db, active_segment.id)
-    geofence_pause_hours = geofence_pause_secs / 3600
+    total_hours = (active_segment.check_out_time - active_segment.check_in_time).total_seconds() / 3600
+    break_hours = active_segment.break_seconds / 3600
+    geofence_pause_hours = active_segment.geofence_pause_seconds / 3600
     
     # ----- OVERTIME CALCULATION -----
     overtime_minutes = 0
     overtime_warning = None
-    site = db.query(ConstructionSite).filter(ConstructionSite.id == active_segment.site_id).first()
     
-    if site and site.work_end_time:
-        schedule_end_dt = datetime.combine(today_ro(), site.work_end_time)
+    if shift.work_end_time:
+        schedule_end_dt = datetime.combine(shift.date, shift.work_end_time)
         if active_segment.check_out_time > schedule_end_dt:
             overtime_minutes = int((active_segment.check_out_time - schedule_end_dt).total_seconds() / 60)
             active_segment.overtime_minutes = overtime_minutes
             
-            max_ot = site.max_overtime_minutes or 120
+            max_ot = shift.max_overtime_minutes or 120
             if overtime_minutes > max_ot:
                 overtime_warning = f"Ai depășit limita de overtime ({max_ot} min). Orele suplimentare necesită aprobare."
     
+    shift_events.record(
+        db, "check_out", current_user.organization_id, current_user.id, active_segment.check_out_time,
+        segment_id=active_segment.id, site_id=active_segment.site_id,
+        detail=shift_events.hours_detail(active_segment.check_in_time, active_segment.check_out_time)
+    )
     db.commit()
+    shift_registry.drop_shift(current_user.id)
     
     return {
         "segment_id": active_segment.id,
@@ -329,7 +409,7 @@ def clock_out(
         "total_hours": round(total_hours, 2),
         "break_hours": round(break_hours, 2),
         "geofence_pause_hours": round(geofence_pause_hours, 2),
-        "worked_hours": round(total_hours - break_hours - geofence_pause_hours, 2),
+        "worked_hours": round(active_segment.worked_seconds / 3600, 2),
         "overtime_minutes": overtime_minutes,
         "overtime_warning": overtime_warning
     }
@@ -344,20 +424,8 @@ def start_break(
     """Start meal break"""
     
     # Find active segment
-    today = today_ro()
-    active_timesheet = db.query(Timesheet).filter(
-        Timesheet.owner_user_id == current_user.id,
-        Timesheet.date == today,
-        Timesheet.status == "DRAFT"
-    ).first()
-    
-    if not active_timesheet:
-        raise HTTPException(status_code=404, detail="Nu ai o tură activă")
-    
-    active_segment = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id == active_timesheet.id,
-        TimesheetSegment.check_out_time == None
-    ).order_by(TimesheetSegment.check_in_time.desc()).first()
+    shift = shift_registry.resolve_shift(db, current_user)
+    active_segment = get_active_segment(db, current_user) if shift else None
     
     if not active_segment:
         raise HTTPException(status_code=404, detail="Nu ai o tură activă")
@@ -369,9 +437,17 @@ def start_break(
     active_segment.break_start_time = now_ro()
     active_segment.break_start_latitude = request.latitude
     active_segment.break_start_longitude = request.longitude
+    shift_events.record(
+        db, "break_start", current_user.organization_id, current_user.id, active_segment.break_start_time,
+        segment_id=active_segment.id, site_id=active_segment.site_id
+    )
     
     db.commit()
     
+    shift.break_start_time = active_segment.break_start_time
+    shift.break_end_time = None
+    shift_registry.put_shift(shift)
+    
     return {
         "segment_id": active_segment.id,
         "break_start_time": active_segment.break_start_time
@@ -386,34 +462,31 @@ def end_break(
     """End meal break"""
     
     # Find active segment with active break
-    today = today_ro()
-    active_timesheet = db.query(Timesheet).filter(
-        Timesheet.owner_user_id == current_user.id,
-        Timesheet.date == today,
-        Timesheet.status == "DRAFT"
-    ).first()
-    
-    if not active_timesheet:
+    shift = shift_registry.resolve_shift(db, current_user)
+    if not shift:
         raise HTTPException(status_code=404, detail="Nu ai o tură activă")
     
-    active_segment = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id == active_timesheet.id,
-        TimesheetSegment.break_start_time != None,
-        TimesheetSegment.break_end_time == None
-    ).order_by(TimesheetSegment.check_in_time.desc()).first()
+    active_segment = get_active_segment(db, current_user) if shift.is_on_break else None
     
-    if not active_segment:
+    if not active_segment or not active_segment.break_start_time or active_segment.break_end_time:
         raise HTTPException(status_code=404, detail="Nu ai o pauză activă")
     
     # End break
     active_segment.break_end_time = now_ro()
+    refresh_totals(active_segment)
     
     # Calculate break duration
-    break_duration = active_segment.break_end_time - active_segment.break_start_time
-    break_minutes = break_duration.total_seconds() / 60
+    break_minutes = active_segment.break_seconds / 60
+    shift_events.record(
+        db, "break_end", current_user.organization_id, current_user.id, active_segment.break_end_time,
+        segment_id=active_segment.id, site_id=active_segment.site_id
+    )
     
     db.commit()
     
+    shift.break_end_time = active_segment.break_end_time
+    shift_registry.put_shift(shift)
+    
     return {
         "segment_id": active_segment.id,
         "break_end_time": active_segment.break_end_time,
@@ -421,196 +494,128 @@ def end_break(
     }
 
 
-@router.get("/timesheets/active-shift")
-def get_active_shift(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get current active shift if any"""
-    
-    today = today_ro()
-    active_timesheet = db.query(Timesheet).filter(
-        Timesheet.owner_user_id == current_user.id,
-        Timesheet.date == today,
-        Timesheet.status == "DRAFT"
-    ).first()
-    
-    if not active_timesheet:
-        return JSONResponse(content=None)
-    
-    active_segment = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id == active_timesheet.id,
-        TimesheetSegment.check_out_time == None
-    ).order_by(TimesheetSegment.check_in_time.desc()).first()
-    
-    if not active_segment:
-        return JSONResponse(content=None)
-    
-    site = db.query(ConstructionSite).filter(ConstructionSite.id == active_segment.site_id).first()
-    
-    # ---- AUTO-CLOSE at schedule end ----
-    now = now_ro()
-    if site and site.work_end_time:
-        schedule_end = datetime.combine(today, site.work_end_time)
-        
-        # Only auto-close if segment started BEFORE schedule end (prevents zombies)
-        if active_segment.check_in_time < schedule_end and now > schedule_end:
-            active_segment.check_out_time = schedule_end
-            
-            # Close any active break
-            if active_segment.break_start_time and not active_segment.break_end_time:
-                active_segment.break_end_time = schedule_end
-            
-            # Close any active geofence pause
-            active_geo_pause = db.query(GeofencePause).filter(
-                GeofencePause.segment_id == active_segment.id,
-                GeofencePause.pause_end == None
-            ).first()
-            if active_geo_pause:
-                active_geo_pause.pause_end = schedule_end
-            
-            db.commit()
-            return JSONResponse(content=None)  # Shift closed at schedule end
+def shift_state(shift: ActiveShift, now: datetime) -> dict:
+    """The active-shift payload: anchors (check-in, break, pauses, schedule)
+    plus the hours they add up to at `now`"""
+    today = shift.date
     
     # Calculate elapsed time
-    now = now_ro()
-    elapsed = now - active_segment.check_in_time
+    elapsed = now - shift.check_in_time
     elapsed_hours = elapsed.total_seconds() / 3600
     
     # Calculate break time
     break_hours = 0
-    if active_segment.break_start_time:
-        if active_segment.break_end_time:
-            break_duration = active_segment.break_end_time - active_segment.break_start_time
-            break_hours = break_duration.total_seconds() / 3600
-        else:
-            # Break is active
-            break_duration = now - active_segment.break_start_time
-            break_hours = break_duration.total_seconds() / 3600
+    if shift.break_start_time:
+        break_end = shift.break_end_time or now  # open break still running
+        break_hours = (break_end - shift.break_start_time).total_seconds() / 3600
     
     # Calculate geofence pause time
-    geofence_pause_secs = get_geofence_pause_seconds(db, active_segment.id)
-    geofence_pause_hours = geofence_pause_secs / 3600
-    
-    # Check if currently outside geofence
-    active_geo_pause = db.query(GeofencePause).filter(
-        GeofencePause.segment_id == active_segment.id,
-        GeofencePause.pause_end == None
-    ).first()
+    geofence_pause_hours = shift.geofence_pause_seconds(now) / 3600
     
     # Detect GPS loss: no ping in last 2 minutes
     gps_lost = False
-    if active_segment.last_ping_at:
-        since_last_ping = (now - active_segment.last_ping_at).total_seconds()
+    if shift.last_ping_at:
+        since_last_ping = (now - shift.last_ping_at).total_seconds()
         gps_lost = since_last_ping > 120  # 2 minutes
     else:
         # No pings ever received — check if more than 2 min since check-in
-        since_checkin = (now - active_segment.check_in_time).total_seconds()
+        since_checkin = (now - shift.check_in_time).total_seconds()
         gps_lost = since_checkin > 120
     
+    has_site = shift.site_name is not None
     return {
-        "timesheet_id": active_timesheet.id,
-        "segment_id": active_segment.id,
-        "site_id": active_segment.site_id,
-        "site_name": site.name if site else "Unknown",
-        "site_latitude": site.latitude if site else None,
-        "site_longitude": site.longitude if site else None,
-        "site_geofence_radius": site.geofence_radius if site else 300,
-        "check_in_time": str(active_segment.check_in_time),
-        "is_on_break": bool(active_segment.break_start_time and not active_segment.break_end_time),
-        "break_start_time": str(active_segment.break_start_time) if active_segment.break_start_time else None,
+        "timesheet_id": shift.timesheet_id,
+        "segment_id": shift.segment_id,
+        "site_id": shift.site_id,
+        "site_name": shift.site_name if has_site else "Unknown",
+        "site_latitude": shift.site_latitude,
+        "site_longitude": shift.site_longitude,
+        "site_geofence_radius": shift.site_geofence_radius if has_site else 300,
+        "check_in_time": str(shift.check_in_time),
+        "is_on_break": shift.is_on_break,
+        "break_start_time": str(shift.break_start_time) if shift.break_start_time else None,
         "elapsed_hours": round(elapsed_hours, 2),
         "break_hours": round(break_hours, 2),
         "geofence_pause_hours": round(geofence_pause_hours, 2),
-        "is_outside_geofence": bool(active_geo_pause),
+        "is_outside_geofence": bool(shift.open_pause_id),
         "gps_lost": gps_lost,
-        "last_ping_at": str(active_segment.last_ping_at) if active_segment.last_ping_at else None,
-        "geofence_pause_distance": active_geo_pause.distance_at_pause if active_geo_pause else None,
+        "last_ping_at": str(shift.last_ping_at) if shift.last_ping_at else None,
+        "geofence_pause_distance": shift.open_pause_distance if shift.open_pause_id else None,
         # Schedule info
-        "work_start_time": site.work_start_time.strftime('%H:%M') if site and site.work_start_time else None,
-        "work_end_time": site.work_end_time.strftime('%H:%M') if site and site.work_end_time else None,
-        "max_overtime_minutes": site.max_overtime_minutes if site else 120,
-        "schedule_end_datetime": str(datetime.combine(today, site.work_end_time)) if site and site.work_end_time else None,
-        "overtime_limit_datetime": str(datetime.combine(today, site.work_end_time) + timedelta(minutes=site.max_overtime_minutes or 120)) if site and site.work_end_time else None
+        "work_start_time": shift.work_start_time.strftime('%H:%M') if shift.work_start_time else None,
+        "work_end_time": shift.work_end_time.strftime('%H:%M') if shift.work_end_time else None,
+        "max_overtime_minutes": shift.max_overtime_minutes if has_site else 120,
+        "schedule_end_datetime": str(datetime.combine(today, shift.work_end_time)) if shift.work_end_time else None,
+        "overtime_limit_datetime": str(datetime.combine(today, shift.work_end_time) + timedelta(minutes=shift.max_overtime_minutes or 120)) if shift.work_end_time else None
     }
 
 
+@router.get("/timesheets/active-shift")
+def get_active_shift(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get current active shift if any (served from the shift registry)"""
+    
+    shift = shift_registry.resolve_shift(db, current_user)
+    if not shift:
+        return JSONResponse(content=None)
+    
+    # Shifts past schedule end are dropped by the registry and checked out
+    # by the background sweeper (app/sweeper.py), so this is a pure read.
+    return shift_state(shift, now_ro())
+
+
 @router.post("/timesheets/location-ping")
 def location_ping(
     request: LocationPingRequest,
     current_user: User = Depends(get_current_user),
+    claims: Claims = Depends(get_claims),
     db: Session = Depends(get_db)
 ):
     """Periodic location ping to enforce geofence auto-pause.
     Called every 30s by the frontend while a shift is active.
     If worker is >300m from site, creates a GeofencePause.
-    When they return within range, closes the pause."""
+    When they return within range, closes the pause.
+    Resolved from the shift registry: one UPDATE when nothing changes."""
     
     # Only applies to WORKER and TEAM_LEAD
-    if not is_geofence_applicable(db, current_user):
+    if claims.role_code not in GEOFENCE_ROLES:
         return {"geofence_applicable": False, "message": "Geofence nu se aplică pentru rolul tău"}
     
-    # Find active segment
-    today = today_ro()
-    active_timesheet = db.query(Timesheet).filter(
-        Timesheet.owner_user_id == current_user.id,
-        Timesheet.date == today,
-        Timesheet.status == "DRAFT"
-    ).first()
-    
-    if not active_timesheet:
-        return {"geofence_applicable": False, "message": "Nicio tură activă"}
-    
-    active_segment = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id == active_timesheet.id,
-        TimesheetSegment.check_out_time == None
-    ).order_by(TimesheetSegment.check_in_time.desc()).first()
-    
-    if not active_segment:
+    shift = shift_registry.resolve_shift(db, current_user)
+    if not shift:
         return {"geofence_applicable": False, "message": "Nicio tură activă"}
     
     # Get site coordinates
-    site = db.query(ConstructionSite).filter(ConstructionSite.id == active_segment.site_id).first()
-    if not site or not site.latitude or not site.longitude:
+    if not shift.site_latitude or not shift.site_longitude:
         return {
             "geofence_applicable": False,
             "message": "Șantierul nu are coordonate GPS configurate"
         }
     
-    # Record last ping time
-    active_segment.last_ping_at = now_ro()
-    db.commit()
-    
-    # Calculate distance
-    distance = calculate_distance(
-        request.latitude, request.longitude,
-        site.latitude, site.longitude
+    now = now_ro()
+    pause_start = shift.open_pause_start
+    is_within, distance, transition = apply_location_fix(
+        db, shift, request.latitude, request.longitude, now
     )
     
-    geofence_radius = site.geofence_radius or 300
-    is_within = distance <= geofence_radius
-    
-    # Check if there's an active geofence pause
-    active_pause = db.query(GeofencePause).filter(
-        GeofencePause.segment_id == active_segment.id,
-        GeofencePause.pause_end == None
-    ).first()
-    
-    status_changed = False
-    
-    if not is_within and not active_pause:
-        # Worker left the zone — create a pause
-        new_pause = GeofencePause(
-            segment_id=active_segment.id,
-            pause_start=now_ro(),
-            distance_at_pause=round(distance, 1),
-            latitude=request.latitude,
-            longitude=request.longitude
-        )
-        db.add(new_pause)
+    if transition:
+        # State change: write through (also detects a segment closed elsewhere)
+        if not mark_ping(db, shift, now):
+            db.rollback()
+            shift_registry.drop_shift(current_user.id)
+            return {"geofence_applicable": False, "message": "Nicio tură activă"}
+        record_geofence_event(db, current_user, shift, transition, distance, now)
         db.commit()
-        status_changed = True
-        
+    else:
+        # Plain heartbeat: no DB write, flushed in bulk by ping_buffer
+        ping_buffer.record_ping(shift.segment_id, now)
+        shift.last_ping_at = now
+    shift_registry.put_shift(shift)
+    geofence_radius = shift.site_geofence_radius or 300
+    
+    if transition == "PAUSED":
         return {
             "geofence_applicable": True,
             "is_within_geofence": False,
@@ -621,12 +626,8 @@ def location_ping(
             "message": f"Ai ieșit din raza șantierului ({int(distance)}m). Orele nu se mai numără."
         }
     
-    elif is_within and active_pause:
-        # Worker returned — close the pause
-        active_pause.pause_end = now_ro()
-        db.commit()
-        
-        pause_duration = (active_pause.pause_end - active_pause.pause_start).total_seconds()
+    elif transition == "RESUMED":
+        pause_duration = (now - pause_start).total_seconds()
         
         return {
             "geofence_applicable": True,
@@ -641,7 +642,7 @@ def location_ping(
     
     else:
         # No change
-        total_pause_secs = get_geofence_pause_seconds(db, active_segment.id)
+        total_pause_secs = shift.geofence_pause_seconds(now)
         
         return {
             "geofence_applicable": True,
@@ -655,6 +656,84 @@ def location_ping(
         }
 
 
+@router.post("/timesheets/location-ping/batch")
+def location_ping_batch(
+    request: LocationPingBatchRequest,
+    current_user: User = Depends(get_current_user),
+    claims: Claims = Depends(get_claims),
+    db: Session = Depends(get_db)
+):
+    """Replay GPS fixes buffered on the phone (e.g. after a dead zone on site).
+    Fixes are applied in time order in a single transaction, so geofence
+    pauses open and close at the real fix timestamps instead of upload time.
+    Fixes older than the last processed ping or taken before check-in are
+    skipped; fixes dated in the future (phone clock skew) are clamped to now."""
+    
+    if claims.role_code not in GEOFENCE_ROLES:
+        return {"geofence_applicable": False, "message": "Geofence nu se aplică pentru rolul tău"}
+    
+    shift = shift_registry.resolve_shift(db, current_user)
+    if not shift:
+        return {"geofence_applicable": False, "message": "Nicio tură activă"}
+    
+    if not shift.site_latitude or not shift.site_longitude:
+        return {
+            "geofence_applicable": False,
+            "message": "Șantierul nu are coordonate GPS configurate"
+        }
+    
+    now = now_ro()
+    not_before = max(shift.check_in_time, shift.last_ping_at or shift.check_in_time)
+    fixes = sorted(
+        ((to_ro_naive(f.recorded_at), f) for f in request.fixes),
+        key=lambda item: item[0]
+    )
+    
+    accepted = 0
+    transitions = []
+    is_within = shift.open_pause_id is None
+    distance = None
+    for at, fix in fixes:
+        at = min(at, now)
+        if at <= not_before:
+            continue
+        is_within, distance, transition = apply_location_fix(
+            db, shift, fix.latitude, fix.longitude, at
+        )
+        if transition:
+            transitions.append({"status": transition, "at": at, "distance": round(distance, 1)})
+        not_before = at
+        accepted += 1
+    
+    if transitions:
+        if not mark_ping(db, shift, not_before):
+            # Segment was closed elsewhere — drop the replay
+            db.rollback()
+            shift_registry.drop_shift(current_user.id)
+            return {"geofence_applicable": False, "message": "Nicio tură activă"}
+        for t in transitions:
+            record_geofence_event(db, current_user, shift, t["status"], t["distance"], t["at"])
+        db.commit()
+    elif accepted:
+        ping_buffer.record_ping(shift.segment_id, not_before)
+        shift.last_ping_at = not_before
+    shift_registry.put_shift(shift)
+    
+    return {
+        "geofence_applicable": True,
+        "accepted": accepted,
+        "skipped": len(request.fixes) - accepted,
+        "transitions": [{**t, "at": str(t["at"])} for t in transitions],
+        "is_within_geofence": is_within,
+        "distance": round(distance, 1) if distance is not None else None,
+        "geofence_radius": shift.site_geofence_radius or 300,
+        "status": "ACTIVE" if is_within else "PAUSED",
+        "status_changed": bool(transitions),
+        "total_geofence_pause_seconds": round(shift.geofence_pause_seconds(now), 0),
+        "last_ping_at": str(shift.last_ping_at) if shift.last_ping_at else None
+    }
+
+
 @router.get("/timesheets/my-today")
 def my_today_status(
     current_user: User = Depends(get_current_user),
@@ -706,20 +785,14 @@ def my_history(
     total_worked = 0
     total_break = 0
     seg_list = []
+    now = now_ro()
+    metrics = shift_metrics.metrics_for(db, segments, now)
     
-    for seg in segments:
-        if seg.check_out_time:
-            seg_hours = (seg.check_out_time - seg.check_in_time).total_seconds() / 3600
-        else:
-            seg_hours = (now_ro() - seg.check_in_time).total_seconds() / 3600
-        
-        brk = 0
-        if seg.break_start_time:
-            be = seg.break_end_time or now_ro()
-            brk = (be - seg.break_start_time).total_seconds() / 3600
-        
-        geo_pause = get_geofence_pause_seconds(db, seg.id) / 3600
-        worked = max(0, seg_hours - brk - geo_pause)
+    for i, seg in enumerate(segments):
+        times = metrics.at(i)
+        brk = times.break_ / 3600
+        geo_pause = times.geofence / 3600
+        worked = times.worked / 3600
         total_worked += worked
         total_break += brk
         
@@ -779,12 +852,12 @@ def my_dates(
 def cleanup_zombie_segments(
     target_date: str = None,
     current_user: User = Depends(get_current_user),
+    claims: Claims = Depends(get_claims),
     db: Session = Depends(get_db)
 ):
     """Delete zombie segments (< 2min duration) for a given date. Admin only."""
     # Check admin role
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or role.code not in ("ADMIN", "SITE_MANAGER"):
+    if claims.role_code not in ("ADMIN", "SITE_MANAGER"):
         raise HTTPException(status_code=403, detail="Acces interzis")
     
     d = date.fromisoformat(target_date) if target_date else today_ro()
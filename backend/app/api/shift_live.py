@@ -0,0 +1,151 @@
+"""
+Clock-in screen push channel (Server-Sent Events, see app/live_bus.py)
+
+GET /api/timesheets/active-shift/stream sends
+
+  event: shift    the active-shift payload (null when there is no open shift)
+                  on connect and after every transition of the worker's
+                  shift: clock-in/out, breaks, geofence pause/resume and the
+                  auto clock-out at schedule end
+  event: notice   {type, message, at} for geofence_exit, geofence_return,
+                  schedule_ending, long_break and auto_closed
+
+plus a keepalive comment every KEEPALIVE_SECONDS. The phone ticks its timers
+locally from the anchors in the payload (check-in, break start, pause totals);
+between transitions the server only holds the connection and wakes up for
+the scheduled notices. Location pings still go to /timesheets/location-ping.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.database import get_db, SessionLocal
+from app.models import User
+from app.api.auth import get_current_user
+from app.api.clockin import shift_state
+from app.shift_registry import ActiveShift
+from app.timezone import now_ro
+from app import shift_registry, live_bus
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+SCHEDULE_WARNING_MINUTES = 15  # notice before the auto clock-out at schedule end
+LONG_BREAK_MINUTES = 60
+
+GEOFENCE_NOTICES = {
+    "geofence_exit": "Ai ieșit din raza șantierului. Orele nu se mai numără.",
+    "geofence_return": "Ai revenit în raza șantierului. Cronometrul a repornit.",
+}
+
+
+def _reload_shift(user_id: str) -> Optional[ActiveShift]:
+    """Committed state from the DB: the registry is only updated after the
+    commit that published the event, so it may still be behind"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        return shift_registry.load_shift(db, user) if user else None
+    finally:
+        db.close()
+
+
+def _deadlines(shift: ActiveShift) -> List[Tuple[datetime, str]]:
+    """Scheduled notices of the shift as (at, type)"""
+    out = []
+    if shift.work_end_time:
+        schedule_end = datetime.combine(shift.date, shift.work_end_time)
+        if shift.check_in_time < schedule_end:
+            out.append((schedule_end - timedelta(minutes=SCHEDULE_WARNING_MINUTES), "schedule_ending"))
+            out.append((schedule_end, "auto_closed"))
+    if shift.is_on_break:
+        out.append((shift.break_start_time + timedelta(minutes=LONG_BREAK_MINUTES), "long_break"))
+    return out
+
+
+def _notice(type_: str, at, shift: Optional[ActiveShift] = None) -> dict:
+    if type_ in GEOFENCE_NOTICES:
+        message = GEOFENCE_NOTICES[type_]
+    elif type_ == "schedule_ending":
+        message = (f"Programul șantierului se încheie la {shift.work_end_time.strftime('%H:%M')}. "
+                   f"Tura se va închide automat.")
+    elif type_ == "auto_closed":
+        message = f"Tura a fost închisă automat la {at.strftime('%H:%M')} (sfârșitul programului)."
+    else:
+        message = f"Ești în pauză de peste {LONG_BREAK_MINUTES} de minute."
+    return {"type": type_, "message": message, "at": str(at)}
+
+
+def _payload(shift: Optional[ActiveShift]) -> Optional[dict]:
+    return shift_state(shift, now_ro()) if shift else None
+
+
+@router.get("/timesheets/active-shift/stream")
+async def active_shift_stream(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Live shift state for the clock-in screen (replaces active-shift polling)"""
+    user_id = current_user.id
+    sub = live_bus.subscribe(current_user.organization_id, user_id)
+    db.close()  # auth only: don't hold a pooled connection for the life of the stream
+
+    async def events():
+        try:
+            shift = shift_registry.get_shift(user_id) or await run_in_threadpool(_reload_shift, user_id)
+            yield live_bus.sse("shift", _payload(shift))
+            fired = set()  # (segment_id, type, at) already sent
+            while not await request.is_disconnected():
+                # Scheduled notices that are due; the rest bound the wait
+                now = now_ro()
+                pending = []
+                for at, type_ in (_deadlines(shift) if shift else []):
+                    key = (shift.segment_id, type_, at)
+                    if key in fired:
+                        continue
+                    if at > now:
+                        pending.append(at)
+                        continue
+                    fired.add(key)
+                    yield live_bus.sse("notice", _notice(type_, at, shift))
+                    if type_ == "auto_closed":
+                        # The registry already counts it as closed; the sweeper follows within a minute
+                        shift = None
+                        yield live_bus.sse("shift", None)
+                        pending = []
+                        break
+
+                timeout = KEEPALIVE_SECONDS
+                if pending:
+                    timeout = min(timeout, max(0.0, (min(pending) - now).total_seconds()))
+                try:
+                    delta = await asyncio.wait_for(sub.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    if timeout == KEEPALIVE_SECONDS:
+                        yield ": keepalive\n\n"
+                    continue
+
+                deltas = [delta]
+                while not sub.queue.empty():
+                    deltas.append(sub.queue.get_nowait())
+                sub.stale = False
+                for d in deltas:
+                    if d["event"]["type"] in GEOFENCE_NOTICES:
+                        yield live_bus.sse("notice", _notice(d["event"]["type"], d["event"]["at"]))
+
+                previous, shift = shift, await run_in_threadpool(_reload_shift, user_id)
+                if shift or previous:
+                    yield live_bus.sse("shift", _payload(shift))
+        finally:
+            live_bus.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # no proxy buffering
+    })
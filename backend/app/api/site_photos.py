@@ -1,7 +1,7 @@
 """
 Site Photos API — upload and list construction site photos
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -9,37 +9,14 @@ from datetime import datetime
 import uuid, io
 
 from app.database import get_db
-from app.models import User, ConstructionSite, SitePhoto, Role, Admin
+from app.models import User, ConstructionSite, SitePhoto
 from app.api.auth import get_current_user
+from app.auth import get_principal, Principal
 from app.api.admin_auth import get_current_admin
 from app.storage import upload_file, get_content_type
 from app.timezone import now_ro, today_ro
 
 
-def get_current_user_or_admin(request: Request, db: Session = Depends(get_db)):
-    """Accept either employee or admin auth token"""
-    from jose import JWTError, jwt
-    from app.config import settings
-    auth = request.headers.get("Authorization", "")
-    if not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    token = auth.split(" ", 1)[1]
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=["HS256"])
-        sub = payload.get("sub")
-        # Try admin first (admin tokens have email in payload)
-        if payload.get("email"):
-            admin = db.query(Admin).filter(Admin.id == sub).first()
-            if admin:
-                return admin
-        # Try employee
-        user = db.query(User).filter(User.id == sub).first()
-        if user:
-            return user
-    except Exception:
-        pass
-    raise HTTPException(status_code=401, detail="Invalid token")
-
 router = APIRouter()
 
 
@@ -108,7 +85,7 @@ def list_site_photos(
     site_id: Optional[str] = None,
     page: int = 1,
     per_page: int = 20,
-    current_user = Depends(get_current_user_or_admin),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
     """List site photos (admin view) with pagination"""
@@ -148,7 +125,7 @@ def list_site_photos(
 def update_site_photo(
     photo_id: str,
     body: dict,
-    current_user = Depends(get_current_user_or_admin),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
     """Update a site photo's description"""
@@ -166,12 +143,11 @@ def update_site_photo(
 @router.delete("/site-photos/{photo_id}")
 def delete_site_photo(
     photo_id: str,
-    current_user = Depends(get_current_user_or_admin),
+    principal: Principal = Depends(get_principal),
     db: Session = Depends(get_db)
 ):
     """Delete a site photo (admin only)"""
-    role = db.query(Role).filter(Role.id == current_user.role_id).first()
-    if not role or role.code not in ("ADMIN", "SITE_MANAGER"):
+    if principal.role_code not in ("ADMIN", "SITE_MANAGER"):
         raise HTTPException(status_code=403, detail="Acces interzis")
     
     photo = db.query(SitePhoto).filter(SitePhoto.id == photo_id).first()
@@ -2,7 +2,7 @@
 Sites API endpoints for employees (non-admin)
 Reads from construction_sites table (same as admin) so all sites are visible.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -11,6 +11,7 @@ from datetime import datetime
 from app.database import get_db
 from app.models import ConstructionSite, User
 from app.api.auth import get_current_user
+from app import site_index
 
 router = APIRouter(prefix="/sites", tags=["sites"])
 
@@ -27,6 +28,10 @@ class SiteResponse(BaseModel):
         from_attributes = True
 
 
+class NearbySiteResponse(SiteResponse):
+    distance_m: float
+
+
 @router.get("/", response_model=List[SiteResponse])
 def get_sites(
     current_user: User = Depends(get_current_user),
@@ -51,6 +56,22 @@ def get_sites(
     ) for site in sites]
 
 
+@router.get("/nearby", response_model=List[NearbySiteResponse])
+def get_nearby_sites(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    limit: int = Query(5, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the closest active sites to a GPS position, nearest first.
+    Served from the in-process spatial index; sites without coordinates are left out.
+    """
+    index = site_index.get_index(db, current_user.organization_id)
+    return index.nearest(lat, lon, limit)
+
+
 @router.get("/{site_id}", response_model=SiteResponse)
 def get_site(
     site_id: str,
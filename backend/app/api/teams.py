@@ -1,7 +1,7 @@
 """
 Team Management API endpoints for team leaders
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from typing import List, Optional
@@ -12,6 +12,8 @@ import json
 from app.database import get_db
 from app.models import Team, TeamMember, TeamDailyComposition, User, Site
 from app.api.auth import get_current_user
+from app.timezone import now_ro, today_ro
+from app import shift_metrics, data_version
 
 router = APIRouter(prefix="/teams", tags=["teams"])
 
@@ -571,24 +573,35 @@ def get_available_workers(
 @router.get("/{team_id}/status")
 def get_team_status(
     team_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get live status for all team members (who's working, on break, etc.)"""
+    """Get live status for all team members (who's working, on break, etc.).
+    Polled every 30 s: answers 304 while the organization's data is unchanged
+    (ETag); running hours refresh every LIVE_REFRESH_SECONDS."""
     from app.models import Timesheet, TimesheetSegment, TimesheetLine, Role
 
     team = db.query(Team).filter(Team.id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
 
+    not_modified = data_version.conditional(
+        request, response, team.organization_id, "team-status", team_id, today_ro(), data_version.live_bucket()
+    )
+    if not_modified:
+        return not_modified
+
     # Get all active members
     members_query = db.query(TeamMember, User).join(User).filter(
         TeamMember.team_id == team_id,
         TeamMember.is_active == True
     ).all()
 
-    today = date.today()
-    now = datetime.utcnow()
+    # Segments are stored in Romanian local time
+    today = today_ro()
+    now = now_ro()
     result = []
 
     for member, user in members_query:
@@ -628,36 +641,20 @@ def get_team_status(
                 # Use earliest check-in time
                 status_info["check_in_time"] = all_segments[0].check_in_time.isoformat()
 
-                total_worked = 0
-                total_break = 0
+                totals = shift_metrics.metrics_for(db, all_segments, now).total()
                 is_on_break = False
                 current_status = "finished"
 
                 for seg in all_segments:
-                    if seg.check_out_time:
-                        # Completed segment
-                        seg_elapsed = (seg.check_out_time - seg.check_in_time).total_seconds() / 3600
-                        seg_break = 0
-                        if seg.break_start_time and seg.break_end_time:
-                            seg_break = (seg.break_end_time - seg.break_start_time).total_seconds() / 3600
-                        total_worked += max(0, seg_elapsed - seg_break)
-                        total_break += seg_break
-                    else:
+                    if not seg.check_out_time:
                         # Active segment (still working)
-                        seg_elapsed = (now - seg.check_in_time).total_seconds() / 3600
-                        seg_break = 0
-                        if seg.break_start_time and seg.break_end_time:
-                            seg_break = (seg.break_end_time - seg.break_start_time).total_seconds() / 3600
-                        elif seg.break_start_time and not seg.break_end_time:
-                            seg_break = (now - seg.break_start_time).total_seconds() / 3600
+                        if seg.break_start_time and not seg.break_end_time:
                             is_on_break = True
-                        total_worked += max(0, seg_elapsed - seg_break)
-                        total_break += seg_break
                         current_status = "on_break" if is_on_break else "working"
 
                 status_info["status"] = current_status
-                status_info["worked_hours"] = round(max(0, total_worked), 2)
-                status_info["break_hours"] = round(max(0, total_break), 2)
+                status_info["worked_hours"] = round(totals.worked / 3600, 2)
+                status_info["break_hours"] = round(totals.break_ / 3600, 2)
                 status_info["is_on_break"] = is_on_break
                 status_info["check_out_time"] = all_segments[-1].check_out_time.isoformat() if all_segments[-1].check_out_time else None
 
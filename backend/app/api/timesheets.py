@@ -1,22 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 from datetime import datetime, timedelta, date
 from app.timezone import now_ro, today_ro
+import time
 from typing import List, Optional
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models import (
     Timesheet, TimesheetSegment, TimesheetLine, 
-    User, Site, Activity, Team, Admin, ConstructionSite,
-    GeofencePause
+    User, Site, Activity, Team, Admin, ConstructionSite
 )
-from app.api.admin_auth import get_current_admin, oauth2_scheme
+from app.api.admin_auth import get_current_admin
 from app.api.auth import get_current_user
+from app.auth import get_claims, Claims, get_principal, Principal
+from app import shift_registry, rollups, occupancy, shift_metrics, data_version, shift_events
+from app.ping_buffer import latest_ping
+from app.segment_time import refresh_totals, break_pause_overlap
+from app.excel_export import XlsxExport, Column, batched, xlsx_response
 
 router = APIRouter()
 
+EXPORT_BATCH = 1000  # timesheets per bulk-load round in the Excel export
+
 # ============================================================================
 # Pydantic Models
 # ============================================================================
@@ -73,16 +81,16 @@ def get_approver_for_user(db: Session, user: User):
             User.is_active == True
         ).first()
 
-def can_approve_timesheet(approver: User, timesheet: Timesheet, db: Session):
-    """Check if approver can approve this timesheet"""
+def can_approve_timesheet(approver_role: Optional[str], timesheet: Timesheet, db: Session):
+    """Check if an approver with this role code (token claims) can approve this timesheet"""
     owner = timesheet.owner_user
     
     # Site Manager can approve Team Lead timesheets
-    if approver.role.code == "SITE_MANAGER" and owner.role.code == "TEAM_LEAD":
+    if approver_role == "SITE_MANAGER" and owner.role.code == "TEAM_LEAD":
         return True
     
     # Team Lead can approve Worker timesheets
-    if approver.role.code == "TEAM_LEAD" and owner.role.code == "WORKER":
+    if approver_role == "TEAM_LEAD" and owner.role.code == "WORKER":
         return True
     
     return False
@@ -92,7 +100,7 @@ def can_approve_timesheet(approver: User, timesheet: Timesheet, db: Session):
 # ============================================================================
 
 @router.get("/timesheets/")
-async def list_my_timesheets(
+def list_my_timesheets(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
@@ -120,25 +128,12 @@ async def list_my_timesheets(
     # Order and paginate
     timesheets = query.order_by(Timesheet.date.desc()).offset((page - 1) * page_size).limit(page_size).all()
     
+    totals_by_ts = shift_metrics.timesheet_totals(db, [ts.id for ts in timesheets], now_ro())
+    
     # Format response
     results = []
     for ts in timesheets:
-        # Get segments and calculate hours
-        segments = db.query(TimesheetSegment).filter(TimesheetSegment.timesheet_id == ts.id).all()
-        total_hours = 0.0
-        for seg in segments:
-            if seg.check_in_time and seg.check_out_time:
-                delta = seg.check_out_time - seg.check_in_time
-                hours = delta.total_seconds() / 3600
-                if seg.break_start_time and seg.break_end_time:
-                    break_delta = seg.break_end_time - seg.break_start_time
-                    hours -= break_delta.total_seconds() / 3600
-                # Subtract geofence pause time
-                geo_pauses = db.query(GeofencePause).filter(GeofencePause.segment_id == seg.id).all()
-                for gp in geo_pauses:
-                    gp_end = gp.pause_end or now_ro()
-                    hours -= (gp_end - gp.pause_start).total_seconds() / 3600
-                total_hours += max(0, hours)
+        total_hours = totals_by_ts[ts.id].worked / 3600 if ts.id in totals_by_ts else 0.0
         
         # Get activities count
         activities_count = db.query(TimesheetLine).filter(
@@ -164,10 +159,11 @@ async def list_my_timesheets(
 
 
 @router.get("/timesheets/{timesheet_id}")
-async def get_timesheet_details(
+def get_timesheet_details(
     timesheet_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    claims: Claims = Depends(get_claims)
 ):
     """Get timesheet details with activities"""
     timesheet = db.query(Timesheet).filter(Timesheet.id == timesheet_id).first()
@@ -177,7 +173,7 @@ async def get_timesheet_details(
     
     # Check ownership or approval rights
     if timesheet.owner_user_id != current_user.id:
-        if not can_approve_timesheet(current_user, timesheet, db):
+        if not can_approve_timesheet(claims.role_code, timesheet, db):
             raise HTTPException(status_code=403, detail="Not authorized to view this timesheet")
     
     # Get segments
@@ -228,7 +224,7 @@ async def get_timesheet_details(
 
 
 @router.post("/timesheets/")
-async def create_timesheet(
+def create_timesheet(
     data: TimesheetCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -277,6 +273,7 @@ async def create_timesheet(
         break_end = break_start + timedelta(minutes=data.break_duration)
         segment.break_start_time = break_start
         segment.break_end_time = break_end
+    refresh_totals(segment)
     
     db.add(segment)
     db.flush()
@@ -308,7 +305,7 @@ async def create_timesheet(
 
 
 @router.put("/timesheets/{timesheet_id}")
-async def update_timesheet(
+def update_timesheet(
     timesheet_id: str,
     data: TimesheetUpdate,
     db: Session = Depends(get_db),
@@ -349,20 +346,23 @@ async def update_timesheet(
             else:
                 segment.break_start_time = None
                 segment.break_end_time = None
+        refresh_totals(segment, break_pause_overlap(db, segment))
     
     if data.notes is not None:
         timesheet.note_text = data.notes
     
     db.commit()
+    shift_registry.drop_shift(timesheet.owner_user_id)
     
     return {"message": "Timesheet updated successfully"}
 
 
 @router.post("/timesheets/{timesheet_id}/submit")
-async def submit_timesheet(
+def submit_timesheet(
     timesheet_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    claims: Claims = Depends(get_claims)
 ):
     """Submit timesheet for approval"""
     timesheet = db.query(Timesheet).filter(
@@ -385,7 +385,7 @@ async def submit_timesheet(
         raise HTTPException(status_code=400, detail="Cannot submit timesheet without activities")
     
     # Check if Site Manager (auto-approve)
-    if current_user.role.code == "SITE_MANAGER":
+    if claims.role_code == "SITE_MANAGER":
         timesheet.status = "APPROVED"
         timesheet.locked_at = datetime.utcnow()
         timesheet.locked_by_user_id = current_user.id
@@ -393,6 +393,7 @@ async def submit_timesheet(
         timesheet.status = "SUBMITTED"
     
     db.commit()
+    shift_registry.drop_shift(timesheet.owner_user_id)
     
     return {
         "status": timesheet.status,
@@ -401,7 +402,7 @@ async def submit_timesheet(
 
 
 @router.delete("/timesheets/{timesheet_id}")
-async def delete_timesheet(
+def delete_timesheet(
     timesheet_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -418,8 +419,10 @@ async def delete_timesheet(
     if timesheet.status != "DRAFT":
         raise HTTPException(status_code=400, detail="Can only delete DRAFT timesheets")
     
+    owner_id = timesheet.owner_user_id
     db.delete(timesheet)
     db.commit()
+    shift_registry.drop_shift(owner_id)
     
     return {"message": "Timesheet deleted successfully"}
 
@@ -436,10 +439,15 @@ async def list_pending_timesheets(
     date_to: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """List pending timesheets for approval (admin sees all)"""
+    return await db.run_sync(_pending_timesheets, status, site_id, date_from, date_to, page, page_size)
+
+
+def _pending_timesheets(db: Session, status: Optional[str], site_id: Optional[str],
+                        date_from: Optional[str], date_to: Optional[str], page: int, page_size: int):
     query = db.query(Timesheet)
     if status:
         query = query.filter(Timesheet.status == status)
@@ -454,26 +462,13 @@ async def list_pending_timesheets(
     
     timesheets = query.order_by(Timesheet.date.desc()).offset((page - 1) * page_size).limit(page_size).all()
     
+    totals_by_ts = shift_metrics.timesheet_totals(db, [ts.id for ts in timesheets], now_ro())
+    
     results = []
     for ts in timesheets:
         owner = db.query(User).filter(User.id == ts.owner_user_id).first()
         
-        # Get total hours
-        segments = db.query(TimesheetSegment).filter(TimesheetSegment.timesheet_id == ts.id).all()
-        total_hours = 0.0
-        for seg in segments:
-            if seg.check_in_time and seg.check_out_time:
-                delta = seg.check_out_time - seg.check_in_time
-                hours = delta.total_seconds() / 3600
-                if seg.break_start_time and seg.break_end_time:
-                    break_delta = seg.break_end_time - seg.break_start_time
-                    hours -= break_delta.total_seconds() / 3600
-                # Subtract geofence pause time
-                geo_pauses = db.query(GeofencePause).filter(GeofencePause.segment_id == seg.id).all()
-                for gp in geo_pauses:
-                    gp_end = gp.pause_end or now_ro()
-                    hours -= (gp_end - gp.pause_start).total_seconds() / 3600
-                total_hours += max(0, hours)
+        total_hours = totals_by_ts[ts.id].worked / 3600 if ts.id in totals_by_ts else 0.0
         
         # Get activities
         activities_count = db.query(TimesheetLine).filter(
@@ -499,7 +494,7 @@ async def list_pending_timesheets(
 
 
 @router.post("/admin/timesheets/{timesheet_id}/approve")
-async def approve_timesheet(
+def approve_timesheet(
     timesheet_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
@@ -513,8 +508,8 @@ async def approve_timesheet(
     if timesheet.status != "SUBMITTED":
         raise HTTPException(status_code=400, detail="Can only approve SUBMITTED timesheets")
     
-    # Check approval rights
-    if not can_approve_timesheet(current_user, timesheet, db):
+    # Admin accounts approve any timesheet of their organization
+    if timesheet.organization_id != current_user.organization_id:
         raise HTTPException(status_code=403, detail="Not authorized to approve this timesheet")
     
     timesheet.status = "APPROVED"
@@ -530,7 +525,7 @@ async def approve_timesheet(
 
 
 @router.post("/admin/timesheets/{timesheet_id}/reject")
-async def reject_timesheet(
+def reject_timesheet(
     timesheet_id: str,
     action: ApprovalAction,
     db: Session = Depends(get_db),
@@ -545,8 +540,8 @@ async def reject_timesheet(
     if timesheet.status != "SUBMITTED":
         raise HTTPException(status_code=400, detail="Can only reject SUBMITTED timesheets")
     
-    # Check approval rights
-    if not can_approve_timesheet(current_user, timesheet, db):
+    # Admin accounts reject any timesheet of their organization
+    if timesheet.organization_id != current_user.organization_id:
         raise HTTPException(status_code=403, detail="Not authorized to reject this timesheet")
     
     timesheet.status = "DRAFT"  # Return to draft for editing
@@ -555,6 +550,7 @@ async def reject_timesheet(
     timesheet.unlocked_by_user_id = current_user.id
     
     db.commit()
+    shift_registry.drop_shift(timesheet.owner_user_id)
     
     return {
         "status": "DRAFT",
@@ -563,15 +559,18 @@ async def reject_timesheet(
 
 @router.get("/admin/timesheets/stats")
 async def get_timesheet_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Get timesheet statistics for admin dashboard"""
+    return await db.run_sync(_timesheet_stats)
+
+
+def _timesheet_stats(db: Session):
     from datetime import datetime, timedelta
     
     today = today_ro()
     week_start = today - timedelta(days=today.weekday())
-    now = now_ro()
     
     # Count all timesheets today
     today_count = db.query(Timesheet).filter(
@@ -579,25 +578,9 @@ async def get_timesheet_stats(
         Timesheet.owner_type == "USER"
     ).count()
     
-    # Total hours this week — BULK fetch
-    week_timesheets = db.query(Timesheet).filter(
-        Timesheet.date >= week_start,
-        Timesheet.owner_type == "USER"
-    ).all()
-    
-    total_hours_week = 0
-    if week_timesheets:
-        ts_ids = [ts.id for ts in week_timesheets]
-        all_segs = db.query(TimesheetSegment).filter(
-            TimesheetSegment.timesheet_id.in_(ts_ids)
-        ).all()
-        for seg in all_segs:
-            end_time = seg.check_out_time or now
-            hours = (end_time - seg.check_in_time).total_seconds() / 3600
-            if seg.break_start_time:
-                break_end = seg.break_end_time or now
-                hours -= (break_end - seg.break_start_time).total_seconds() / 3600
-            total_hours_week += max(0, hours)
+    # Total hours this week — closed days from the rollups, the rest live
+    week_days = rollups.daily_totals(db, week_start, today)
+    total_hours_week = sum(d["worked_seconds"] for d in week_days) / 3600
     
     total_users = db.query(func.count(User.id)).filter(User.is_active == True).scalar()
     total_sites = db.query(func.count(ConstructionSite.id)).scalar()
@@ -612,127 +595,96 @@ async def get_timesheet_stats(
     }
 
 
+DASHBOARD_CACHE_SECONDS = 15
+_dashboard_cache: dict = {}  # organization_id -> (expires_at, stats)
+
+
 @router.get("/admin/dashboard-stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
-    """Comprehensive dashboard stats with daily breakdown for charts"""
-    from datetime import datetime, timedelta
-    
+    """Comprehensive dashboard stats with daily breakdown for charts.
+    Polled by the admin overview, so results are cached per organization
+    for DASHBOARD_CACHE_SECONDS."""
+    org_id = current_admin.organization_id
+    cached = _dashboard_cache.get(org_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    stats = await db.run_sync(_dashboard_stats, org_id)
+    _dashboard_cache[org_id] = (time.monotonic() + DASHBOARD_CACHE_SECONDS, stats)
+    return stats
+
+
+def _dashboard_stats(db: Session, organization_id: Optional[str] = None):
+    """Daily, activity and site figures are grouped SQL queries; the hourly
+    chart is a sweep over today's intervals (app/occupancy.py)."""
     today = today_ro()
     now = now_ro()
-    
-    # ── Bulk Fetch Last 7 Days ──
     start_date = today - timedelta(days=6)
-    all_7d_ts = db.query(Timesheet).filter(
-        Timesheet.date >= start_date,
-        Timesheet.date <= today,
-        Timesheet.owner_type == "USER"
-    ).all()
-    
-    ts_ids = [ts.id for ts in all_7d_ts]
-    all_7d_segs = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id.in_(ts_ids)
-    ).all() if ts_ids else []
-    
-    # Map segments by timesheet_id for fast lookup
-    segs_by_ts = {}
-    for seg in all_7d_segs:
-        segs_by_ts.setdefault(seg.timesheet_id, []).append(seg)
-    
-    # Group timesheets by date
-    ts_by_date = {}
-    for ts in all_7d_ts:
-        ts_by_date.setdefault(ts.date, []).append(ts)
 
-    # ── Last 7 days breakdown ──
+    ts_filter = [Timesheet.owner_type == "USER"]
+    if organization_id:
+        ts_filter.append(Timesheet.organization_id == organization_id)
+
+    # ── Last 7 days: hours (rollups + live) and timesheets per day ──
+    hours_by_date = {
+        d["date"]: d["worked_seconds"] / 3600
+        for d in rollups.daily_totals(db, start_date, today, organization_id)
+    }
+    workers_by_date = dict(db.query(Timesheet.date, func.count(Timesheet.id)).filter(
+        *ts_filter, Timesheet.date >= start_date, Timesheet.date <= today
+    ).group_by(Timesheet.date).all())
+
     daily_data = []
     for i in range(6, -1, -1):
         day = today - timedelta(days=i)
-        day_name = day.strftime("%a")
-        day_label = day.strftime("%d/%m")
-        
-        day_timesheets = ts_by_date.get(day, [])
-        day_hours = 0
-        
-        for ts in day_timesheets:
-            segments = segs_by_ts.get(ts.id, [])
-            for seg in segments:
-                end_time = seg.check_out_time or now
-                hours = (end_time - seg.check_in_time).total_seconds() / 3600
-                if seg.break_start_time:
-                    break_end = seg.break_end_time or now
-                    bh = (break_end - seg.break_start_time).total_seconds() / 3600
-                    hours -= bh
-                day_hours += max(0, hours)
-        
         daily_data.append({
-            "day": day_name,
-            "date": day_label,
-            "hours": round(day_hours, 1),
-            "workers": len(day_timesheets)
+            "day": day.strftime("%a"),
+            "date": day.strftime("%d/%m"),
+            "hours": round(hours_by_date.get(day, 0), 1),
+            "workers": workers_by_date.get(day, 0)
         })
-    
-    # ── Today's hourly breakdown ──
-    hourly_data = []
-    today_timesheets = ts_by_date.get(today, [])
-    today_segs = [seg for ts in today_timesheets for seg in segs_by_ts.get(ts.id, [])]
-    
-    for hour in range(6, 21):
-        hour_time = datetime(today.year, today.month, today.day, hour, 0)
-        active = 0
-        for seg in today_segs:
-            end_t = seg.check_out_time or now
-            if seg.check_in_time <= hour_time < end_t:
-                on_break = False
-                if seg.break_start_time:
-                    be = seg.break_end_time or now
-                    if seg.break_start_time <= hour_time < be:
-                        on_break = True
-                if not on_break:
-                    active += 1
-        hourly_data.append({"hour": f"{hour}:00", "workers": active})
-    
+
+    # ── Today's hourly breakdown (breaks and geofence pauses excluded) ──
+    hour_samples = occupancy.sample_times(today, today, 60, first_hour=6, last_hour=21)
+    hourly_counts = occupancy.headcount(
+        occupancy.load_intervals(db, today, today, organization_id, now=now), hour_samples
+    )
+    hourly_data = [
+        {"hour": f"{t.hour}:00", "workers": int(count)}
+        for t, count in zip(hour_samples, hourly_counts)
+    ]
+
     # ── Activity breakdown today ──
-    today_ts_ids = [ts.id for ts in today_timesheets]
-    today_lines = db.query(TimesheetLine).filter(
-        TimesheetLine.timesheet_id.in_(today_ts_ids)
-    ).all() if today_ts_ids else []
-    
-    act_ids = list(set([line.activity_id for line in today_lines if line.activity_id]))
-    activities_in_db = db.query(Activity).filter(Activity.id.in_(act_ids)).all() if act_ids else []
-    act_dict = {a.id: a.name for a in activities_in_db}
-    
-    activity_data = {}
-    for line in today_lines:
-        act_name = act_dict.get(line.activity_id)
-        if act_name:
-            if act_name not in activity_data:
-                activity_data[act_name] = {"quantity": 0, "unit_type": line.unit_type or "buc"}
-            activity_data[act_name]["quantity"] += float(line.quantity_numeric) if line.quantity_numeric else 0
-            
-    activities_list = [{"name": k, "quantity": round(v["quantity"], 1), "unit_type": v["unit_type"]} for k, v in activity_data.items()]
-    
+    activity_rows = db.query(
+        Activity.name,
+        func.max(TimesheetLine.unit_type),
+        func.sum(TimesheetLine.quantity_numeric)
+    ).join(
+        TimesheetLine, TimesheetLine.activity_id == Activity.id
+    ).join(
+        Timesheet, Timesheet.id == TimesheetLine.timesheet_id
+    ).filter(*ts_filter, Timesheet.date == today).group_by(Activity.name).all()
+    activities_list = [
+        {"name": name, "quantity": round(float(quantity or 0), 1), "unit_type": unit_type or "buc"}
+        for name, unit_type, quantity in activity_rows
+    ]
+
     # ── Site breakdown today ──
-    site_data = {}
-    site_ids = list(set([s.site_id for s in today_segs if s.site_id]))
-    sites_in_db = db.query(ConstructionSite).filter(ConstructionSite.id.in_(site_ids)).all() if site_ids else []
-    site_dict = {s.id: s.name for s in sites_in_db}
-    
-    for seg in today_segs:
-        site_name = site_dict.get(seg.site_id)
-        if site_name:
-            site_data[site_name] = site_data.get(site_name, 0) + 1
-            
-    sites_list = [{"name": k, "workers": v} for k, v in site_data.items()]
-    
+    site_rows = db.query(ConstructionSite.name, func.count(TimesheetSegment.id)).join(
+        TimesheetSegment, TimesheetSegment.site_id == ConstructionSite.id
+    ).join(
+        Timesheet, Timesheet.id == TimesheetSegment.timesheet_id
+    ).filter(*ts_filter, Timesheet.date == today).group_by(ConstructionSite.name).all()
+    sites_list = [{"name": name, "workers": count} for name, count in site_rows]
+
     return {
         "daily": daily_data,
         "hourly": hourly_data,
         "activities": activities_list,
         "sites": sites_list,
-        "today_workers": len(today_timesheets),
+        "today_workers": workers_by_date.get(today, 0),
         "week_total_hours": round(sum(d["hours"] for d in daily_data), 1)
     }
 
@@ -744,21 +696,37 @@ async def get_dashboard_stats(
 
 @router.get("/admin/timesheets/active-workers")
 async def get_active_workers(
+    request: Request,
+    response: Response,
     target_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
-    """Get all workers who have a timesheet for a given date (defaults to today)"""
+    """Get all workers who have a timesheet for a given date (defaults to today).
+    Polled every 30 s: answers 304 while no data changed (ETag). Today's view
+    also refreshes every LIVE_REFRESH_SECONDS for GPS loss."""
+    today = today_ro()
+    query_date = target_date or today.isoformat()
+    live = data_version.live_bucket() if query_date == today.isoformat() else None
+    # Reads every organization's timesheets, so it follows the global version
+    not_modified = data_version.conditional(request, response, None, "active-workers", query_date, live)
+    if not_modified:
+        return not_modified
+    return await db.run_sync(build_active_workers, target_date)
+
+
+def build_active_workers(db: Session, target_date: Optional[str] = None, organization_id: Optional[str] = None):
+    """Active-workers payload; also the snapshot of the admin live stream"""
     from datetime import datetime
     
     query_date = date.fromisoformat(target_date) if target_date else today_ro()
     now = now_ro()
     
     # ── BULK FETCH 1: All timesheets for the date ──
-    today_timesheets = db.query(Timesheet).filter(
-        Timesheet.date == query_date,
-        Timesheet.owner_type == "USER"
-    ).all()
+    ts_filter = [Timesheet.date == query_date, Timesheet.owner_type == "USER"]
+    if organization_id:
+        ts_filter.append(Timesheet.organization_id == organization_id)
+    today_timesheets = db.query(Timesheet).filter(*ts_filter).all()
     
     if not today_timesheets:
         return {"active_workers": [], "total_active": 0, "total_today": 0, "timestamp": str(now)}
@@ -785,14 +753,12 @@ async def get_active_workers(
     sites_list = db.query(ConstructionSite).filter(ConstructionSite.id.in_(site_ids)).all() if site_ids else []
     sites_dict = {s.id: s for s in sites_list}
     
-    # ── BULK FETCH 5: All geofence pauses for all segments ──
-    seg_ids = [seg.id for seg in all_segments]
-    all_geo_pauses = db.query(GeofencePause).filter(
-        GeofencePause.segment_id.in_(seg_ids)
-    ).all() if seg_ids else []
-    geo_by_seg = {}
-    for gp in all_geo_pauses:
-        geo_by_seg.setdefault(gp.segment_id, []).append(gp)
+    # ── BULK FETCH 5: Geofence pauses of open segments → hours per timesheet ──
+    # (closed segments carry their final totals)
+    arrays = shift_metrics.SegmentArrays.of(all_segments)
+    pauses = shift_metrics.load_pauses(db, arrays)
+    outside_seg_ids = pauses.running(arrays)
+    totals_by_ts = shift_metrics.compute(arrays, now, pauses).totals()
     
     # ── BULK FETCH 6: All activity lines + activities ──
     all_lines = db.query(TimesheetLine).filter(
@@ -805,40 +771,8 @@ async def get_active_workers(
     for line in all_lines:
         lines_by_ts.setdefault(line.timesheet_id, []).append(line)
     
-    # ── AUTO CLOCK-OUT: close segments past site work_end_time ──
-    needs_commit = False
-    for ts in today_timesheets:
-        ts_segs = segs_by_ts.get(ts.id, [])
-        if not ts_segs:
-            continue
-        last_seg = ts_segs[-1]
-        if last_seg.check_out_time:
-            continue
-        first_seg = ts_segs[0]
-        site = sites_dict.get(first_seg.site_id)
-        if site and site.work_end_time:
-            site_close_dt = datetime.combine(query_date, site.work_end_time)
-            if now > site_close_dt:
-                for seg in ts_segs:
-                    if not seg.check_out_time:
-                        seg.check_out_time = site_close_dt
-                        if seg.break_start_time and not seg.break_end_time:
-                            seg.break_end_time = site_close_dt
-                        # Close open geofence pauses
-                        for gp in geo_by_seg.get(seg.id, []):
-                            if not gp.pause_end:
-                                gp.pause_end = site_close_dt
-                        needs_commit = True
-    
-    if needs_commit:
-        db.commit()
-        # Re-fetch segments after auto-close
-        all_segments = db.query(TimesheetSegment).filter(
-            TimesheetSegment.timesheet_id.in_(ts_ids)
-        ).order_by(TimesheetSegment.check_in_time.asc()).all()
-        segs_by_ts = {}
-        for seg in all_segments:
-            segs_by_ts.setdefault(seg.timesheet_id, []).append(seg)
+    # Overdue segments are checked out by the background sweeper
+    # (app/sweeper.py); this endpoint only reads.
     
     # ── BUILD RESPONSE (in-memory, no more DB queries) ──
     active_workers = []
@@ -858,49 +792,28 @@ async def get_active_workers(
         
         is_on_break = False
         is_outside_geofence = False
-        total_worked = 0
-        total_break = 0
-        total_geofence_pause = 0
         all_checked_out = True
         
         for seg in ts_segs:
-            if seg.check_out_time:
-                seg_hours = (seg.check_out_time - seg.check_in_time).total_seconds() / 3600
-            else:
-                seg_hours = (now - seg.check_in_time).total_seconds() / 3600
+            if not seg.check_out_time:
                 all_checked_out = False
-            
-            seg_break = 0
-            if seg.break_start_time:
-                if seg.break_end_time:
-                    seg_break = (seg.break_end_time - seg.break_start_time).total_seconds() / 3600
-                else:
-                    seg_break = (now - seg.break_start_time).total_seconds() / 3600
+                if seg.break_start_time and not seg.break_end_time:
                     is_on_break = True
-            
-            # Geofence pauses from pre-fetched data
-            seg_geofence = 0
-            seg_geos = geo_by_seg.get(seg.id, [])
-            for gp in seg_geos:
-                gp_end = gp.pause_end or now
-                seg_geofence += (gp_end - gp.pause_start).total_seconds() / 3600
-            
-            # Check if currently outside geofence
-            if not seg.check_out_time:
-                for gp in seg_geos:
-                    if not gp.pause_end:
-                        is_outside_geofence = True
-                        break
-            
-            total_worked += max(0, seg_hours - max(0, seg_break) - max(0, seg_geofence))
-            total_break += max(0, seg_break)
-            total_geofence_pause += max(0, seg_geofence)
+                # Check if currently outside geofence
+                if seg.id in outside_seg_ids:
+                    is_outside_geofence = True
+        
+        ts_totals = totals_by_ts[ts.id]
+        total_worked = ts_totals.worked / 3600
+        total_break = ts_totals.break_ / 3600
+        total_geofence_pause = ts_totals.geofence / 3600
         
         # GPS loss detection
         gps_lost = False
         if not all_checked_out and last_segment and not last_segment.check_out_time:
-            if last_segment.last_ping_at:
-                since_last_ping = (now - last_segment.last_ping_at).total_seconds()
+            last_ping_at = latest_ping(last_segment.id, last_segment.last_ping_at)
+            if last_ping_at:
+                since_last_ping = (now - last_ping_at).total_seconds()
                 gps_lost = since_last_ping > 120
             else:
                 since_checkin = (now - last_segment.check_in_time).total_seconds()
@@ -964,10 +877,14 @@ async def get_worker_history(
     worker_id: str,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Get a worker's personal info and full timesheet history"""
+    return await db.run_sync(_worker_history, worker_id, date_from, date_to)
+
+
+def _worker_history(db: Session, worker_id: str, date_from: Optional[str], date_to: Optional[str]):
     from app.models import Role
     
     worker = db.query(User).filter(User.id == worker_id).first()
@@ -993,11 +910,18 @@ async def get_worker_history(
     total_worked_all = 0
     total_days = len(timesheets)
     
+    # All segments of the listed days at once, hours computed in one pass
+    now = now_ro()
+    all_segments = db.query(TimesheetSegment).filter(
+        TimesheetSegment.timesheet_id.in_([ts.id for ts in timesheets])
+    ).order_by(TimesheetSegment.check_in_time.asc()).all() if timesheets else []
+    segs_by_ts = {}
+    for seg in all_segments:
+        segs_by_ts.setdefault(seg.timesheet_id, []).append(seg)
+    totals_by_ts = shift_metrics.metrics_for(db, all_segments, now).totals()
+    
     for ts in timesheets:
-        segments = db.query(TimesheetSegment).filter(
-            TimesheetSegment.timesheet_id == ts.id
-        ).order_by(TimesheetSegment.check_in_time.asc()).all()
-        
+        segments = segs_by_ts.get(ts.id)
         if not segments:
             continue
         
@@ -1008,29 +932,10 @@ async def get_worker_history(
             ConstructionSite.id == first_seg.site_id
         ).first()
         
-        now = now_ro()
-        total_worked = 0
-        total_break = 0
-        is_on_break = False
-        all_checked_out = True
-        
-        for seg in segments:
-            if seg.check_out_time:
-                seg_hours = (seg.check_out_time - seg.check_in_time).total_seconds() / 3600
-            else:
-                seg_hours = (now - seg.check_in_time).total_seconds() / 3600
-                all_checked_out = False
-            
-            seg_break = 0
-            if seg.break_start_time:
-                if seg.break_end_time:
-                    seg_break = (seg.break_end_time - seg.break_start_time).total_seconds() / 3600
-                else:
-                    seg_break = (now - seg.break_start_time).total_seconds() / 3600
-                    is_on_break = True
-            
-            total_worked += max(0, seg_hours - max(0, seg_break))
-            total_break += max(0, seg_break)
+        total_worked = totals_by_ts[ts.id].worked / 3600
+        total_break = totals_by_ts[ts.id].break_ / 3600
+        all_checked_out = all(seg.check_out_time for seg in segments)
+        is_on_break = any(seg.break_start_time and not seg.break_end_time for seg in segments)
         
         if all_checked_out:
             status = "terminat"
@@ -1096,42 +1001,13 @@ async def get_worker_history(
 # ============================================================================
 
 @router.get("/activities/")
-async def list_activities(
+def list_activities(
     is_active: bool = Query(True),
     db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
+    principal: Principal = Depends(get_principal)
 ):
     """List all active activities - supports both worker and admin auth"""
-    from jose import jwt, JWTError
-    from app.api.admin_auth import SECRET_KEY as ADMIN_SECRET_KEY, ALGORITHM as ADMIN_ALGORITHM
-    from app.config import settings
-    
-    organization_id = None
-    user_id = None
-    
-    # Try worker JWT first
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        user_id = payload.get("sub")
-    except JWTError:
-        # Try admin JWT
-        try:
-            payload = jwt.decode(token, ADMIN_SECRET_KEY, algorithms=[ADMIN_ALGORITHM])
-            user_id = payload.get("sub")
-        except JWTError:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    
-    if user_id:
-        # Try as worker
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            organization_id = user.organization_id
-        else:
-            # Try as admin
-            admin = db.query(Admin).filter(Admin.id == user_id).first()
-            if admin:
-                organization_id = admin.organization_id
-    
+    organization_id = principal.organization_id
     if not organization_id:
         raise HTTPException(status_code=401, detail="Could not determine organization")
     
@@ -1223,7 +1099,7 @@ async def list_activities(
 
 
 @router.post("/timesheets/{timesheet_id}/activities")
-async def add_activity_to_timesheet(
+def add_activity_to_timesheet(
     timesheet_id: str,
     activity: ActivityInput,
     db: Session = Depends(get_db),
@@ -1263,6 +1139,11 @@ async def add_activity_to_timesheet(
         unit_type=act.unit_type
     )
     db.add(line)
+    shift_events.record(
+        db, "activity_added", timesheet.organization_id, current_user.id, now_ro(),
+        segment_id=segment.id, site_id=segment.site_id,
+        detail=f"{act.name}: {activity.quantity:g} {act.unit_type or 'buc'}"
+    )
     db.commit()
     db.refresh(line)
     
@@ -1273,7 +1154,7 @@ async def add_activity_to_timesheet(
 
 
 @router.delete("/timesheets/activities/{activity_id}")
-async def delete_activity_from_timesheet(
+def delete_activity_from_timesheet(
     activity_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -1324,7 +1205,7 @@ class ActivityUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 @router.post("/admin/activities/")
-async def create_activity(
+def create_activity(
     data: ActivityCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
@@ -1350,7 +1231,7 @@ async def create_activity(
     }
 
 @router.put("/admin/activities/{activity_id}")
-async def update_activity(
+def update_activity(
     activity_id: str,
     data: ActivityUpdate,
     db: Session = Depends(get_db),
@@ -1385,7 +1266,7 @@ async def update_activity(
     return {"message": "Activity updated successfully"}
 
 @router.delete("/admin/activities/{activity_id}")
-async def delete_activity(
+def delete_activity(
     activity_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin)
@@ -1431,7 +1312,7 @@ class CategoryUpdate(BaseModel):
     is_active: Optional[bool] = None
 
 @router.get("/admin/activity-categories/")
-async def list_activity_categories(
+def list_activity_categories(
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
@@ -1464,7 +1345,7 @@ async def list_activity_categories(
     return {"categories": result}
 
 @router.post("/admin/activity-categories/")
-async def create_activity_category(
+def create_activity_category(
     data: CategoryCreate,
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
@@ -1488,7 +1369,7 @@ async def create_activity_category(
     }
 
 @router.put("/admin/activity-categories/{category_id}")
-async def update_activity_category(
+def update_activity_category(
     category_id: str,
     data: CategoryUpdate,
     db: Session = Depends(get_db),
@@ -1519,7 +1400,7 @@ async def update_activity_category(
     return {"message": "Category updated successfully"}
 
 @router.delete("/admin/activity-categories/{category_id}")
-async def delete_activity_category(
+def delete_activity_category(
     category_id: str,
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
@@ -1553,7 +1434,7 @@ async def delete_activity_category(
 # ============================================================================
 
 @router.put("/admin/timesheets/segments/{segment_id}/approve-overtime")
-async def approve_segment_overtime(
+def approve_segment_overtime(
     segment_id: str,
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
@@ -1590,114 +1471,21 @@ async def approve_segment_overtime(
 
 @router.get("/admin/notifications/feed")
 async def get_notification_feed(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    after: Optional[int] = Query(None, description="Cursor: only events newer than this id"),
+    before: Optional[int] = Query(None, description="Only events older than this id (history paging)"),
+    limit: int = Query(shift_events.PAGE_SIZE, ge=1, le=shift_events.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
-    """Get real-time event feed from today's activity"""
-    from datetime import datetime
-    
-    today = today_ro()
-    now = now_ro()
-    
-    # ── Bulk fetch all data in 4 queries ──
-    today_timesheets = db.query(Timesheet).filter(
-        Timesheet.date == today,
-        Timesheet.owner_type == "USER"
-    ).all()
-    
-    if not today_timesheets:
-        return {"events": [], "total": 0}
-    
-    ts_ids = [ts.id for ts in today_timesheets]
-    user_ids = list(set([ts.owner_user_id for ts in today_timesheets]))
-    
-    users_list = db.query(User).filter(User.id.in_(user_ids)).all()
-    users_dict = {u.id: u for u in users_list}
-    
-    all_segs = db.query(TimesheetSegment).filter(
-        TimesheetSegment.timesheet_id.in_(ts_ids)
-    ).all()
-    segs_by_ts = {}
-    for seg in all_segs:
-        segs_by_ts.setdefault(seg.timesheet_id, []).append(seg)
-    
-    site_ids = list(set([seg.site_id for seg in all_segs if seg.site_id]))
-    sites_list = db.query(ConstructionSite).filter(ConstructionSite.id.in_(site_ids)).all() if site_ids else []
-    sites_dict = {s.id: s for s in sites_list}
-    
-    events = []
-    for ts in today_timesheets:
-        worker = users_dict.get(ts.owner_user_id)
-        if not worker:
-            continue
-        wname = worker.full_name or "Necunoscut"
-        avatar = worker.avatar_path
-        
-        segments = segs_by_ts.get(ts.id, [])
-        first_seg = segments[0] if segments else None
-        site = sites_dict.get(first_seg.site_id) if first_seg else None
-        site_name = site.name if site else "Necunoscut"
-        
-        for seg in segments:
-            # Check-in event
-            events.append({
-                "type": "check_in",
-                "icon": "🟢",
-                "message": f"{wname} a intrat pe șantier",
-                "detail": site_name,
-                "time": str(seg.check_in_time),
-                "timestamp": seg.check_in_time.timestamp(),
-                "worker_name": wname,
-                "avatar_path": avatar
-            })
-            
-            # Break start
-            if seg.break_start_time:
-                events.append({
-                    "type": "break_start",
-                    "icon": "☕",
-                    "message": f"{wname} a intrat în pauză",
-                    "detail": site_name,
-                    "time": str(seg.break_start_time),
-                    "timestamp": seg.break_start_time.timestamp(),
-                    "worker_name": wname,
-                    "avatar_path": avatar
-                })
-            
-            # Break end
-            if seg.break_end_time:
-                events.append({
-                    "type": "break_end",
-                    "icon": "🔄",
-                    "message": f"{wname} a revenit din pauză",
-                    "detail": site_name,
-                    "time": str(seg.break_end_time),
-                    "timestamp": seg.break_end_time.timestamp(),
-                    "worker_name": wname,
-                    "avatar_path": avatar
-                })
-            
-            # Check-out
-            if seg.check_out_time:
-                hours = (seg.check_out_time - seg.check_in_time).total_seconds() / 3600
-                events.append({
-                    "type": "check_out",
-                    "icon": "🔴",
-                    "message": f"{wname} a ieșit de pe șantier",
-                    "detail": f"{site_name} — {round(hours, 1)}h",
-                    "time": str(seg.check_out_time),
-                    "timestamp": seg.check_out_time.timestamp(),
-                    "worker_name": wname,
-                    "avatar_path": avatar
-                })
-    
-    # Sort newest first
-    events.sort(key=lambda e: e["timestamp"], reverse=True)
-    
-    return {
-        "events": events[:50],
-        "total": len(events)
-    }
+    """Event feed from the shift event log (app/shift_events.py), newest first.
+    Poll with after=<cursor> to get only new events; 304 while unchanged."""
+    org_id = current_admin.organization_id
+    not_modified = data_version.conditional(request, response, org_id, "notifications", after, before, limit)
+    if not_modified:
+        return not_modified
+    return await db.run_sync(shift_events.feed, org_id, after, before, limit)
 
 
 # ============================================================================
@@ -1705,7 +1493,7 @@ async def get_notification_feed(
 # ============================================================================
 
 @router.get("/admin/timesheets/export/excel")
-async def export_timesheets_excel(
+def export_timesheets_excel(
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     site_id: Optional[str] = None,
@@ -1713,114 +1501,106 @@ async def export_timesheets_excel(
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Export timesheets to Excel (date range, optional site filter)"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from fastapi.responses import StreamingResponse
-    import io
+    start, end = timesheet_export_range(date_from, date_to)
+    export = build_timesheets_export(db, start, end, site_id)
+    return xlsx_response(export, f"pontaje_{start}_{end}.xlsx")
 
+
+def timesheet_export_range(date_from: Optional[str], date_to: Optional[str]):
+    """Resolve the export range; defaults to the last 30 days"""
     today = today_ro()
     start = date.fromisoformat(date_from) if date_from else today - timedelta(days=30)
     end = date.fromisoformat(date_to) if date_to else today
+    return start, end
+
 
+def build_timesheets_export(db: Session, start: date, end: date, site_id: Optional[str] = None,
+                            progress=None) -> XlsxExport:
+    """Render the timesheet export. `progress(done, total)` is called after
+    every batch when given (used by background export jobs)."""
     ts_query = db.query(Timesheet).filter(
         Timesheet.date >= start,
         Timesheet.date <= end,
         Timesheet.owner_type == "USER"
     )
-
-    timesheets = ts_query.order_by(Timesheet.date.desc()).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Pontaje"
-
-    # Header styling
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="2563EB", end_color="2563EB", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
-
-    headers = ["Data", "Angajat", "Cod", "Șantier", "Check-in", "Check-out", "Ore Lucrate", "Pauză (h)", "Status", "Activități"]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=h)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center")
-        cell.border = thin_border
-
-    row = 2
+    if site_id:
+        ts_query = ts_query.filter(Timesheet.id.in_(
+            db.query(TimesheetSegment.timesheet_id).filter(TimesheetSegment.site_id == site_id)
+        ))
+
+    export = XlsxExport("Pontaje", [
+        Column("Data", 12), Column("Angajat", 24), Column("Cod", 12), Column("Șantier", 26),
+        Column("Check-in", 10), Column("Check-out", 10), Column("Ore Lucrate", 12),
+        Column("Pauză (h)", 10), Column("Status", 10), Column("Activități", 40)
+    ], header_color="2563EB")
+
+    workers = {}
+    sites = {}
+    activity_names = {}
     now = now_ro()
-    for ts in timesheets:
-        worker = db.query(User).filter(User.id == ts.owner_user_id).first()
-        segments = db.query(TimesheetSegment).filter(
-            TimesheetSegment.timesheet_id == ts.id
-        ).order_by(TimesheetSegment.check_in_time.asc()).all()
-
-        if not segments:
-            continue
-
-        if site_id and not any(s.site_id == site_id for s in segments):
-            continue
-
-        first_seg = segments[0]
-        last_seg = segments[-1]
-        site = db.query(ConstructionSite).filter(ConstructionSite.id == first_seg.site_id).first()
-
-        total_worked = 0
-        total_break = 0
-        all_checked_out = True
-        for seg in segments:
-            if seg.check_out_time:
-                seg_hours = (seg.check_out_time - seg.check_in_time).total_seconds() / 3600
-            else:
-                seg_hours = (now - seg.check_in_time).total_seconds() / 3600
-                all_checked_out = False
-            seg_break = 0
-            if seg.break_start_time:
-                be = seg.break_end_time or now
-                seg_break = (be - seg.break_start_time).total_seconds() / 3600
-            total_worked += max(0, seg_hours - max(0, seg_break))
-            total_break += max(0, seg_break)
-
-        # Activities
-        lines = db.query(TimesheetLine).filter(TimesheetLine.timesheet_id == ts.id).all()
-        act_strs = []
-        for ln in lines:
-            act = db.query(Activity).filter(Activity.id == ln.activity_id).first()
-            if act:
-                act_strs.append(f"{act.name}: {float(ln.quantity_numeric)} {ln.unit_type}")
-
-        status = "Terminat" if all_checked_out else "Activ"
-
-        ws.cell(row=row, column=1, value=str(ts.date)).border = thin_border
-        ws.cell(row=row, column=2, value=worker.full_name if worker else "N/A").border = thin_border
-        ws.cell(row=row, column=3, value=worker.employee_code if worker else "N/A").border = thin_border
-        ws.cell(row=row, column=4, value=site.name if site else "N/A").border = thin_border
-        ws.cell(row=row, column=5, value=str(first_seg.check_in_time.strftime("%H:%M")) if first_seg.check_in_time else "").border = thin_border
-        ws.cell(row=row, column=6, value=str(last_seg.check_out_time.strftime("%H:%M")) if last_seg.check_out_time else "—").border = thin_border
-        ws.cell(row=row, column=7, value=round(total_worked, 2)).border = thin_border
-        ws.cell(row=row, column=8, value=round(total_break, 2)).border = thin_border
-        ws.cell(row=row, column=9, value=status).border = thin_border
-        ws.cell(row=row, column=10, value="; ".join(act_strs) if act_strs else "—").border = thin_border
-        row += 1
-
-    # Auto-width
-    for col in range(1, len(headers) + 1):
-        max_len = max(len(str(ws.cell(row=r, column=col).value or "")) for r in range(1, row))
-        ws.column_dimensions[ws.cell(row=1, column=col).column_letter].width = min(max_len + 4, 40)
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    filename = f"pontaje_{start}_{end}.xlsx"
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
+    total = ts_query.count() if progress else 0
+    done = 0
+    timesheets = ts_query.order_by(Timesheet.date.desc(), Timesheet.id).yield_per(EXPORT_BATCH)
+    for batch in batched(timesheets, EXPORT_BATCH):
+        ts_ids = [ts.id for ts in batch]
+
+        # Related rows for the whole batch, one query each; segment times
+        # as epoch columns (no segment objects)
+        arrays = shift_metrics.load_segments(db, TimesheetSegment.timesheet_id.in_(ts_ids))
+        spans = arrays.spans()
+        totals_by_ts = shift_metrics.compute(arrays, now, shift_metrics.load_pauses(db, arrays)).totals()
+
+        lines_by_ts = {}
+        for ln in db.query(TimesheetLine).filter(TimesheetLine.timesheet_id.in_(ts_ids)):
+            lines_by_ts.setdefault(ln.timesheet_id, []).append(ln)
+
+        _fill_names(db, workers, User, {ts.owner_user_id for ts in batch})
+        _fill_names(db, sites, ConstructionSite, {span.site_id for span in spans.values()})
+        _fill_names(db, activity_names, Activity,
+                    {ln.activity_id for lines in lines_by_ts.values() for ln in lines})
+
+        for ts in batch:
+            span = spans.get(ts.id)
+            if not span:
+                continue
+
+            worker = workers.get(ts.owner_user_id)
+            site = sites.get(span.site_id)
+
+            total_worked = totals_by_ts[ts.id].worked / 3600
+            total_break = totals_by_ts[ts.id].break_ / 3600
+
+            act_strs = []
+            for ln in lines_by_ts.get(ts.id, []):
+                act = activity_names.get(ln.activity_id)
+                if act:
+                    act_strs.append(f"{act.name}: {float(ln.quantity_numeric or 0)} {ln.unit_type}")
+
+            export.append([
+                str(ts.date),
+                worker.full_name if worker else "N/A",
+                worker.employee_code if worker else "N/A",
+                site.name if site else "N/A",
+                span.check_in.strftime("%H:%M"),
+                span.check_out.strftime("%H:%M") if span.check_out else "—",
+                round(total_worked, 2),
+                round(total_break, 2),
+                "Activ" if span.is_open else "Terminat",
+                "; ".join(act_strs) if act_strs else "—"
+            ])
+        done += len(batch)
+        if progress:
+            progress(done, total)
+
+    return export
+
+
+def _fill_names(db: Session, cache: dict, model, ids: set) -> None:
+    """Load the `model` rows for `ids` not yet in `cache` (one IN query)"""
+    missing = [i for i in ids if i and i not in cache]
+    if missing:
+        for row in db.query(model).filter(model.id.in_(missing)):
+            cache[row.id] = row
 
 
 # ============================================================================
@@ -1828,65 +1608,33 @@ async def export_timesheets_excel(
 # ============================================================================
 
 @router.get("/admin/activities/export/excel")
-async def export_activities_excel(
+def export_activities_excel(
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """Export all activities catalog to Excel"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from fastapi.responses import StreamingResponse
     from app.models import ActivityCategory
-    import io
 
-    categories = db.query(ActivityCategory).filter(
+    cat_map = dict(db.query(ActivityCategory.id, ActivityCategory.name).filter(
         ActivityCategory.organization_id == current_admin.organization_id
-    ).order_by(ActivityCategory.sort_order).all()
+    ).all())
 
     activities = db.query(Activity).filter(
         Activity.organization_id == current_admin.organization_id
-    ).order_by(Activity.sort_order).all()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Activități"
+    ).order_by(Activity.sort_order).yield_per(500)
 
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="7C3AED", end_color="7C3AED", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin')
-    )
-
-    headers = ["Categorie", "Activitate", "Descriere", "Unitate Măsură", "Ordine", "Status"]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=h)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center")
-        cell.border = thin_border
-
-    cat_map = {c.id: c.name for c in categories}
-    row = 2
+    export = XlsxExport("Activități", [
+        Column("Categorie", 24), Column("Activitate", 32), Column("Descriere", 50),
+        Column("Unitate Măsură", 16), Column("Ordine", 10), Column("Status", 10)
+    ], header_color="7C3AED")
     for act in activities:
-        ws.cell(row=row, column=1, value=cat_map.get(act.category_id, "Necategorizat")).border = thin_border
-        ws.cell(row=row, column=2, value=act.name).border = thin_border
-        ws.cell(row=row, column=3, value=act.description or "").border = thin_border
-        ws.cell(row=row, column=4, value=act.unit_type).border = thin_border
-        ws.cell(row=row, column=5, value=act.sort_order or 0).border = thin_border
-        ws.cell(row=row, column=6, value="Activ" if act.is_active else "Inactiv").border = thin_border
-        row += 1
-
-    for col in range(1, len(headers) + 1):
-        max_len = max(len(str(ws.cell(row=r, column=col).value or "")) for r in range(1, row))
-        ws.column_dimensions[ws.cell(row=1, column=col).column_letter].width = min(max_len + 4, 50)
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=activitati.xlsx"}
-    )
+        export.append([
+            cat_map.get(act.category_id, "Necategorizat"),
+            act.name,
+            act.description or "",
+            act.unit_type,
+            act.sort_order or 0,
+            "Activ" if act.is_active else "Inactiv"
+        ])
+
+    return xlsx_response(export, "activitati.xlsx")
@@ -2,8 +2,11 @@
 Authentication utilities and dependencies
 """
 import hashlib
+import time
+from dataclasses import dataclass
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
@@ -11,12 +14,37 @@ from sqlalchemy.orm import Session
 from app.config import settings
 from app.database import get_db
 from app.models import User
+from app import data_version, principal_cache, revocations
 from fastapi.security.http import HTTPAuthorizationCredentials
 
 
 security = HTTPBearer()
 
 
+@dataclass(frozen=True)
+class Claims:
+    """Verified claims of a worker access token (set at login)"""
+    user_id: str
+    organization_id: str
+    role_code: Optional[str]
+    is_employee: bool
+    issued_at: datetime  # UTC
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Who a bearer token belongs to: a worker or an admin account"""
+    kind: str  # "worker" or "admin"
+    id: str
+    organization_id: Optional[str]
+    role_code: Optional[str]  # workers: token claim; admin accounts: "ADMIN"
+    claims: Optional[Claims] = None  # workers only
+
+    @property
+    def is_admin(self) -> bool:
+        return self.kind == "admin"
+
+
 def hash_pin(pin: str) -> str:
     """Hash a 4-digit PIN (simple hash for development)"""
     return hashlib.sha256(pin.encode()).hexdigest()
@@ -30,8 +58,12 @@ def verify_pin(plain_pin: str, hashed_pin: str) -> bool:
 def create_access_token(data: dict) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # iat with microseconds (python-jose would truncate a datetime to whole
+    # seconds): a token issued right after a revocation must not match it
+    iat = now.replace(tzinfo=timezone.utc).timestamp()
+    to_encode.update({"exp": expire, "iat": iat, "type": "access"})
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
@@ -52,31 +84,104 @@ def verify_token(token: str) -> dict:
         return None
 
 
-def get_current_user(
+def _unauthorized(detail: str = "Invalid authentication credentials") -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+def _worker_claims(payload: dict) -> Claims:
+    """Claims of a decoded worker access token (401 for any other token)"""
+    user_id = payload.get("sub")
+    if user_id is None or payload.get("type") != "access" or not payload.get("org_id"):
+        raise _unauthorized()
+    
+    if "iat" in payload:
+        issued_at = datetime.utcfromtimestamp(payload["iat"])
+    else:
+        # Issued before tokens carried iat
+        issued_at = datetime.utcfromtimestamp(payload["exp"]) - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    
+    return Claims(
+        user_id=user_id,
+        organization_id=payload["org_id"],
+        role_code=payload.get("role_code"),
+        is_employee=bool(payload.get("is_employee", True)),
+        issued_at=issued_at
+    )
+
+
+def _decode_principal(token: str, db: Optional[Session]) -> Tuple[Principal, float]:
+    """Decode a bearer token of either kind. Returns the principal and until
+    when it may be cached (epoch seconds)."""
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise _unauthorized()
+    
+    if payload.get("email"):
+        # Admin token (app/api/admin_auth.py): the organization is on the account
+        admin = principal_cache.get_admin(db, payload.get("sub")) if db is not None else None
+        if admin is None or not admin.is_active:
+            raise _unauthorized()
+        # Re-checked as often as get_current_admin's cache (no revocation list for admins)
+        valid_until = min(payload["exp"], time.time() + principal_cache.TTL_SECONDS)
+        return Principal("admin", admin.id, admin.organization_id, "ADMIN"), valid_until
+    
+    claims = _worker_claims(payload)
+    return Principal("worker", claims.user_id, claims.organization_id, claims.role_code, claims), payload["exp"]
+
+
+def resolve_principal(token: str, db: Optional[Session] = None) -> Principal:
+    """Any bearer token → worker or admin principal, cached by token hash
+    until expiry. Revoked worker tokens are rejected on every call.
+    Without `db`, only worker tokens (and cached admin tokens) resolve."""
+    key = hashlib.sha256(token.encode()).digest()
+    principal = principal_cache.get_token(key)
+    if principal is None:
+        principal, valid_until = _decode_principal(token, db)
+        principal_cache.put_token(key, principal, valid_until)
+    
+    if principal.claims and revocations.is_revoked(principal.id, principal.claims.issued_at):
+        raise _unauthorized("Session expired, please log in again")
+    return principal
+
+
+def decode_access_token(token: str) -> Claims:
+    """Verified claims of a worker access token (CPU only).
+    Raises 401 for invalid, expired, admin, refresh or revoked tokens."""
+    claims = resolve_principal(token).claims
+    if claims is None:
+        raise _unauthorized()
+    return claims
+
+
+def get_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Claims:
+    """
+    Verified role / organization claims of the worker — for authorization
+    and scoping without a DB lookup
+    """
+    return decode_access_token(credentials.credentials)
+
+
+def get_principal(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Worker or admin behind the bearer token — for endpoints open to both
+    """
+    principal = resolve_principal(credentials.credentials, db)
+    data_version.track(db, principal.organization_id)
+    return principal
+
+
+def get_current_user(
+    claims: Claims = Depends(get_claims),
+    db: Session = Depends(get_db)
 ) -> User:
     """
     Get current authenticated user from JWT token
     """
-    token = credentials.credentials
-    
-    try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
-    
-    user = db.query(User).filter(User.id == user_id).first()
+    user = principal_cache.get_user(db, claims.user_id)
     
     if user is None or not user.is_active:
         raise HTTPException(
@@ -84,4 +189,5 @@ def get_current_user(
             detail="User not found or inactive"
         )
     
+    data_version.track(db, user.organization_id)
     return user
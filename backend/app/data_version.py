@@ -0,0 +1,109 @@
+"""
+Per-organization data version for conditional GETs of the polled admin views.
+
+Every committed write bumps a counter for the organization that made it.
+The polled endpoints (active workers, notification feed, team status) turn
+the counter into a strong ETag and answer 304 Not Modified while it has not
+moved, so a tab left open all day costs one auth lookup per poll.
+
+Writes are detected on the Session itself (flushes and UPDATE/DELETE/INSERT
+statements, e.g. the sweeper's bulk updates), so write endpoints need no
+extra calls. The organization comes from the principal: get_current_user and
+get_current_admin call track(). A write from a session without a principal
+(sweeper, scheduler, scripts) bumps every organization. Writes that bypass
+the Session (the ping write-behind buffer) do not bump; views that depend on
+time as well as data (GPS loss, running hours) add live_bucket() to the key.
+
+Process-local, like the shift registry: run one web worker.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+LIVE_REFRESH_SECONDS = 120  # same as the GPS-loss threshold of the live views
+
+_ORG_KEY = "data_version_org"
+_WROTE_KEY = "data_version_wrote"
+
+_lock = threading.Lock()
+_by_org: Dict[str, int] = {}
+_global = 0       # moves on every write: views that read all organizations
+_all_orgs = 0     # moves on writes of unknown organization
+_BOOT = uuid.uuid4().hex  # versions restart with the process
+
+
+def track(db: Session, organization_id: Optional[str]) -> None:
+    """Attribute the session's writes to this organization"""
+    db.info[_ORG_KEY] = organization_id
+
+
+def bump(organization_id: Optional[str] = None) -> None:
+    """Invalidate the organization's ETags (None: every organization)"""
+    global _global, _all_orgs
+    with _lock:
+        if organization_id:
+            _by_org[organization_id] = _by_org.get(organization_id, 0) + 1
+        else:
+            _all_orgs += 1
+        _global += 1
+
+
+def version(organization_id: Optional[str] = None) -> str:
+    """Current version of the organization (None: of all the data)"""
+    with _lock:
+        own = _by_org.get(organization_id, 0) if organization_id else _global
+        return f"{_BOOT}:{_all_orgs}:{own}"
+
+
+def live_bucket() -> int:
+    """Time component for views with time-derived fields"""
+    return int(time.time() // LIVE_REFRESH_SECONDS)
+
+
+def conditional(request: Request, response: Response, organization_id: Optional[str], *key) -> Optional[Response]:
+    """Set a strong ETag for the data version plus `key` (endpoint name and
+    parameters). Returns the 304 response to send when the client's copy is
+    current, else None and the caller builds the body.
+
+    Read the version before loading the data: a write that lands in between
+    makes the next poll reload instead of caching stale data under the new tag."""
+    raw = ":".join([version(organization_id)] + [str(k) for k in key])
+    tag = '"' + hashlib.sha1(raw.encode()).hexdigest()[:24] + '"'
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    if tag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# ── Session hooks ──
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_statement(state):
+    if state.is_update or state.is_delete or state.is_insert:
+        state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session):
+    if session.info.pop(_WROTE_KEY, False):
+        bump(session.info.get(_ORG_KEY))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop(_WROTE_KEY, None)
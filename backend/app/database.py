@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
@@ -19,6 +21,33 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url(url: str):
+    """Same database, async driver: aiosqlite locally, asyncpg for PostgreSQL"""
+    url = make_url(url)
+    if url.drivername.startswith("sqlite"):
+        return url.set(drivername="sqlite+aiosqlite")
+    return url.set(drivername="postgresql+asyncpg")
+
+
+# Async engine for routes that must not block the event loop (reports,
+# dashboards, live monitoring). Legacy query code runs on it via
+# `await db.run_sync(fn)`.
+if settings.DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(_async_url(settings.DATABASE_URL))
+else:
+    async_engine = create_async_engine(
+        _async_url(settings.DATABASE_URL),
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        pool_recycle=300,
+        # Supabase pooler (pgbouncer, transaction mode) can't keep prepared statements
+        connect_args={"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+    )
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -29,6 +58,11 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency for async database sessions"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def warmup_pool():
     """Pre-warm the connection pool to avoid cold-start latency."""
     try:
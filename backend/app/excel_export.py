@@ -0,0 +1,131 @@
+"""
+Shared .xlsx export engine.
+
+Exporters describe their columns once and append plain value rows. The sheet
+is written with openpyxl's write-only mode: rows go straight to a temporary
+file instead of a cell tree, and all cells share a handful of named styles
+instead of carrying their own Font/Border objects. Memory therefore stays flat
+no matter how many rows the caller feeds in (feed it from `yield_per` queries,
+not lists). Column widths are declared up front; there is no auto-width pass.
+
+The finished workbook lives in an anonymous temp file and is streamed to the
+client in chunks by xlsx_response().
+"""
+import tempfile
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CHUNK_SIZE = 64 * 1024
+
+_THIN = Side(style="thin")
+_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+
+
+@dataclass
+class Column:
+    """One sheet column: header text and fixed width (in characters)"""
+    title: str
+    width: float = 15
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable (e.g. a yield_per query) into lists of `size` items,
+    so each batch can bulk-load its related rows with one IN query."""
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class XlsxExport:
+    """Write-only single-sheet workbook.
+
+        export = XlsxExport("Pontaje", columns, header_color="2563EB")
+        for row in rows:
+            export.append(row)
+        export.append_total([...])
+        return xlsx_response(export, "pontaje.xlsx")
+    """
+
+    def __init__(self, sheet_title: str, columns: Sequence[Column], header_color: str = "2563EB"):
+        self.columns = list(columns)
+        self.rows = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_title)
+
+        header = NamedStyle(name="pd_header")
+        header.font = Font(bold=True, color="FFFFFF", size=11)
+        header.fill = PatternFill(start_color=header_color, end_color=header_color, fill_type="solid")
+        header.alignment = Alignment(horizontal="center", vertical="center")
+        header.border = _BORDER
+        body = NamedStyle(name="pd_cell")
+        body.border = _BORDER
+        total = NamedStyle(name="pd_total")
+        total.font = Font(bold=True)
+        total.fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
+        total.border = _BORDER
+        for style in (header, body, total):
+            self._wb.add_named_style(style)
+
+        # Widths must be set before the first row in write-only mode
+        for idx, col in enumerate(self.columns, 1):
+            self._ws.column_dimensions[get_column_letter(idx)].width = col.width
+        self._write([c.title for c in self.columns], "pd_header")
+
+    def _write(self, values: Sequence[Any], style: str) -> None:
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(self._ws, value=value)
+            cell.style = style
+            cells.append(cell)
+        self._ws.append(cells)
+
+    def append(self, values: Sequence[Any]) -> None:
+        self._write(values, "pd_cell")
+        self.rows += 1
+
+    def append_total(self, values: Sequence[Any]) -> None:
+        """Bold, shaded closing row (pad with None for empty columns)"""
+        self._write(values, "pd_total")
+
+    def save(self):
+        """Finish the workbook into an anonymous temp file, rewound to the start"""
+        tmp = tempfile.TemporaryFile()
+        self._wb.save(tmp)
+        tmp.seek(0)
+        return tmp
+
+
+def _iter_file(tmp) -> Iterator[bytes]:
+    try:
+        while True:
+            chunk = tmp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        tmp.close()
+
+
+def xlsx_response(export: XlsxExport, filename: str) -> StreamingResponse:
+    """Save `export` and stream it as an attachment (temp file removed when done)"""
+    return xlsx_file_response(export.save(), filename)
+
+
+def xlsx_file_response(tmp, filename: str) -> StreamingResponse:
+    """Stream an already saved workbook temp file (see XlsxExport.save)"""
+    return StreamingResponse(
+        _iter_file(tmp),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,276 @@
+"""
+Background Excel export jobs.
+
+Long exports are built off the web worker: POST /api/admin/exports enqueues
+a job, a bounded process pool builds the workbook with its own DB session and
+stores it via app.storage, and the client polls the job for progress and then
+downloads the file through the API (exports are never served publicly).
+
+Finished files are cached by (kind, filters, data version). The data version
+is a fingerprint of the timesheets, segments and activity lines in the
+range, so the same export over unchanged data is reused instead of rebuilt.
+Ranges with a still-open segment are never cached, because their hours keep
+running.
+
+Job state is process-local, like the shift registry: run one web worker.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Timesheet, TimesheetSegment, TimesheetLine
+from app.storage import upload_file, delete_file
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "10"))
+EXPORT_TTL = int(os.getenv("EXPORT_TTL_HOURS", "6")) * 3600
+
+KINDS = ("timesheets", "report")
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class ExportQueueFull(Exception):
+    pass
+
+
+@dataclass
+class ExportJob:
+    id: str
+    kind: str
+    params: dict
+    organization_id: Optional[str]
+    cache_key: Optional[str]
+    status: str = "queued"          # queued | running | done | failed
+    done: int = 0
+    total: int = 0
+    rows: int = 0
+    path: Optional[str] = None
+    error: Optional[str] = None
+    reused: bool = False
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "progress": round(self.done / self.total, 3) if self.total else (1.0 if self.status == "done" else 0.0),
+            "rows": self.rows,
+            "reused": self.reused,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_lock = threading.Lock()
+_jobs: Dict[str, ExportJob] = {}
+_inflight: Dict[str, str] = {}                 # cache_key -> job id being built
+_artifacts: Dict[str, tuple] = {}              # cache_key -> (path, rows, finished_at)
+_pool: Optional[ProcessPoolExecutor] = None
+_progress_queue = None
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+def _init_worker(queue) -> None:
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _build(job_id: str, kind: str, params: dict):
+    """Runs in a pool process: build the workbook and store it. Returns (path, rows)."""
+    from app.database import SessionLocal
+
+    def progress(done, total):
+        _progress_queue.put((job_id, done, total))
+
+    db = SessionLocal()
+    try:
+        if kind == "timesheets":
+            from app.api.timesheets import build_timesheets_export
+            export = build_timesheets_export(
+                db, date.fromisoformat(params["date_from"]), date.fromisoformat(params["date_to"]),
+                params.get("site_id"), progress=progress
+            )
+        else:
+            from app.api.admin_reports import build_report_export
+            export = build_report_export(
+                db, params.get("date_from"), params.get("date_to"),
+                params.get("employee_id"), params.get("site_id"), progress=progress
+            )
+        tmp = export.save()
+        try:
+            content = tmp.read()
+        finally:
+            tmp.close()
+    finally:
+        db.close()
+
+    path = f"exports/export_{job_id}.xlsx"
+    upload_file(content, path, XLSX_MEDIA_TYPE)
+    return path, export.rows
+
+
+# ---------------------------------------------------------------------------
+# Web process side
+# ---------------------------------------------------------------------------
+
+def data_version(db: Session, date_from: Optional[str], date_to: Optional[str]) -> Optional[str]:
+    """Fingerprint of the export data in a date range, or None while a
+    segment in the range is still open (not cacheable)."""
+    ts_filter = [Timesheet.owner_type == "USER"]
+    if date_from:
+        ts_filter.append(Timesheet.date >= date.fromisoformat(date_from))
+    if date_to:
+        ts_filter.append(Timesheet.date <= date.fromisoformat(date_to))
+    ts_ids = select(Timesheet.id).where(*ts_filter)
+
+    ts_row = db.execute(select(func.count(), func.max(Timesheet.updated_at)).where(*ts_filter)).one()
+    seg_row = db.execute(select(
+        func.count(), func.max(TimesheetSegment.updated_at), func.count(TimesheetSegment.id).filter(
+            TimesheetSegment.check_out_time == None
+        )
+    ).where(TimesheetSegment.timesheet_id.in_(ts_ids))).one()
+    line_row = db.execute(select(func.count(), func.max(TimesheetLine.updated_at)).where(
+        TimesheetLine.timesheet_id.in_(ts_ids)
+    )).one()
+
+    if seg_row[2]:
+        return None
+    return "|".join(str(v) for v in (*ts_row, *seg_row[:2], *line_row))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _progress_queue
+    if _pool is None:
+        # spawn, not fork: the web process runs background threads and holds DB connections
+        ctx = multiprocessing.get_context("spawn")
+        _progress_queue = ctx.Queue()
+        threading.Thread(target=_progress_loop, args=(_progress_queue,), daemon=True).start()
+        _pool = ProcessPoolExecutor(
+            max_workers=EXPORT_WORKERS, mp_context=ctx,
+            initializer=_init_worker, initargs=(_progress_queue,)
+        )
+    return _pool
+
+
+def _progress_loop(queue) -> None:
+    """Background thread: apply progress messages from the pool processes."""
+    while True:
+        message = queue.get()
+        if message is None:
+            break
+        job_id, done, total = message
+        with _lock:
+            job = _jobs.get(job_id)
+            if job and job.status in ("queued", "running"):
+                job.status = "running"
+                job.done, job.total = done, total
+
+
+def _finished(job_id: str, future) -> None:
+    global _pool
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job.finished_at = time.time()
+        if job.cache_key:
+            _inflight.pop(job.cache_key, None)
+        try:
+            job.path, job.rows = future.result()
+        except BrokenProcessPool:
+            job.status, job.error = "failed", "Procesul de export s-a oprit neașteptat"
+            _pool = None
+            return
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+            print(f"⚠️  Export job {job_id} failed: {e}")
+            return
+        job.status = "done"
+        job.done = job.total = job.rows
+        if job.cache_key:
+            _artifacts[job.cache_key] = (job.path, job.rows, job.finished_at)
+
+
+def _prune(now: float) -> None:
+    """Forget old jobs and delete expired files (caller holds _lock)."""
+    for key, (path, _, finished_at) in list(_artifacts.items()):
+        if now - finished_at > EXPORT_TTL:
+            del _artifacts[key]
+            delete_file(path)
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at and now - job.finished_at > EXPORT_TTL:
+            del _jobs[job_id]
+            if job.path and not job.cache_key and not job.reused:
+                delete_file(job.path)
+
+
+def enqueue(kind: str, params: dict, organization_id: Optional[str], version: Optional[str]) -> ExportJob:
+    """Start an export (or reuse a finished / in-flight one for the same data)."""
+    cache_key = None
+    if version is not None:
+        raw = json.dumps([kind, params, version], sort_keys=True)
+        cache_key = hashlib.sha256(raw.encode()).hexdigest()
+
+    now = time.time()
+    with _lock:
+        _prune(now)
+
+        if cache_key in _artifacts:
+            path, rows, _ = _artifacts[cache_key]
+            job = ExportJob(id=str(uuid.uuid4()), kind=kind, params=params, organization_id=organization_id,
+                            cache_key=cache_key, status="done", done=rows, total=rows, rows=rows,
+                            path=path, reused=True, finished_at=now)
+            _jobs[job.id] = job
+            return job
+
+        if cache_key in _inflight:
+            return _jobs[_inflight[cache_key]]
+
+        pending = sum(1 for j in _jobs.values() if j.status in ("queued", "running"))
+        if pending >= MAX_PENDING:
+            raise ExportQueueFull()
+
+        job = ExportJob(id=str(uuid.uuid4()), kind=kind, params=params,
+                        organization_id=organization_id, cache_key=cache_key)
+        _jobs[job.id] = job
+        if cache_key:
+            _inflight[cache_key] = job.id
+
+    future = _get_pool().submit(_build, job.id, kind, params)
+    future.add_done_callback(lambda f: _finished(job.id, f))
+    return job
+
+
+def get_job(job_id: str) -> Optional[ExportJob]:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def stop() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    if _progress_queue is not None:
+        _progress_queue.put(None)
@@ -0,0 +1,181 @@
+"""
+Per-request SQL instrumentation.
+
+Engine events time every statement and attribute it to the HTTP request that
+issued it (via a context variable set by SQLTimingMiddleware). Per request we
+keep the query count, total DB time, the slowest statements and how often
+each statement shape ran. A shape that runs N_PLUS_ONE_THRESHOLD+ times in one
+request is flagged as an N+1 suspect.
+
+Results go out as a `Server-Timing` header and into a ring buffer of recent
+requests served by /api/admin/metrics/requests.
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = 10   # same statement shape this many times in one request
+SLOWEST_KEPT = 5
+RING_SIZE = 500
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so expanded IN lists / whitespace don't split shapes"""
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestStats:
+    """SQL activity of one HTTP request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.status: Optional[int] = None
+        self.duration_ms = 0.0
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.shapes: Dict[str, List[float]] = {}  # shape -> [count, total_ms]
+        self.slowest: List[tuple] = []            # (ms, shape), longest first
+        self._lock = threading.Lock()             # sync routes run in the threadpool
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        shape = statement_shape(statement)
+        with self._lock:
+            self.query_count += 1
+            self.db_ms += elapsed_ms
+            entry = self.shapes.setdefault(shape, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            if len(self.slowest) < SLOWEST_KEPT or elapsed_ms > self.slowest[-1][0]:
+                self.slowest.append((elapsed_ms, shape))
+                self.slowest.sort(key=lambda s: s[0], reverse=True)
+                del self.slowest[SLOWEST_KEPT:]
+
+    def n_plus_one(self) -> List[dict]:
+        return [
+            {"statement": shape, "count": count, "total_ms": round(total, 2)}
+            for shape, (count, total) in sorted(self.shapes.items(), key=lambda kv: -kv[1][0])
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def finish(self, status: Optional[int]) -> None:
+        self.status = status
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+
+    def server_timing(self) -> str:
+        elapsed = (time.perf_counter() - self._t0) * 1000
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries", '
+            f'app;dur={max(0.0, elapsed - self.db_ms):.1f}'
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "query_count": self.query_count,
+            "db_ms": round(self.db_ms, 2),
+            "distinct_statements": len(self.shapes),
+            "slowest": [{"statement": s, "ms": round(ms, 2)} for ms, s in self.slowest],
+            "n_plus_one": self.n_plus_one(),
+        }
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_sql_stats", default=None)
+_recent: deque = deque(maxlen=RING_SIZE)
+_recent_lock = threading.Lock()
+
+
+def recent_requests() -> List[RequestStats]:
+    """Snapshot of the ring buffer, oldest first"""
+    with _recent_lock:
+        return list(_recent)
+
+
+# Start times are keyed by cursor: a statement that raises never reaches
+# after_cursor_execute, and must not shift the timings of later statements
+# on the same pooled connection (handle_error drops its entry).
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", {})[id(cursor)] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_start", {}).pop(id(cursor), None)
+    stats = _current.get()
+    if stats is not None and started is not None:
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def _handle_error(exception_context):
+    conn, context = exception_context.connection, exception_context.execution_context
+    cursor = getattr(context, "cursor", None)  # ExceptionContext.cursor isn't always set
+    if conn is not None and cursor is not None:
+        conn.info.get("query_start", {}).pop(id(cursor), None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the timing hooks (pass async_engine.sync_engine for async engines)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class SQLTimingMiddleware:
+    """Pure ASGI middleware: binds a RequestStats to each HTTP request, adds
+    the Server-Timing header and files the request into the ring buffer."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["method"], scope["path"])
+        token = _current.set(stats)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            stats.finish(status)
+            if stats.query_count:
+                with _recent_lock:
+                    _recent.append(stats)
+                suspects = stats.n_plus_one()
+                if suspects:
+                    logger.warning(
+                        "N+1 suspect: %s %s ran %d queries (%s x%d)",
+                        stats.method, stats.path, stats.query_count,
+                        suspects[0]["statement"][:120], suspects[0]["count"]
+                    )
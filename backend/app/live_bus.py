@@ -0,0 +1,194 @@
+"""
+In-process pub/sub bus behind the admin live stream (/api/admin/live/stream).
+
+Publishers are the shift event log writers (app/shift_events.py): clock-in,
+clock-out, breaks, geofence transitions, activities and the sweeper. Events
+recorded on a session are published when that session commits, so a
+rolled-back change is never pushed. Commits happen on worker threads; they
+hand events to the event loop with call_soon_threadsafe.
+
+One fan-out task on the event loop reads the inbox, keeps each worker's
+break / geofence flags up to date and puts a status delta on the queue of
+every subscriber of that organization. Subscribers never touch the DB for
+deltas. Snapshots (the active-workers payload) are built once per
+organization and data version (see app/data_version.py) and shared by all
+of the organization's subscribers.
+
+The employee clock-in screen subscribes with its user_id and only receives
+its own worker's deltas (app/api/shift_live.py).
+
+A subscriber whose queue fills up (a stalled client) is marked stale and
+gets a fresh snapshot instead of the deltas it missed.
+
+Process-local, like the shift registry: run one web worker.
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import data_version  # noqa: F401  its after_commit hook must run before ours (version first)
+
+QUEUE_SIZE = 500
+
+_PENDING_KEY = "live_bus_pending"
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_inbox: Optional[asyncio.Queue] = None
+_task: Optional[asyncio.Task] = None
+_subscribers: Set["Subscriber"] = set()
+# (organization_id, user_id) -> {"on_break": bool, "outside": bool}
+_flags: Dict[Tuple[str, str], dict] = {}
+
+
+@dataclass(eq=False)
+class Subscriber:
+    organization_id: Optional[str]  # None: every organization
+    user_id: Optional[str] = None   # set: only this worker's events (clock-in screen)
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(QUEUE_SIZE))
+    stale: bool = False
+
+
+def subscribe(organization_id: Optional[str], user_id: Optional[str] = None) -> Subscriber:
+    sub = Subscriber(organization_id, user_id)
+    _subscribers.add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    _subscribers.discard(sub)
+
+
+def subscriber_count() -> int:
+    return len(_subscribers)
+
+
+def sse(event_: str, data) -> str:
+    """One Server-Sent Events message"""
+    return f"event: {event_}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
+# ── Publishing (any thread) ──
+
+def queue_event(db: Session, event_: dict) -> None:
+    """Publish `event_` when `db` commits (dropped on rollback)"""
+    db.info.setdefault(_PENDING_KEY, []).append(event_)
+
+
+def publish(events: List[dict]) -> None:
+    """Hand committed events to the fan-out task (no-op when not running)"""
+    loop, inbox = _loop, _inbox
+    if loop is None or inbox is None or not events:
+        return
+    try:
+        loop.call_soon_threadsafe(inbox.put_nowait, events)
+    except RuntimeError:
+        pass  # loop closed during shutdown
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session):
+    publish(session.info.pop(_PENDING_KEY, None))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ── Fan-out (event loop) ──
+
+def worker_delta(event_: dict) -> dict:
+    """Apply one event to the worker's flags; returns the status delta"""
+    key = (event_["organization_id"], event_["user_id"])
+    type_ = event_["type"]
+    flags = _flags.setdefault(key, {"on_break": False, "outside": False})
+    if type_ == "check_in":
+        flags.update(on_break=False, outside=False)
+    elif type_ == "break_start":
+        flags["on_break"] = True
+    elif type_ == "break_end":
+        flags["on_break"] = False
+    elif type_ == "geofence_exit":
+        flags["outside"] = True
+    elif type_ == "geofence_return":
+        flags["outside"] = False
+
+    if type_ == "check_out":
+        _flags.pop(key, None)
+        status = "terminat"
+    elif flags["outside"]:
+        status = "geofence"
+    elif flags["on_break"]:
+        status = "pauză"
+    else:
+        status = "activ"
+    return {
+        "worker_id": event_["user_id"],
+        "status": status,
+        "is_on_break": status != "terminat" and flags["on_break"],
+        "is_outside_geofence": status != "terminat" and flags["outside"],
+        "event": {
+            "type": type_,
+            "at": str(event_["occurred_at"]),
+            "site_id": event_.get("site_id"),
+            "detail": event_.get("detail"),
+        },
+    }
+
+
+def seed_flags(organization_id: Optional[str], workers: List[dict]) -> None:
+    """Take break / geofence state from a snapshot for workers the bus has not seen"""
+    if not organization_id:
+        return
+    for w in workers:
+        if w["status"] == "terminat":
+            continue
+        key = (organization_id, w["worker_id"])
+        if key not in _flags:
+            _flags[key] = {"on_break": bool(w["is_on_break"]), "outside": bool(w["is_outside_geofence"])}
+
+
+async def _fan_out():
+    while True:
+        events = await _inbox.get()
+        for event_ in events:
+            try:
+                delta = worker_delta(event_)
+            except Exception as e:
+                print(f"⚠️  Live bus error: {e}")
+                continue
+            org_id = event_["organization_id"]
+            for sub in list(_subscribers):
+                if sub.stale or (sub.organization_id and sub.organization_id != org_id):
+                    continue
+                if sub.user_id and sub.user_id != event_["user_id"]:
+                    continue
+                try:
+                    sub.queue.put_nowait(delta)
+                except asyncio.QueueFull:
+                    sub.stale = True  # the stream resends a snapshot
+
+
+def start() -> None:
+    """Start the fan-out task (call from the running event loop)"""
+    global _loop, _inbox, _task
+    _loop = asyncio.get_running_loop()
+    _inbox = asyncio.Queue()
+    _task = _loop.create_task(_fan_out())
+
+
+async def stop() -> None:
+    global _loop, _inbox, _task
+    _loop = None
+    if _task:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = _inbox = None
+    _subscribers.clear()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer, Numeric, Date, Float, Time
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Integer, BigInteger, Numeric, Date, Float, Time, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 import uuid
@@ -127,6 +127,10 @@ class Activity(Base):
 
 class Timesheet(Base):
     __tablename__ = "timesheets"
+    __table_args__ = (
+        Index("ix_timesheets_owner_date_status", "owner_user_id", "date", "status"),  # worker's day / history
+        Index("ix_timesheets_date_owner_type", "date", "owner_type"),  # dashboards, rollups
+    )
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     organization_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
@@ -152,6 +156,12 @@ class Timesheet(Base):
 
 class TimesheetSegment(Base):
     __tablename__ = "timesheet_segments"
+    __table_args__ = (
+        Index("ix_timesheet_segments_timesheet_checkout", "timesheet_id", "check_out_time"),
+        # Open segments only: active shift lookups, registry load, sweeper
+        Index("ix_timesheet_segments_open", "timesheet_id",
+              postgresql_where=text("check_out_time IS NULL"), sqlite_where=text("check_out_time IS NULL")),
+    )
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     timesheet_id = Column(String(36), ForeignKey("timesheets.id", ondelete="CASCADE"), nullable=False)
@@ -175,6 +185,11 @@ class TimesheetSegment(Base):
     distance_from_site = Column(Float)  # meters
     last_ping_at = Column(DateTime)  # last GPS location ping received
     
+    # Running time totals (seconds), maintained by the clock-in transitions
+    break_seconds = Column(Float, default=0, nullable=False)
+    geofence_pause_seconds = Column(Float, default=0, nullable=False)  # closed pauses only
+    worked_seconds = Column(Float, nullable=True)  # set when the segment is closed
+    
     # Overtime tracking
     overtime_minutes = Column(Integer, default=0)  # calculated overtime in minutes
     overtime_approved = Column(Boolean, default=False)
@@ -193,6 +208,11 @@ class GeofencePause(Base):
     """Tracks periods when a worker is outside the geofence radius (>300m from site).
     Hours during these pauses are NOT counted as worked time."""
     __tablename__ = "geofence_pauses"
+    __table_args__ = (
+        Index("idx_geofence_pauses_active", "segment_id", "pause_end"),  # migrations/add_geofence_pauses.sql
+        Index("ix_geofence_pauses_open", "segment_id",
+              postgresql_where=text("pause_end IS NULL"), sqlite_where=text("pause_end IS NULL")),
+    )
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     segment_id = Column(String(36), ForeignKey("timesheet_segments.id", ondelete="CASCADE"), nullable=False)
@@ -208,6 +228,7 @@ class GeofencePause(Base):
 
 class TimesheetLine(Base):
     __tablename__ = "timesheet_lines"
+    __table_args__ = (Index("ix_timesheet_lines_timesheet", "timesheet_id"),)
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     timesheet_id = Column(String(36), ForeignKey("timesheets.id", ondelete="CASCADE"), nullable=False)
@@ -349,6 +370,7 @@ class TeamDailyComposition(Base):
 class SitePhoto(Base):
     """Photos taken by site managers on construction sites"""
     __tablename__ = "site_photos"
+    __table_args__ = (Index("ix_site_photos_site_created", "site_id", "created_at"),)
     
     id = Column(String(36), primary_key=True, default=generate_uuid)
     site_id = Column(String(36), ForeignKey("construction_sites.id", ondelete="CASCADE"), nullable=False)
@@ -359,3 +381,86 @@ class SitePhoto(Base):
     
     site = relationship("ConstructionSite")
     uploaded_by = relationship("User")
+
+
+# Daily rollups (see app/rollups.py): precomputed totals of closed days
+
+class WorkerDayRollup(Base):
+    """Worker × day totals (USER timesheets, closed segments)"""
+    __tablename__ = "rollup_worker_days"
+    __table_args__ = (Index("ix_rollup_worker_days_org_date", "organization_id", "date"),)
+    
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    organization_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    worked_seconds = Column(Float, default=0, nullable=False)
+    break_seconds = Column(Float, default=0, nullable=False)
+    geofence_pause_seconds = Column(Float, default=0, nullable=False)
+    overtime_seconds = Column(Float, default=0, nullable=False)
+    segment_count = Column(Integer, default=0, nullable=False)
+    first_check_in = Column(DateTime)
+    last_check_out = Column(DateTime)
+
+
+class SiteDayRollup(Base):
+    """Site × day headcount and hours"""
+    __tablename__ = "rollup_site_days"
+    __table_args__ = (Index("ix_rollup_site_days_org_date", "organization_id", "date"),)
+    
+    site_id = Column(String(36), ForeignKey("construction_sites.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    organization_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    headcount = Column(Integer, default=0, nullable=False)  # distinct workers
+    worked_seconds = Column(Float, default=0, nullable=False)
+    segment_count = Column(Integer, default=0, nullable=False)
+
+
+class ActivityDayRollup(Base):
+    """Activity × site × day quantities"""
+    __tablename__ = "rollup_activity_days"
+    __table_args__ = (Index("ix_rollup_activity_days_org_date", "organization_id", "date"),)
+    
+    activity_id = Column(String(36), ForeignKey("activities.id", ondelete="CASCADE"), primary_key=True)
+    site_id = Column(String(36), ForeignKey("construction_sites.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    organization_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    unit_type = Column(String(50))
+    quantity = Column(Numeric(14, 4), default=0, nullable=False)
+
+
+class RollupDay(Base):
+    """Days whose rollups are built, with the fingerprint of the source rows"""
+    __tablename__ = "rollup_days"
+    
+    date = Column(Date, primary_key=True)
+    source_version = Column(String(255), nullable=False)
+    built_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Shift event log (see app/shift_events.py): append-only, paged by id
+
+class ShiftEvent(Base):
+    """Something that happened on a shift: check-in/out, break, geofence exit/return, activity"""
+    __tablename__ = "shift_events"
+    __table_args__ = (Index("ix_shift_events_org_id", "organization_id", "id"),)
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)  # feed cursor
+    organization_id = Column(String(36), ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    type = Column(String(30), nullable=False)  # see shift_events.EVENT_TYPES
+    occurred_at = Column(DateTime, nullable=False)  # Romanian time
+    segment_id = Column(String(36))  # no FK: the log outlives edited or deleted segments
+    site_id = Column(String(36), ForeignKey("construction_sites.id", ondelete="SET NULL"))
+    detail = Column(String(255))  # hours, distance or activity, shown after the site name
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Access-token revocations (see app/revocations.py): one row per user
+
+class TokenRevocation(Base):
+    """Worker access tokens issued at or before revoked_at are rejected"""
+    __tablename__ = "token_revocations"
+    
+    user_id = Column(String(36), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    revoked_at = Column(DateTime, nullable=False)  # UTC, like the token iat
+    reason = Column(String(30))  # deactivated, role_changed
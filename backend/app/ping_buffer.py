@@ -0,0 +1,97 @@
+"""
+Write-behind buffer for TimesheetSegment.last_ping_at.
+
+A ping that does not change the geofence state only moves last_ping_at
+forward. Those writes are kept here (latest value per segment) and flushed
+in one executemany every FLUSH_INTERVAL seconds and on shutdown, instead of
+one UPDATE + commit per worker every 30 s.
+
+Readers that need the live value (GPS-loss detection) go through
+latest_ping(), which overlays the buffered value on the stored one.
+Process-local, like the shift registry: run one web worker.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+FLUSH_INTERVAL = int(os.getenv("PING_FLUSH_SECONDS", "30"))
+
+_lock = threading.Lock()
+_pending: Dict[str, datetime] = {}
+_stop = threading.Event()
+
+# Never move last_ping_at backwards (a write-through ping may have landed
+# after the buffered one). Closed segments are still updated: the ping was
+# received while the segment was open.
+_FLUSH_SQL = text(
+    "UPDATE timesheet_segments SET last_ping_at = :at "
+    "WHERE id = :id AND (last_ping_at IS NULL OR last_ping_at < :at)"
+)
+
+
+def record_ping(segment_id: str, at: datetime) -> None:
+    """Buffer a ping; only the latest one per segment is kept"""
+    with _lock:
+        current = _pending.get(segment_id)
+        if current is None or at > current:
+            _pending[segment_id] = at
+
+
+def latest_ping(segment_id: str, stored: Optional[datetime]) -> Optional[datetime]:
+    """Most recent ping for a segment: buffered value or the stored column"""
+    with _lock:
+        buffered = _pending.get(segment_id)
+    if buffered and (stored is None or buffered > stored):
+        return buffered
+    return stored
+
+
+def flush() -> int:
+    """Write every buffered ping in one executemany. Returns rows written."""
+    from app.database import engine
+
+    with _lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(_FLUSH_SQL, [{"id": seg_id, "at": at} for seg_id, at in batch.items()])
+    except Exception:
+        # Put the batch back (newer pings win) and retry on the next tick
+        with _lock:
+            for seg_id, at in batch.items():
+                if seg_id not in _pending or _pending[seg_id] < at:
+                    _pending[seg_id] = at
+        raise
+    return len(batch)
+
+
+def _flush_loop():
+    """Background thread: flush buffered pings every FLUSH_INTERVAL seconds."""
+    while not _stop.wait(FLUSH_INTERVAL):
+        try:
+            flush()
+        except Exception as e:
+            print(f"⚠️  Ping flush error: {e}")
+
+
+def start() -> None:
+    _stop.clear()
+    threading.Thread(target=_flush_loop, daemon=True).start()
+
+
+def stop() -> None:
+    """Stop the flusher and write whatever is still buffered"""
+    _stop.set()
+    try:
+        flushed = flush()
+        if flushed:
+            print(f"📍 Flushed {flushed} buffered pings")
+    except Exception as e:
+        print(f"⚠️  Ping flush error on shutdown: {e}")
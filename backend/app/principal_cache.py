@@ -0,0 +1,147 @@
+"""
+Bounded TTL cache of authenticated principals (users and admins).
+
+get_current_user and get_current_admin used to run a SELECT on every
+request, and many handlers ran a Role query on top. The cache keeps a
+detached snapshot of the User (with its Role) or Admin per id; a hit is
+merged into the request session with load=False, so handlers get a normal
+persistent object (lazy loads, updates) without a query.
+
+Coherence rules:
+- admin_users.py calls drop_user() after every commit that changes a user
+  (edit, role change, deactivate, PIN, photos, contract, import).
+- Entries expire after TTL_SECONDS, which bounds staleness for writes made
+  outside the API (scripts, SQL console).
+- A snapshot loaded while a drop was in flight is not stored (generation
+  check), so an invalidation is never overwritten by an older read.
+At most MAX_ENTRIES per kind, least recently used evicted first.
+
+Decoded bearer tokens (app/auth.py resolve_principal) are kept here too,
+keyed by the token's SHA-256, until the token expires: a repeat request
+skips the JWT decode and the worker / admin fallback.
+
+Process-local, like the shift registry: run one web worker.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+
+from app.models import User, Admin
+
+TTL_SECONDS = 120
+MAX_ENTRIES = 5000
+
+_lock = threading.Lock()
+_users: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+_admins: "OrderedDict[str, Tuple[float, Admin]]" = OrderedDict()
+_tokens: "OrderedDict[bytes, Tuple[float, object]]" = OrderedDict()  # expiry is wall-clock (token exp)
+_generation = 0  # moves on every drop
+
+
+def _detached_copy(obj, **related):
+    """Column copy of a loaded instance (plus `related` objects), detached and
+    clean, so it can be merged with load=False"""
+    mapper = inspect(obj).mapper
+    copy = mapper.class_(**{attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs}, **related)
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _user_snapshot(user: User) -> User:
+    # Role travels with the user: merged along with it, no lazy load
+    return _detached_copy(user, role=_detached_copy(user.role)) if user.role else _detached_copy(user)
+
+
+def _get(cache: OrderedDict, key: str, db: Session, load: Callable, snapshot: Callable):
+    now = time.monotonic()
+    with _lock:
+        entry = cache.get(key)
+        if entry and entry[0] > now:
+            cache.move_to_end(key)
+            cached = entry[1]
+        else:
+            cached = None
+        generation = _generation
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    obj = load()
+    if obj is None:
+        return None
+    copy = snapshot(obj)
+    with _lock:
+        if generation == _generation:
+            cache[key] = (now + TTL_SECONDS, copy)
+            cache.move_to_end(key)
+            while len(cache) > MAX_ENTRIES:
+                cache.popitem(last=False)
+    return obj
+
+
+def get_user(db: Session, user_id: str) -> Optional[User]:
+    """The user (role loaded) bound to `db`: cache hit or one SELECT"""
+    return _get(_users, user_id, db, lambda: db.query(User).options(
+        joinedload(User.role)
+    ).filter(User.id == user_id).first(), _user_snapshot)
+
+
+def get_admin(db: Session, admin_id: str) -> Optional[Admin]:
+    """The admin bound to `db`: cache hit or one SELECT"""
+    return _get(_admins, admin_id, db, lambda: db.query(Admin).filter(
+        Admin.id == admin_id
+    ).first(), _detached_copy)
+
+
+def get_token(key: bytes):
+    """The principal cached for a token hash, or None (unknown or expired)"""
+    with _lock:
+        entry = _tokens.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del _tokens[key]
+            return None
+        _tokens.move_to_end(key)
+        return entry[1]
+
+
+def put_token(key: bytes, principal, expires_at: float) -> None:
+    """Cache a decoded token until `expires_at` (epoch seconds)"""
+    with _lock:
+        _tokens[key] = (expires_at, principal)
+        _tokens.move_to_end(key)
+        while len(_tokens) > MAX_ENTRIES:
+            _tokens.popitem(last=False)
+
+
+def drop_user(user_id: Optional[str]) -> None:
+    """Forget a user so the next request reloads it — call after the commit"""
+    drop_users([user_id] if user_id else [])
+
+
+def drop_users(user_ids) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in user_ids:
+            _users.pop(user_id, None)
+
+
+def drop_admin(admin_id: Optional[str]) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _admins.pop(admin_id, None)
+
+
+def clear() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _users.clear()
+        _admins.clear()
+        _tokens.clear()
@@ -0,0 +1,114 @@
+"""
+In-memory access-token revocation list behind the verified-claims dependency.
+
+Worker access tokens carry role_code and org_id (app/api/auth.py login), and
+get_claims (app/auth.py) trusts them without a DB lookup. What a token
+cannot know is that its user was deactivated or changed role after it was
+issued: those writes call revoke(), which upserts a TokenRevocation row in
+the caller's transaction. Once it commits, the user's tokens issued at or
+before revoked_at are rejected and the worker logs in again for fresh claims.
+Both times keep microseconds (app/auth.py writes a fractional iat), so a
+login right after the revocation, in the same second, is let through.
+
+This process applies its own revocations on commit; the table is synced
+every SYNC_INTERVAL seconds so other web workers / instances follow within
+that time. Access tokens live ACCESS_TOKEN_EXPIRE_MINUTES, so older
+revocations can no longer match a valid token and are pruned by the sync.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import TokenRevocation
+
+SYNC_INTERVAL = 30
+
+_PENDING_KEY = "revocations_pending"
+
+_lock = threading.Lock()
+_revoked: Dict[str, datetime] = {}  # user_id -> revoked_at (UTC)
+_stop = threading.Event()
+
+
+def _horizon() -> datetime:
+    """Revocations older than this cannot match an unexpired token"""
+    return datetime.utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+def revoke(db: Session, user_id: str, reason: str) -> None:
+    """Revoke the user's current tokens when `db` commits (no commit)"""
+    at = datetime.utcnow()
+    db.merge(TokenRevocation(user_id=user_id, revoked_at=at, reason=reason))
+    db.info.setdefault(_PENDING_KEY, {})[user_id] = at
+
+
+def is_revoked(user_id: str, issued_at: datetime) -> bool:
+    at = _revoked.get(user_id)
+    return at is not None and issued_at <= at
+
+
+def _remember(entries: Dict[str, datetime]) -> None:
+    """Merge into the list, keeping the latest revocation per user"""
+    horizon = _horizon()
+    with _lock:
+        for user_id, at in entries.items():
+            if at >= horizon and at > _revoked.get(user_id, datetime.min):
+                _revoked[user_id] = at
+        for user_id in [u for u, at in _revoked.items() if at < horizon]:
+            del _revoked[user_id]
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_on_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _remember(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def sync(db: Session) -> int:
+    """Load revocations from the table and prune expired rows.
+    Returns the number of active revocations."""
+    rows = db.query(TokenRevocation.user_id, TokenRevocation.revoked_at).all()
+    horizon = _horizon()
+    expired = [user_id for user_id, at in rows if at < horizon]
+    if expired:
+        db.query(TokenRevocation).filter(
+            TokenRevocation.user_id.in_(expired),
+            TokenRevocation.revoked_at < horizon
+        ).delete(synchronize_session=False)
+        db.commit()
+    # Merge rather than replace: a local commit may have landed after the read
+    _remember({user_id: at for user_id, at in rows})
+    return len(_revoked)
+
+
+def _sync_loop():
+    """Background thread: pick up other workers' revocations every SYNC_INTERVAL seconds."""
+    from app.database import SessionLocal
+    while not _stop.wait(SYNC_INTERVAL):
+        try:
+            db = SessionLocal()
+            try:
+                sync(db)
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"⚠️  Revocation sync error: {e}")
+
+
+def start() -> None:
+    _stop.clear()
+    threading.Thread(target=_sync_loop, daemon=True).start()
+
+
+def stop() -> None:
+    _stop.set()
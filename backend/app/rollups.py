@@ -0,0 +1,424 @@
+"""
+Daily rollups: worker × day, site × day and activity × site × day totals.
+
+A day is rolled up once it is closed, i.e. it lies before today and none of
+its segments is still open. Each built day is recorded in rollup_days with
+a fingerprint of its source rows (counts + max updated_at of timesheets,
+segments and activity lines). Every REFRESH_INTERVAL seconds the background
+loop recomputes the fingerprints of the last REFRESH_WINDOW_DAYS days and
+rebuilds the days that changed (late edits, deletions, auto clock-outs).
+Older history is (re)built with scripts/rebuild_rollups.py.
+
+Readers (daily_totals, worker_totals, activity_totals) take built days from
+the rollup tables and compute the remaining days (today, still-open days,
+days never built) live from the segments, so results are the same either way.
+"""
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import case, delete, distinct, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Timesheet, TimesheetSegment, TimesheetLine, Activity, GeofencePause,
+    WorkerDayRollup, SiteDayRollup, ActivityDayRollup, RollupDay
+)
+from app.segment_time import epoch, break_pause_overlap_sql, raw_break_seconds_sql, closed_pause_seconds_sql
+from app import shift_metrics
+from app.timezone import now_ro, today_ro
+
+REFRESH_INTERVAL = 600
+REFRESH_WINDOW_DAYS = 14
+
+_stop = threading.Event()
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def _fingerprints(db: Session, start: date, end: date) -> Dict[date, str]:
+    """date -> fingerprint of the USER timesheets, segments and lines of that day"""
+    seg_rows = db.execute(select(
+        Timesheet.date, func.count(distinct(Timesheet.id)), func.max(Timesheet.updated_at),
+        func.count(TimesheetSegment.id), func.max(TimesheetSegment.updated_at)
+    ).outerjoin(
+        TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+    ).where(
+        Timesheet.owner_type == "USER", Timesheet.date >= start, Timesheet.date <= end
+    ).group_by(Timesheet.date)).all()
+    line_rows = dict((d, (n, at)) for d, n, at in db.execute(select(
+        Timesheet.date, func.count(TimesheetLine.id), func.max(TimesheetLine.updated_at)
+    ).join(
+        TimesheetLine, TimesheetLine.timesheet_id == Timesheet.id
+    ).where(
+        Timesheet.owner_type == "USER", Timesheet.date >= start, Timesheet.date <= end
+    ).group_by(Timesheet.date)))
+    return {
+        row[0]: "|".join(str(v) for v in (*row[1:], *line_rows.get(row[0], (0, None))))
+        for row in seg_rows
+    }
+
+
+def _open_days(db: Session, start: date, end: date) -> set:
+    """Days in the range that still have an open segment"""
+    return set(db.execute(select(distinct(Timesheet.date)).join(
+        TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+    ).where(
+        Timesheet.owner_type == "USER", Timesheet.date >= start, Timesheet.date <= end,
+        TimesheetSegment.check_out_time == None
+    )).scalars())
+
+
+_legacy = TimesheetSegment.worked_seconds.is_(None)  # closed before the totals were stored
+
+
+def _break_seconds():
+    """Break seconds of a closed segment: stored, or from the break times of older rows"""
+    return case((_legacy, raw_break_seconds_sql(TimesheetSegment.__table__)),
+                else_=TimesheetSegment.break_seconds)
+
+
+def _pause_seconds():
+    """Geofence pause seconds of a closed segment: stored, or summed from the pauses of older rows"""
+    return case((_legacy, closed_pause_seconds_sql(TimesheetSegment.__table__, GeofencePause.__table__)),
+                else_=TimesheetSegment.geofence_pause_seconds)
+
+
+def _worked_seconds():
+    """Worked seconds of a closed segment; older rows lack the stored totals and
+    are computed from their raw times, like scripts/backfill_segment_totals.py"""
+    raw = (epoch(TimesheetSegment.check_out_time) - epoch(TimesheetSegment.check_in_time)
+           - _break_seconds() - _pause_seconds()
+           + break_pause_overlap_sql(TimesheetSegment.__table__, GeofencePause.__table__))
+    return func.coalesce(TimesheetSegment.worked_seconds, case((raw < 0, 0.0), else_=raw))
+
+
+def build_days(db: Session, days: List[date], versions: Dict[date, str]) -> None:
+    """Replace the rollups of `days` with fresh aggregates (no commit).
+    Every segment of these days must be closed."""
+    if not days:
+        return
+    for table in (WorkerDayRollup, SiteDayRollup, ActivityDayRollup, RollupDay):
+        db.execute(delete(table).where(table.date.in_(days)))
+
+    seg_of_day = (
+        Timesheet.owner_type == "USER",
+        Timesheet.date.in_(days),
+        TimesheetSegment.check_out_time != None
+    )
+    db.execute(insert(WorkerDayRollup).from_select(
+        ["user_id", "date", "organization_id", "worked_seconds", "break_seconds",
+         "geofence_pause_seconds", "overtime_seconds", "segment_count", "first_check_in", "last_check_out"],
+        select(
+            Timesheet.owner_user_id, Timesheet.date, Timesheet.organization_id,
+            func.coalesce(func.sum(_worked_seconds()), 0.0),
+            func.coalesce(func.sum(_break_seconds()), 0.0),
+            func.coalesce(func.sum(_pause_seconds()), 0.0),
+            func.coalesce(func.sum(TimesheetSegment.overtime_minutes), 0) * 60.0,
+            func.count(TimesheetSegment.id),
+            func.min(TimesheetSegment.check_in_time),
+            func.max(TimesheetSegment.check_out_time)
+        ).join(
+            TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+        ).where(*seg_of_day).group_by(
+            Timesheet.owner_user_id, Timesheet.date, Timesheet.organization_id
+        )
+    ))
+    db.execute(insert(SiteDayRollup).from_select(
+        ["site_id", "date", "organization_id", "headcount", "worked_seconds", "segment_count"],
+        select(
+            TimesheetSegment.site_id, Timesheet.date, Timesheet.organization_id,
+            func.count(distinct(Timesheet.owner_user_id)),
+            func.coalesce(func.sum(_worked_seconds()), 0.0),
+            func.count(TimesheetSegment.id)
+        ).join(
+            TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+        ).where(*seg_of_day).group_by(
+            TimesheetSegment.site_id, Timesheet.date, Timesheet.organization_id
+        )
+    ))
+    db.execute(insert(ActivityDayRollup).from_select(
+        ["activity_id", "site_id", "date", "organization_id", "unit_type", "quantity"],
+        select(
+            TimesheetLine.activity_id, TimesheetSegment.site_id, Timesheet.date, Timesheet.organization_id,
+            func.max(TimesheetLine.unit_type),
+            func.coalesce(func.sum(TimesheetLine.quantity_numeric), 0)
+        ).join(
+            TimesheetSegment, TimesheetSegment.id == TimesheetLine.segment_id
+        ).join(
+            Timesheet, Timesheet.id == TimesheetLine.timesheet_id
+        ).where(*seg_of_day).group_by(
+            TimesheetLine.activity_id, TimesheetSegment.site_id, Timesheet.date, Timesheet.organization_id
+        )
+    ))
+    db.execute(insert(RollupDay), [
+        {"date": day, "source_version": versions.get(day, "")} for day in days
+    ])
+
+
+def refresh(db: Session, start: date, end: date, force: bool = False) -> int:
+    """Bring the rollups of closed days in [start, end] up to date (end is
+    capped at yesterday). Returns the number of days rebuilt."""
+    end = min(end, today_ro() - timedelta(days=1))
+    if end < start:
+        return 0
+    versions = _fingerprints(db, start, end)
+    open_days = _open_days(db, start, end)
+    built = dict(db.execute(select(RollupDay.date, RollupDay.source_version).where(
+        RollupDay.date >= start, RollupDay.date <= end
+    )).all())
+
+    # Days that gained an open segment go back to live reads
+    reopened = [day for day in built if day in open_days]
+    if reopened:
+        for table in (WorkerDayRollup, SiteDayRollup, ActivityDayRollup, RollupDay):
+            db.execute(delete(table).where(table.date.in_(reopened)))
+
+    candidates = (set(versions) | set(built)) - open_days
+    stale = sorted(
+        day for day in candidates
+        if force or built.get(day) != versions.get(day, "")
+    )
+    build_days(db, stale, versions)
+    db.commit()
+    return len(stale)
+
+
+def _refresh_loop():
+    """Background thread: roll up recently closed / edited days."""
+    from app.database import SessionLocal
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                today = today_ro()
+                rebuilt = refresh(db, today - timedelta(days=REFRESH_WINDOW_DAYS), today)
+            finally:
+                db.close()
+            if rebuilt:
+                print(f"📊 Rollups: rebuilt {rebuilt} days")
+        except Exception as e:
+            print(f"⚠️  Rollup refresh error: {e}")
+        if _stop.wait(REFRESH_INTERVAL):
+            break
+
+
+def start() -> None:
+    _stop.clear()
+    threading.Thread(target=_refresh_loop, daemon=True).start()
+
+
+def stop() -> None:
+    _stop.set()
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _built_days(db: Session, start: date, end: date) -> set:
+    return set(db.execute(select(RollupDay.date).where(
+        RollupDay.date >= start, RollupDay.date <= end
+    )).scalars())
+
+
+def _live_segments(db: Session, days: Iterable[date], organization_id: Optional[str],
+                   site_id: Optional[str] = None):
+    """(segments, metrics) of the days read live, None without days. The
+    segments carry Timesheet.date, owner_user_id and overtime_minutes in
+    `columns`; times come as epoch columns, no segment objects."""
+    days = list(days)
+    if not days:
+        return None
+    filters = [Timesheet.owner_type == "USER", Timesheet.date.in_(days)]
+    if organization_id:
+        filters.append(Timesheet.organization_id == organization_id)
+    if site_id:
+        filters.append(TimesheetSegment.site_id == site_id)
+    segments = shift_metrics.load_segments(db, *filters, columns=(
+        Timesheet.date, Timesheet.owner_user_id, TimesheetSegment.overtime_minutes
+    ))
+    return segments, shift_metrics.compute(segments, now_ro(), shift_metrics.load_pauses(db, segments))
+
+
+def _days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def daily_totals(db: Session, start: date, end: date, organization_id: Optional[str] = None,
+                 site_id: Optional[str] = None) -> List[dict]:
+    """One entry per day in [start, end]: worked/break/pause/overtime seconds
+    and distinct workers. Closed, built days come from the rollups."""
+    built = _built_days(db, start, end)
+    totals = {day: {"date": day, "worked_seconds": 0.0, "break_seconds": 0.0,
+                    "geofence_pause_seconds": 0.0, "overtime_seconds": 0.0, "workers": 0,
+                    "source": "rollup" if day in built else "live"}
+              for day in _days(start, end)}
+
+    if built:
+        if site_id:
+            query = select(
+                SiteDayRollup.date, func.sum(SiteDayRollup.worked_seconds), literal(0.0), literal(0.0),
+                literal(0.0), func.sum(SiteDayRollup.headcount)
+            ).where(SiteDayRollup.site_id == site_id, SiteDayRollup.date >= start, SiteDayRollup.date <= end)
+            if organization_id:
+                query = query.where(SiteDayRollup.organization_id == organization_id)
+            query = query.group_by(SiteDayRollup.date)
+        else:
+            query = select(
+                WorkerDayRollup.date, func.sum(WorkerDayRollup.worked_seconds),
+                func.sum(WorkerDayRollup.break_seconds), func.sum(WorkerDayRollup.geofence_pause_seconds),
+                func.sum(WorkerDayRollup.overtime_seconds), func.count(WorkerDayRollup.user_id)
+            ).where(WorkerDayRollup.date >= start, WorkerDayRollup.date <= end)
+            if organization_id:
+                query = query.where(WorkerDayRollup.organization_id == organization_id)
+            query = query.group_by(WorkerDayRollup.date)
+        for day, worked, brk, geo, overtime, workers in db.execute(query):
+            day = _as_date(day)
+            if day in built:
+                totals[day].update(worked_seconds=float(worked or 0), break_seconds=float(brk or 0),
+                                   geofence_pause_seconds=float(geo or 0),
+                                   overtime_seconds=float(overtime or 0), workers=int(workers or 0))
+
+    live = [day for day in totals if day not in built]
+    if live:
+        _add_live_days(db, totals, live, organization_id, site_id)
+    return [totals[day] for day in sorted(totals)]
+
+
+def _add_live_days(db: Session, totals: Dict[date, dict], days: List[date],
+                   organization_id: Optional[str], site_id: Optional[str]) -> None:
+    """Add the live totals of `days`: closed segments are summed in SQL, only
+    the (few) open segments are loaded to count their running time."""
+    filters = [Timesheet.owner_type == "USER", Timesheet.date.in_(days)]
+    if organization_id:
+        filters.append(Timesheet.organization_id == organization_id)
+    if site_id:
+        filters.append(TimesheetSegment.site_id == site_id)
+
+    closed = db.execute(select(
+        Timesheet.date,
+        func.sum(_worked_seconds()),
+        func.sum(_break_seconds()),
+        func.sum(_pause_seconds()),
+        func.sum(TimesheetSegment.overtime_minutes) * 60.0
+    ).join(
+        TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+    ).where(*filters, TimesheetSegment.check_out_time != None).group_by(Timesheet.date))
+    for day, worked, brk, geo, overtime in closed:
+        t = totals[_as_date(day)]
+        t["worked_seconds"] += float(worked or 0)
+        if not site_id:
+            t["break_seconds"] += float(brk or 0)
+            t["geofence_pause_seconds"] += float(geo or 0)
+            t["overtime_seconds"] += float(overtime or 0)
+
+    workers = db.execute(select(Timesheet.date, func.count(distinct(Timesheet.owner_user_id))).join(
+        TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+    ).where(*filters).group_by(Timesheet.date))
+    for day, count in workers:
+        totals[_as_date(day)]["workers"] = count
+
+    open_segments = shift_metrics.load_segments(
+        db, *filters, TimesheetSegment.check_out_time == None, columns=(Timesheet.date,)
+    )
+    metrics = shift_metrics.compute(open_segments, now_ro(), shift_metrics.load_pauses(db, open_segments))
+    for day, times in metrics.totals([_as_date(d) for d in open_segments.columns[0]]).items():
+        t = totals[day]
+        t["worked_seconds"] += times.worked
+        if not site_id:
+            t["break_seconds"] += times.break_
+            t["geofence_pause_seconds"] += times.geofence
+
+
+def worker_totals(db: Session, start: date, end: date, organization_id: Optional[str] = None) -> Dict[str, dict]:
+    """user_id -> totals over [start, end] (days worked, worked/break/pause/overtime seconds)"""
+    built = _built_days(db, start, end)
+    result = defaultdict(lambda: {"days": 0, "worked_seconds": 0.0, "break_seconds": 0.0,
+                                  "geofence_pause_seconds": 0.0, "overtime_seconds": 0.0})
+    if built:
+        query = select(
+            WorkerDayRollup.user_id, func.count(WorkerDayRollup.date), func.sum(WorkerDayRollup.worked_seconds),
+            func.sum(WorkerDayRollup.break_seconds), func.sum(WorkerDayRollup.geofence_pause_seconds),
+            func.sum(WorkerDayRollup.overtime_seconds)
+        ).where(WorkerDayRollup.date >= start, WorkerDayRollup.date <= end)
+        if organization_id:
+            query = query.where(WorkerDayRollup.organization_id == organization_id)
+        for user_id, days, worked, brk, geo, overtime in db.execute(query.group_by(WorkerDayRollup.user_id)):
+            r = result[user_id]
+            r["days"] += days
+            r["worked_seconds"] += float(worked or 0)
+            r["break_seconds"] += float(brk or 0)
+            r["geofence_pause_seconds"] += float(geo or 0)
+            r["overtime_seconds"] += float(overtime or 0)
+
+    live = _live_segments(db, set(_days(start, end)) - built, organization_id)
+    if live:
+        segments, metrics = live
+        days, user_ids, overtime = segments.columns
+        for user_id, times in metrics.totals(user_ids).items():
+            r = result[user_id]
+            r["worked_seconds"] += times.worked
+            r["break_seconds"] += times.break_
+            r["geofence_pause_seconds"] += times.geofence
+        live_days = defaultdict(set)
+        for day, user_id, minutes, is_open in zip(days, user_ids, overtime, np.isnan(segments.check_out).tolist()):
+            if not is_open:
+                result[user_id]["overtime_seconds"] += (minutes or 0) * 60.0
+            live_days[user_id].add(day)
+        for user_id, worked_days in live_days.items():
+            result[user_id]["days"] += len(worked_days)
+    return dict(result)
+
+
+def activity_totals(db: Session, start: date, end: date, organization_id: Optional[str] = None,
+                    site_id: Optional[str] = None) -> List[dict]:
+    """Activity quantities over [start, end]: [{activity_id, name, unit_type, quantity}]"""
+    built = _built_days(db, start, end)
+    totals: Dict[str, dict] = {}
+
+    def add(activity_id, unit_type, quantity):
+        entry = totals.setdefault(activity_id, {"activity_id": activity_id, "unit_type": unit_type, "quantity": 0.0})
+        entry["quantity"] += float(quantity or 0)
+
+    if built:
+        query = select(
+            ActivityDayRollup.activity_id, func.max(ActivityDayRollup.unit_type), func.sum(ActivityDayRollup.quantity)
+        ).where(ActivityDayRollup.date >= start, ActivityDayRollup.date <= end)
+        if organization_id:
+            query = query.where(ActivityDayRollup.organization_id == organization_id)
+        if site_id:
+            query = query.where(ActivityDayRollup.site_id == site_id)
+        for row in db.execute(query.group_by(ActivityDayRollup.activity_id)):
+            add(*row)
+
+    live = [d for d in _days(start, end) if d not in built]
+    if live:
+        query = select(
+            TimesheetLine.activity_id, func.max(TimesheetLine.unit_type), func.sum(TimesheetLine.quantity_numeric)
+        ).join(
+            Timesheet, Timesheet.id == TimesheetLine.timesheet_id
+        ).where(Timesheet.owner_type == "USER", Timesheet.date.in_(live))
+        if organization_id:
+            query = query.where(Timesheet.organization_id == organization_id)
+        if site_id:
+            query = query.join(
+                TimesheetSegment, TimesheetSegment.id == TimesheetLine.segment_id
+            ).where(TimesheetSegment.site_id == site_id)
+        for row in db.execute(query.group_by(TimesheetLine.activity_id)):
+            add(*row)
+
+    if totals:
+        names = dict(db.execute(select(Activity.id, Activity.name).where(Activity.id.in_(list(totals)))).all())
+        for activity_id, entry in totals.items():
+            entry["name"] = names.get(activity_id, "—")
+    return sorted(totals.values(), key=lambda e: -e["quantity"])
+
+
+def _as_date(value) -> date:
+    """SQLite returns grouped DATE columns as strings"""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
@@ -0,0 +1,56 @@
+"""
+Database schema version, owned by the Alembic chain in alembic/versions/.
+
+Migrations run once per deploy (migrate.py, Render's preDeployCommand). The
+web process only checks the database's revision at boot: one small query,
+where create_all used to look up every table over the network before the
+app could serve traffic.
+"""
+from pathlib import Path
+from typing import Optional
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from alembic.util import CommandError
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def alembic_config() -> Config:
+    """alembic.ini, usable from any working directory"""
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    """Revision the database is at, None if it has no migration history"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        return None  # no alembic_version table
+
+
+def check(engine: Engine) -> str:
+    """Revision of the database; raises RuntimeError if migrations are missing.
+    A revision this code doesn't know is let through: a newer release has
+    already migrated the database and this one is still running."""
+    current, head = current_revision(engine), head_revision()
+    if current == head:
+        return current
+    if current is None:
+        raise RuntimeError("Database has no migration history: run `python migrate.py`")
+    try:
+        ScriptDirectory.from_config(alembic_config()).get_revision(current)
+    except CommandError:
+        print(f"⚠️  Database schema {current} is newer than this release ({head})")
+        return current
+    raise RuntimeError(f"Database schema is at {current}, this release needs {head}: run `python migrate.py`")
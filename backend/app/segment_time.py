@@ -0,0 +1,136 @@
+"""
+Worked-time bookkeeping for timesheet segments.
+
+TimesheetSegment carries running totals (break_seconds, geofence_pause_seconds,
+worked_seconds) kept up to date by the clock-in transitions, so readers no
+longer rescan breaks and GeofencePause rows. On a closed segment the totals
+are final. On an open one they cover finished intervals only; the running
+break or geofence pause is added at read time by app/shift_metrics.py.
+
+Geofence pause time that falls inside the meal break is counted once: the
+worked time of a closed segment is elapsed - break - pauses + overlap.
+
+Segments closed before the totals existed keep worked_seconds NULL (and the
+column defaults, 0, as break / pause totals) until
+scripts/backfill_segment_totals.py runs. Readers treat those as legacy and
+compute all three from the raw times and pauses, like the backfill does.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Float, case, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from app.models import TimesheetSegment, GeofencePause
+
+
+class epoch(FunctionElement):
+    """Seconds since the epoch for a DATETIME expression (dialect-aware)"""
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(epoch)
+def _epoch_default(element, compiler, **kw):
+    return "EXTRACT(EPOCH FROM %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(epoch, "sqlite")
+def _epoch_sqlite(element, compiler, **kw):
+    # julianday() counts from 4714 BC (2440587.5 = 1970-01-01) and keeps
+    # milliseconds; rounding drops the float noise of the day fraction
+    return "round((julianday(%s) - 2440587.5) * 86400.0, 3)" % compiler.process(element.clauses, **kw)
+
+
+def break_pause_overlap(db: Session, seg: TimesheetSegment) -> float:
+    """Seconds of the segment's closed geofence pauses that fall inside its
+    meal break. They count once, as break, not twice."""
+    if not seg.break_start_time or not seg.break_end_time:
+        return 0.0
+    pauses = db.query(GeofencePause.pause_start, GeofencePause.pause_end).filter(
+        GeofencePause.segment_id == seg.id,
+        GeofencePause.pause_end != None,
+        GeofencePause.pause_start < seg.break_end_time,
+        GeofencePause.pause_end > seg.break_start_time
+    ).all()
+    return sum(
+        max(0.0, (min(end, seg.break_end_time) - max(start, seg.break_start_time)).total_seconds())
+        for start, end in pauses
+    )
+
+
+def break_pause_overlap_sql(seg, gp):
+    """SQL twin of break_pause_overlap() for set-based UPDATEs of the
+    timesheet_segments table `seg` (gp = geofence_pauses table)"""
+    start = case((gp.c.pause_start > seg.c.break_start_time, gp.c.pause_start), else_=seg.c.break_start_time)
+    end = case((gp.c.pause_end < seg.c.break_end_time, gp.c.pause_end), else_=seg.c.break_end_time)
+    return select(func.coalesce(func.sum(epoch(end) - epoch(start)), 0.0)).where(
+        gp.c.segment_id == seg.c.id,
+        gp.c.pause_end.isnot(None),
+        gp.c.pause_start < seg.c.break_end_time,
+        gp.c.pause_end > seg.c.break_start_time
+    ).scalar_subquery()
+
+
+def raw_break_seconds_sql(seg):
+    """Meal break of each row of the timesheet_segments table `seg`, from its
+    start / end times (0 without a finished break)"""
+    return case(
+        (seg.c.break_start_time.isnot(None) & seg.c.break_end_time.isnot(None),
+         epoch(seg.c.break_end_time) - epoch(seg.c.break_start_time)),
+        else_=0.0
+    )
+
+
+def closed_pause_seconds_sql(seg, gp):
+    """Sum of the closed geofence pauses of each row of `seg`, from the
+    geofence_pauses table `gp`"""
+    return select(
+        func.coalesce(func.sum(epoch(gp.c.pause_end) - epoch(gp.c.pause_start)), 0.0)
+    ).where(
+        gp.c.segment_id == seg.c.id,
+        gp.c.pause_end.isnot(None)
+    ).scalar_subquery()
+
+
+def refresh_totals(seg: TimesheetSegment, overlap: float = 0.0) -> None:
+    """Recompute break_seconds and, for a closed segment, worked_seconds.
+    geofence_pause_seconds is accumulated as pauses close and kept as is;
+    `overlap` (see break_pause_overlap) is the pause time already inside the break."""
+    if seg.break_start_time and seg.break_end_time:
+        seg.break_seconds = max(0.0, (seg.break_end_time - seg.break_start_time).total_seconds())
+    else:
+        seg.break_seconds = 0.0
+    if seg.check_out_time and seg.check_in_time:
+        elapsed = (seg.check_out_time - seg.check_in_time).total_seconds()
+        seg.worked_seconds = max(0.0, elapsed - seg.break_seconds - (seg.geofence_pause_seconds or 0.0) + overlap)
+    else:
+        seg.worked_seconds = None
+
+
+def close_segment(db: Session, seg: TimesheetSegment, at: datetime,
+                  open_pauses: Optional[List[GeofencePause]] = None) -> None:
+    """Check a segment out at `at`: end a running break, close open geofence
+    pauses and finalize the totals (no commit). Pass `open_pauses` when the
+    caller already has them loaded."""
+    seg.check_out_time = at
+    if seg.break_start_time and not seg.break_end_time:
+        seg.break_end_time = at
+    if open_pauses is None:
+        open_pauses = db.query(GeofencePause).filter(
+            GeofencePause.segment_id == seg.id,
+            GeofencePause.pause_end == None
+        ).all()
+    closed_here = False
+    for gp in open_pauses:
+        if gp.pause_end is None:
+            gp.pause_end = at
+            closed_here = True
+            seg.geofence_pause_seconds = (seg.geofence_pause_seconds or 0.0) + max(
+                0.0, (at - gp.pause_start).total_seconds()
+            )
+    if closed_here and seg.break_start_time:
+        db.flush()  # the overlap query must see the pauses closed above
+    refresh_totals(seg, break_pause_overlap(db, seg))
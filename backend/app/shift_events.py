@@ -0,0 +1,121 @@
+"""
+Append-only shift event log behind the admin notification feed.
+
+The clock-in, clock-out, break, geofence and activity endpoints (and the
+sweeper's auto clock-out) append one ShiftEvent row in the same transaction
+as the change itself. Rows are never updated; the feed reads them by id:
+
+  feed(after=N)    events newer than cursor N: what a poll needs
+  feed(before=N)   the page of history older than N
+  feed()           the latest page
+
+Each is a range scan of ix_shift_events_org_id (organization_id, id), so a
+poll costs a few rows instead of rebuilding the day from segments. Names
+(worker, site) are joined at read time. Committed events are also pushed to
+the admin live stream (app/live_bus.py).
+
+Ids come from a sequence, so a transaction that commits a lower id after a
+higher one was read is skipped by `after`. Events are appended at the end of
+short request transactions, which keeps that window to milliseconds; a full
+reload (feed() without a cursor) shows such an event.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import ShiftEvent, User, ConstructionSite
+from app import live_bus
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# type -> (icon, message); "{name}" is the worker
+EVENT_TYPES: Dict[str, tuple] = {
+    "check_in": ("🟢", "{name} a intrat pe șantier"),
+    "check_out": ("🔴", "{name} a ieșit de pe șantier"),
+    "break_start": ("☕", "{name} a intrat în pauză"),
+    "break_end": ("🔄", "{name} a revenit din pauză"),
+    "geofence_exit": ("🚷", "{name} a ieșit din raza șantierului"),
+    "geofence_return": ("📍", "{name} a revenit în raza șantierului"),
+    "activity_added": ("🛠️", "{name} a adăugat o activitate"),
+}
+
+
+def record(db: Session, type_: str, organization_id: str, user_id: str, at: datetime,
+           segment_id: Optional[str] = None, site_id: Optional[str] = None,
+           detail: Optional[str] = None) -> None:
+    """Append one event (no commit: it is written with the caller's change)"""
+    row = dict(organization_id=organization_id, user_id=user_id, type=type_, occurred_at=at,
+               segment_id=segment_id, site_id=site_id, detail=detail)
+    db.add(ShiftEvent(**row))
+    live_bus.queue_event(db, row)
+
+
+def record_many(db: Session, events: List[dict]) -> None:
+    """Append events given as column dicts, in one executemany (no commit)"""
+    if events:
+        now = datetime.utcnow()
+        db.execute(insert(ShiftEvent.__table__), [{"created_at": now, **e} for e in events])
+        for e in events:
+            live_bus.queue_event(db, e)
+
+
+def hours_detail(start: datetime, end: datetime) -> str:
+    return f"{round((end - start).total_seconds() / 3600, 1)}h"
+
+
+def feed(db: Session, organization_id: Optional[str], after: Optional[int] = None,
+         before: Optional[int] = None, limit: int = PAGE_SIZE) -> dict:
+    """A page of the organization's events, newest first.
+
+    `cursor` is the newest id the client has seen (pass it back as `after`),
+    `oldest` the id to pass as `before` for the previous page. `has_more`:
+    with `after`, more new events are waiting; otherwise, older pages exist."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    q = db.query(
+        ShiftEvent.id, ShiftEvent.type, ShiftEvent.occurred_at, ShiftEvent.detail,
+        User.full_name, User.avatar_path, ConstructionSite.name
+    ).join(User, User.id == ShiftEvent.user_id).outerjoin(
+        ConstructionSite, ConstructionSite.id == ShiftEvent.site_id
+    )
+    if organization_id:
+        q = q.filter(ShiftEvent.organization_id == organization_id)
+
+    if after is not None:
+        # Oldest new events first, so a capped page still advances the cursor without gaps
+        rows = q.filter(ShiftEvent.id > after).order_by(ShiftEvent.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    else:
+        if before is not None:
+            q = q.filter(ShiftEvent.id < before)
+        rows = q.order_by(ShiftEvent.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+    events = []
+    for event_id, type_, occurred_at, detail, full_name, avatar_path, site_name in rows:
+        icon, message = EVENT_TYPES.get(type_, ("•", "{name}"))
+        name = full_name or "Necunoscut"
+        site_name = site_name or "Necunoscut"
+        events.append({
+            "id": event_id,
+            "type": type_,
+            "icon": icon,
+            "message": message.format(name=name),
+            "detail": f"{site_name} — {detail}" if detail else site_name,
+            "time": str(occurred_at),
+            "timestamp": occurred_at.timestamp(),
+            "worker_name": name,
+            "avatar_path": avatar_path
+        })
+
+    return {
+        "events": events,
+        "total": len(events),
+        "cursor": events[0]["id"] if events else after,
+        "oldest": events[-1]["id"] if events else before,
+        "has_more": has_more
+    }
@@ -0,0 +1,303 @@
+"""
+Vectorized worked / break / pause time for batches of segments.
+
+Every endpoint that shows hours feeds its segments through compute() instead
+of looping over them, so all of them apply the same rules:
+
+  elapsed   check-in → check-out (open segments: → now)
+  break_    meal break; a running break counts up to now
+  geofence  closed pauses (stored total) + the running pause of an open segment
+  overlap   part of the geofence pauses that falls inside the meal break
+  worked    elapsed - break_ - geofence + overlap  (never below zero)
+
+A closed segment keeps the worked_seconds stored when it was closed. That
+value follows the same rule (see segment_time.close_segment), so closed
+segments need no pause rows at all. Pauses are loaded, in one query, only
+for open segments and for closed ones without a stored total. The latter
+were closed before the totals were stored (their break / pause columns hold
+the defaults), so their break and pauses are taken from the raw times, as
+scripts/backfill_segment_totals.py does.
+
+Segments are turned into SegmentArrays: float64 seconds since the epoch, with
+NaN for missing values. The arrays come either from loaded segments
+(SegmentArrays.of) or straight from SQL (load_segments, which selects epoch
+seconds and creates no ORM or datetime objects). All per-segment values, and
+the per-key totals (np.bincount), come out of a handful of NumPy operations.
+Reports and dashboards, which read whole date ranges, use load_segments;
+metrics_for is for the few segments a one-worker view has already loaded.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Timesheet, TimesheetSegment, GeofencePause
+from app.segment_time import epoch
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass
+class SegmentTimes:
+    """Durations of one segment, in seconds"""
+    elapsed: float
+    break_: float
+    geofence: float
+    worked: float
+
+
+@dataclass
+class Totals:
+    """Summed durations of a group of segments, in seconds"""
+    worked: float = 0.0
+    break_: float = 0.0
+    geofence: float = 0.0
+
+
+@dataclass
+class Span:
+    """First and last segment of a timesheet"""
+    check_in: datetime              # first check-in
+    check_out: Optional[datetime]   # check-out of the last segment, None while it is open
+    site_id: str                    # site of the first segment
+    is_open: bool                   # some segment is still open
+
+
+def _seconds(values: Sequence[Optional[datetime]]) -> np.ndarray:
+    """Naive datetimes -> float64 seconds since the epoch, None -> NaN.
+    (Plain subtraction; np.array(dtype="datetime64") is ~6x slower on lists.)"""
+    return np.array([np.nan if v is None else (v - _EPOCH).total_seconds() for v in values],
+                    dtype=np.float64)
+
+
+def _floats(values: Sequence[Optional[float]]) -> np.ndarray:
+    """Numbers -> float64, None -> NaN"""
+    return np.array(values, dtype=np.float64)
+
+
+def _datetime(seconds: float) -> datetime:
+    """Epoch seconds -> naive datetime (inverse of _seconds)"""
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+@dataclass
+class SegmentArrays:
+    """Columnar segments: one entry per segment, times in epoch seconds"""
+    ids: List[str]
+    timesheet_ids: List[str]
+    site_ids: List[str]
+    check_in: np.ndarray
+    check_out: np.ndarray           # NaN while open
+    break_start: np.ndarray
+    break_end: np.ndarray
+    break_seconds: np.ndarray       # stored totals
+    geofence_seconds: np.ndarray
+    worked_seconds: np.ndarray      # NaN unless closed with a stored total
+    columns: List[list] = field(default_factory=list)  # extra columns of load_segments
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def of(cls, segments: Sequence) -> "SegmentArrays":
+        """From loaded TimesheetSegment objects (or rows with the same attributes)"""
+        return cls(
+            ids=[s.id for s in segments],
+            timesheet_ids=[s.timesheet_id for s in segments],
+            site_ids=[s.site_id for s in segments],
+            check_in=_seconds([s.check_in_time for s in segments]),
+            check_out=_seconds([s.check_out_time for s in segments]),
+            break_start=_seconds([s.break_start_time for s in segments]),
+            break_end=_seconds([s.break_end_time for s in segments]),
+            break_seconds=_floats([s.break_seconds for s in segments]),
+            geofence_seconds=_floats([s.geofence_pause_seconds for s in segments]),
+            worked_seconds=_floats([s.worked_seconds for s in segments]),
+        )
+
+    def needs_pauses(self) -> List[str]:
+        """Ids of the segments whose worked time is computed live"""
+        live = np.isnan(self.check_out) | np.isnan(self.worked_seconds)
+        return [self.ids[i] for i in np.flatnonzero(live)]
+
+    def spans(self) -> Dict[str, Span]:
+        """timesheet_id -> first / last segment, by check-in"""
+        if not len(self):
+            return {}
+        code_of = {}
+        codes = np.array([code_of.setdefault(t, len(code_of)) for t in self.timesheet_ids], dtype=np.intp)
+        order = np.lexsort((self.check_in, codes))
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        first = order[starts].tolist()
+        last = order[np.r_[starts[1:], len(order)] - 1].tolist()
+        open_count = np.bincount(codes, weights=np.isnan(self.check_out), minlength=len(code_of)).tolist()
+        timesheet_ids = list(code_of)
+        spans = {}
+        for code, i, j in zip(sorted_codes[starts].tolist(), first, last):
+            check_out = self.check_out[j]
+            spans[timesheet_ids[code]] = Span(
+                check_in=_datetime(self.check_in[i]),
+                check_out=None if np.isnan(check_out) else _datetime(check_out),
+                site_id=self.site_ids[i],
+                is_open=open_count[code] > 0,
+            )
+        return spans
+
+
+@dataclass
+class PauseArrays:
+    """Columnar geofence pauses; `seg` indexes into the SegmentArrays"""
+    seg: np.ndarray
+    start: np.ndarray
+    end: np.ndarray                 # NaN while open
+
+    def running(self, segments: SegmentArrays) -> set:
+        """Ids of the segments with a pause still running"""
+        return {segments.ids[i] for i in self.seg[np.isnan(self.end)].tolist()}
+
+
+def load_segments(db: Session, *filters, columns: Sequence = ()) -> SegmentArrays:
+    """SegmentArrays straight from SQL (epoch seconds, no ORM objects).
+    Extra `columns` (e.g. Timesheet.date) are selected per segment, with the
+    timesheet joined, and land in SegmentArrays.columns."""
+    seg = TimesheetSegment
+    query = select(
+        seg.id, seg.timesheet_id, seg.site_id,
+        epoch(seg.check_in_time), epoch(seg.check_out_time),
+        epoch(seg.break_start_time), epoch(seg.break_end_time),
+        seg.break_seconds, seg.geofence_pause_seconds, seg.worked_seconds,
+        *columns
+    )
+    if columns:
+        query = query.join(Timesheet, Timesheet.id == seg.timesheet_id)
+    rows = db.execute(query.where(*filters)).all()  # Core rows: cheaper than Query's
+    cols = list(zip(*rows)) if rows else [()] * (10 + len(columns))
+    return SegmentArrays(list(cols[0]), list(cols[1]), list(cols[2]),
+                         *(_floats(c) for c in cols[3:10]), columns=[list(c) for c in cols[10:]])
+
+
+def load_pauses(db: Session, segments: SegmentArrays) -> PauseArrays:
+    """Pauses of the segments whose worked time is computed live: open ones
+    and closed ones without a stored total (one query)"""
+    ids = segments.needs_pauses()
+    rows = db.query(
+        GeofencePause.segment_id, epoch(GeofencePause.pause_start), epoch(GeofencePause.pause_end)
+    ).filter(GeofencePause.segment_id.in_(ids)).all() if ids else []
+    return pauses_of(segments, rows)
+
+
+def pauses_of(segments: SegmentArrays, rows: Sequence[tuple]) -> PauseArrays:
+    """PauseArrays from (segment_id, start, end) rows; start / end are epoch
+    seconds or datetimes, pauses of other segments are skipped"""
+    index = {seg_id: i for i, seg_id in enumerate(segments.ids)}
+    rows = [r for r in rows if r[0] in index]
+    to_array = _seconds if rows and isinstance(rows[0][1], datetime) else _floats
+    return PauseArrays(
+        seg=np.array([index[r[0]] for r in rows], dtype=np.intp),
+        start=to_array([r[1] for r in rows]),
+        end=to_array([r[2] for r in rows]),
+    )
+
+
+class ShiftMetrics:
+    """Per-segment durations (arrays aligned with the input segments)"""
+
+    def __init__(self, segments: SegmentArrays, elapsed, break_, geofence, overlap, worked):
+        self.segments = segments
+        self.elapsed = elapsed
+        self.break_ = break_
+        self.geofence = geofence
+        self.overlap = overlap
+        self.worked = worked
+        self._index = None
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def at(self, i: int) -> SegmentTimes:
+        return SegmentTimes(float(self.elapsed[i]), float(self.break_[i]),
+                            float(self.geofence[i]), float(self.worked[i]))
+
+    def of(self, segment_id: str) -> SegmentTimes:
+        """Durations of the segment with this id"""
+        if self._index is None:
+            self._index = {seg_id: i for i, seg_id in enumerate(self.segments.ids)}
+        return self.at(self._index[segment_id])
+
+    def totals(self, keys: Optional[Sequence[Hashable]] = None) -> Dict[Hashable, Totals]:
+        """Sum worked / break / geofence per key: one key per segment,
+        by default its timesheet_id. Break and pause are floored at zero."""
+        if not len(self):
+            return {}
+        if keys is None:
+            keys = self.segments.timesheet_ids
+        code_of = {}
+        codes = np.array([code_of.setdefault(key, len(code_of)) for key in keys], dtype=np.intp)
+        size = len(code_of)
+        worked = np.bincount(codes, weights=self.worked, minlength=size).tolist()
+        brk = np.bincount(codes, weights=np.maximum(self.break_, 0.0), minlength=size).tolist()
+        geo = np.bincount(codes, weights=np.maximum(self.geofence, 0.0), minlength=size).tolist()
+        return {key: Totals(worked[i], brk[i], geo[i]) for key, i in code_of.items()}
+
+    def total(self) -> Totals:
+        return Totals(float(self.worked.sum()), float(np.maximum(self.break_, 0.0).sum()),
+                      float(np.maximum(self.geofence, 0.0).sum()))
+
+
+def compute(segments: SegmentArrays, now: datetime, pauses: Optional[PauseArrays] = None) -> ShiftMetrics:
+    """Durations of every segment, as of `now`"""
+    n = len(segments)
+    now_s = (now - _EPOCH).total_seconds()
+    s = segments
+
+    is_open = np.isnan(s.check_out)
+    end = np.where(is_open, now_s, s.check_out)
+    elapsed = end - s.check_in
+
+    # Closed before the totals were stored: stored break / pause are not usable
+    legacy = ~is_open & np.isnan(s.worked_seconds)
+
+    running_break = is_open & ~np.isnan(s.break_start) & np.isnan(s.break_end)
+    break_ = np.where(running_break, now_s - s.break_start, np.nan_to_num(s.break_seconds))
+    break_ = np.where(legacy, np.nan_to_num(s.break_end - s.break_start), break_)
+    geofence = np.where(legacy, 0.0, np.nan_to_num(s.geofence_seconds))
+    overlap = np.zeros(n)
+
+    if pauses is not None and len(pauses.seg):
+        p = pauses
+        # Running pause of an open segment (closed pauses are in the stored total),
+        # every closed pause of a legacy segment
+        running = np.isnan(p.end) & is_open[p.seg]
+        closed = ~np.isnan(p.end) & legacy[p.seg]
+        geofence = geofence + np.bincount(
+            p.seg[running], weights=np.maximum(now_s - p.start[running], 0.0), minlength=n
+        ) + np.bincount(p.seg[closed], weights=p.end[closed] - p.start[closed], minlength=n)
+
+        # Pause time inside the meal break is subtracted only once
+        p_end = np.where(np.isnan(p.end), now_s, p.end)
+        b_end = np.where(np.isnan(s.break_end), end, s.break_end)[p.seg]
+        inside = np.minimum(p_end, b_end) - np.maximum(p.start, s.break_start[p.seg])
+        inside = np.where(np.isnan(inside), 0.0, np.maximum(inside, 0.0))
+        overlap = np.bincount(p.seg, weights=inside, minlength=n)
+
+    live = np.maximum(elapsed - np.maximum(break_, 0.0) - np.maximum(geofence, 0.0) + overlap, 0.0)
+    worked = np.where(~is_open & ~np.isnan(s.worked_seconds), s.worked_seconds, live)
+    return ShiftMetrics(segments, elapsed, break_, geofence, overlap, worked)
+
+
+def metrics_for(db: Session, segments: Sequence, now: datetime) -> ShiftMetrics:
+    """compute() for a few already loaded segments, with their pauses from the
+    database. Ranges of timesheets go through load_segments instead."""
+    arrays = SegmentArrays.of(segments)
+    return compute(arrays, now, load_pauses(db, arrays))
+
+
+def timesheet_totals(db: Session, timesheet_ids: Sequence[str], now: datetime) -> Dict[str, Totals]:
+    """timesheet_id -> totals over all its segments (two queries at most)"""
+    if not timesheet_ids:
+        return {}
+    arrays = load_segments(db, TimesheetSegment.timesheet_id.in_(list(timesheet_ids)))
+    return compute(arrays, now, load_pauses(db, arrays)).totals()
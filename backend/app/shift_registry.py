@@ -0,0 +1,221 @@
+"""
+In-memory registry of open shifts for the clock-in hot path.
+
+Pings and active-shift polls used to walk Timesheet → TimesheetSegment →
+ConstructionSite → GeofencePause → Role on every request. The registry keeps
+that chain per user so those endpoints resolve with zero or one query.
+
+Coherence rules:
+- The write endpoints in clockin.py update or drop the entry after commit.
+- Any other code path that opens, closes, edits or deletes a segment calls
+  drop_shift() so the next request reloads from the DB.
+- The registry is rebuilt from the DB on startup (main.py lifespan).
+- A shift past its site schedule end counts as closed even before the
+  sweeper (app/sweeper.py) has checked it out in the DB.
+It is process-local, like the daily scheduler thread: run one web worker.
+"""
+import threading
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Timesheet, TimesheetSegment, ConstructionSite, GeofencePause, User, Role
+)
+from app.timezone import now_ro, today_ro
+from app.ping_buffer import latest_ping
+
+
+@dataclass
+class ActiveShift:
+    """Snapshot of one open segment and everything the hot path needs about it"""
+    user_id: str
+    role_code: Optional[str]
+    timesheet_id: str
+    date: date
+    segment_id: str
+    check_in_time: datetime
+    site_id: str
+    site_name: Optional[str]
+    site_latitude: Optional[float]
+    site_longitude: Optional[float]
+    site_geofence_radius: Optional[int]
+    work_start_time: Optional[time]
+    work_end_time: Optional[time]
+    max_overtime_minutes: Optional[int]
+    break_start_time: Optional[datetime] = None
+    break_end_time: Optional[datetime] = None
+    last_ping_at: Optional[datetime] = None
+    open_pause_id: Optional[str] = None
+    open_pause_start: Optional[datetime] = None
+    open_pause_distance: Optional[float] = None
+    closed_pause_seconds: float = 0.0
+
+    @property
+    def is_on_break(self) -> bool:
+        return bool(self.break_start_time and not self.break_end_time)
+
+    def geofence_pause_seconds(self, now: datetime) -> float:
+        """Closed pauses plus the running one, if any"""
+        total = self.closed_pause_seconds
+        if self.open_pause_start:
+            total += (now - self.open_pause_start).total_seconds()
+        return total
+
+    def is_overdue(self, now: datetime) -> bool:
+        """Past the site schedule end — the sweeper will check it out"""
+        if not self.work_end_time:
+            return False
+        schedule_end = datetime.combine(self.date, self.work_end_time)
+        return self.check_in_time < schedule_end < now
+
+    def copy(self) -> "ActiveShift":
+        return replace(self)
+
+
+_lock = threading.Lock()
+_shifts: Dict[str, ActiveShift] = {}
+
+
+def get_shift(user_id: str) -> Optional[ActiveShift]:
+    """Return a private copy of the user's open shift, or None.
+    Entries from a previous day or past schedule end are discarded."""
+    with _lock:
+        shift = _shifts.get(user_id)
+        if shift and (shift.date != today_ro() or shift.is_overdue(now_ro())):
+            del _shifts[user_id]
+            return None
+        return shift.copy() if shift else None
+
+
+def put_shift(shift: ActiveShift) -> None:
+    """Store (or replace) an entry — call only after the DB commit succeeded"""
+    with _lock:
+        _shifts[shift.user_id] = shift.copy()
+
+
+def drop_shift(user_id: Optional[str]) -> None:
+    """Forget a user's entry so the next request reloads it from the DB"""
+    if not user_id:
+        return
+    with _lock:
+        _shifts.pop(user_id, None)
+
+
+def drop_shifts(user_ids) -> None:
+    with _lock:
+        for user_id in user_ids:
+            _shifts.pop(user_id, None)
+
+
+def drop_site_shifts(site_id: str) -> None:
+    """Forget every entry on a site (its coordinates or schedule changed)"""
+    with _lock:
+        for user_id in [u for u, s in _shifts.items() if s.site_id == site_id]:
+            del _shifts[user_id]
+
+
+def _build(timesheet: Timesheet, segment: TimesheetSegment, site: Optional[ConstructionSite],
+           role_code: Optional[str], open_pause: Optional[GeofencePause]) -> ActiveShift:
+    shift = ActiveShift(
+        user_id=timesheet.owner_user_id,
+        role_code=role_code,
+        timesheet_id=timesheet.id,
+        date=timesheet.date,
+        segment_id=segment.id,
+        check_in_time=segment.check_in_time,
+        site_id=segment.site_id,
+        site_name=site.name if site else None,
+        site_latitude=site.latitude if site else None,
+        site_longitude=site.longitude if site else None,
+        site_geofence_radius=site.geofence_radius if site else None,
+        work_start_time=site.work_start_time if site else None,
+        work_end_time=site.work_end_time if site else None,
+        max_overtime_minutes=site.max_overtime_minutes if site else None,
+        break_start_time=segment.break_start_time,
+        break_end_time=segment.break_end_time,
+        last_ping_at=latest_ping(segment.id, segment.last_ping_at),
+        closed_pause_seconds=segment.geofence_pause_seconds or 0.0,
+    )
+    if open_pause:
+        shift.open_pause_id = open_pause.id
+        shift.open_pause_start = open_pause.pause_start
+        shift.open_pause_distance = open_pause.distance_at_pause
+    return shift
+
+
+def load_shift(db: Session, user: User) -> Optional[ActiveShift]:
+    """Cache miss: load the user's open shift from the DB and register it"""
+    timesheet = db.query(Timesheet).filter(
+        Timesheet.owner_user_id == user.id,
+        Timesheet.date == today_ro(),
+        Timesheet.status == "DRAFT"
+    ).first()
+    if not timesheet:
+        return None
+    segment = db.query(TimesheetSegment).filter(
+        TimesheetSegment.timesheet_id == timesheet.id,
+        TimesheetSegment.check_out_time == None
+    ).order_by(TimesheetSegment.check_in_time.desc()).first()
+    if not segment:
+        return None
+    site = db.query(ConstructionSite).filter(ConstructionSite.id == segment.site_id).first()
+    role = user.role  # loaded with the principal (app/principal_cache.py)
+    open_pause = db.query(GeofencePause).filter(
+        GeofencePause.segment_id == segment.id,
+        GeofencePause.pause_end == None
+    ).first()
+
+    shift = _build(timesheet, segment, site, role.code if role else None, open_pause)
+    if shift.is_overdue(now_ro()):
+        return None
+    put_shift(shift)
+    return shift
+
+
+def resolve_shift(db: Session, user: User) -> Optional[ActiveShift]:
+    """Registry hit (no query) or DB load on miss"""
+    return get_shift(user.id) or load_shift(db, user)
+
+
+def load_from_db(db: Session) -> int:
+    """Rebuild the whole registry from today's open segments (startup)"""
+    rows = db.query(Timesheet, TimesheetSegment, ConstructionSite, Role.code).join(
+        TimesheetSegment, TimesheetSegment.timesheet_id == Timesheet.id
+    ).outerjoin(
+        ConstructionSite, ConstructionSite.id == TimesheetSegment.site_id
+    ).join(
+        User, User.id == Timesheet.owner_user_id
+    ).outerjoin(
+        Role, Role.id == User.role_id
+    ).filter(
+        Timesheet.date == today_ro(),
+        Timesheet.status == "DRAFT",
+        TimesheetSegment.check_out_time == None
+    ).order_by(TimesheetSegment.check_in_time.asc()).all()
+
+    seg_ids = [seg.id for _, seg, _, _ in rows]
+    open_pauses = {}
+    if seg_ids:
+        for p in db.query(GeofencePause).filter(
+            GeofencePause.segment_id.in_(seg_ids),
+            GeofencePause.pause_end == None
+        ).all():
+            open_pauses[p.segment_id] = p
+
+    fresh = {}
+    now = now_ro()
+    for ts, seg, site, role_code in rows:
+        # Latest open segment wins, matching the per-request lookup
+        shift = _build(ts, seg, site, role_code, open_pauses.get(seg.id))
+        if shift.is_overdue(now):
+            fresh.pop(ts.owner_user_id, None)
+        else:
+            fresh[ts.owner_user_id] = shift
+
+    with _lock:
+        _shifts.clear()
+        _shifts.update(fresh)
+    return len(fresh)
@@ -0,0 +1,165 @@
+"""
+In-process spatial index over active construction-site coordinates.
+
+Sites of an organization are bucketed on a fixed lat/lon grid. A nearest-K
+lookup scans rings of cells around the query point and runs a vectorized
+haversine only over the candidates, stopping once no unscanned cell can hold
+a closer site. The index is built lazily per organization and dropped by
+admin_sites whenever a site is created, edited or suspended.
+"""
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import ConstructionSite
+
+CELL_DEG = 0.1            # ~11 km of latitude per cell
+EARTH_RADIUS_M = 6371000
+_CELL_LAT_M = math.radians(CELL_DEG) * EARTH_RADIUS_M
+
+
+class SiteIndex:
+    """Grid-bucketed coordinates of one organization's active sites"""
+
+    def __init__(self, sites: List[ConstructionSite]):
+        located = [s for s in sites if s.latitude is not None and s.longitude is not None]
+        self.sites = [
+            {
+                "id": str(s.id),
+                "name": s.name,
+                "address": s.address,
+                "latitude": s.latitude,
+                "longitude": s.longitude,
+                "geofence_radius": s.geofence_radius or 100,
+            }
+            for s in located
+        ]
+        lat = np.array([s.latitude for s in located], dtype=np.float64)
+        lon = np.array([s.longitude for s in located], dtype=np.float64)
+        self.lat_rad = np.radians(lat)
+        self.lon_rad = np.radians(lon)
+
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, key in enumerate(zip(np.floor(lat / CELL_DEG).astype(int).tolist(),
+                                    np.floor(lon / CELL_DEG).astype(int).tolist())):
+            cells.setdefault(key, []).append(i)
+        self.cells = {key: np.array(idx, dtype=np.intp) for key, idx in cells.items()}
+
+        # Narrowest cell width across the org (longitude cells shrink towards
+        # the poles) bounds how far away an unscanned ring can be.
+        max_abs_lat = float(np.abs(lat).max()) + CELL_DEG if len(lat) else 0.0
+        self.min_cell_m = _CELL_LAT_M * max(math.cos(math.radians(min(max_abs_lat, 89.0))), 0.01)
+        if self.cells:
+            rows = [k[0] for k in self.cells]
+            cols = [k[1] for k in self.cells]
+            self.row_span = (min(rows), max(rows))
+            self.col_span = (min(cols), max(cols))
+
+    def _distances(self, idx: np.ndarray, lat: float, lon: float) -> np.ndarray:
+        """Haversine distance in meters from (lat, lon) to the sites in idx"""
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        dlat = self.lat_rad[idx] - lat1
+        dlon = self.lon_rad[idx] - lon1
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(self.lat_rad[idx]) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _max_ring(self, row: int, col: int) -> int:
+        """Ring count after which every occupied cell has been scanned"""
+        return max(
+            abs(row - self.row_span[0]), abs(row - self.row_span[1]),
+            abs(col - self.col_span[0]), abs(col - self.col_span[1]),
+        )
+
+    def nearest(self, lat: float, lon: float, limit: int) -> List[dict]:
+        """The `limit` closest sites to (lat, lon), each with distance_m"""
+        if not self.sites:
+            return []
+        row, col = math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+        max_ring = self._max_ring(row, col)
+
+        parts = []
+        found = 0
+        best = np.empty(0)
+        best_idx = np.empty(0, dtype=np.intp)
+        ring = 0
+        while ring <= max_ring:
+            if (2 * ring + 1) ** 2 > 4 * len(self.cells):
+                # Sparse grid: scanning empty rings costs more than a full pass
+                parts = [np.arange(len(self.sites), dtype=np.intp)]
+                found = len(self.sites)
+                best_idx = np.empty(0, dtype=np.intp)
+                break
+            for key in _ring_cells(row, col, ring):
+                idx = self.cells.get(key)
+                if idx is not None:
+                    parts.append(idx)
+                    found += len(idx)
+            # Everything outside ring r is at least r cell widths away
+            if found >= limit:
+                best_idx = np.concatenate(parts)
+                best = self._distances(best_idx, lat, lon)
+                kth = np.partition(best, limit - 1)[limit - 1]
+                if kth <= ring * self.min_cell_m:
+                    break
+            ring += 1
+
+        if len(best_idx) != found:
+            best_idx = np.concatenate(parts)
+            best = self._distances(best_idx, lat, lon)
+        order = np.argsort(best, kind="stable")[:limit]
+        return [
+            {**self.sites[best_idx[i]], "distance_m": round(float(best[i]), 1)}
+            for i in order
+        ]
+
+
+def _ring_cells(row: int, col: int, ring: int):
+    """Grid cells on the square ring at Chebyshev distance `ring`"""
+    if ring == 0:
+        yield (row, col)
+        return
+    for c in range(col - ring, col + ring + 1):
+        yield (row - ring, c)
+        yield (row + ring, c)
+    for r in range(row - ring + 1, row + ring):
+        yield (r, col - ring)
+        yield (r, col + ring)
+
+
+_lock = threading.Lock()
+_indexes: Dict[str, SiteIndex] = {}
+_generation = 0
+
+
+def get_index(db: Session, organization_id: str) -> SiteIndex:
+    """Cached index for an organization, built from the DB on first use"""
+    with _lock:
+        index = _indexes.get(organization_id)
+        generation = _generation
+    if index is not None:
+        return index
+
+    sites = db.query(ConstructionSite).filter(
+        ConstructionSite.organization_id == organization_id,
+        ConstructionSite.status == "active"
+    ).all()
+    index = SiteIndex(sites)
+    with _lock:
+        # Don't cache a build that raced with an admin edit
+        if generation == _generation:
+            _indexes[organization_id] = index
+    return index
+
+
+def invalidate(organization_id: Optional[str] = None) -> None:
+    """Drop an organization's index (or all of them) after a site edit"""
+    global _generation
+    with _lock:
+        _generation += 1
+        if organization_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(organization_id, None)
@@ -88,6 +88,29 @@ def delete_file(path: str) -> bool:
         return False
 
 
+def read_file(path: str) -> bytes:
+    """
+    Read a stored file back (for private files served through the API).
+    
+    Args:
+        path: Storage path (e.g. "exports/export_abc123.xlsx")
+    
+    Returns:
+        Raw file bytes
+    """
+    if is_cloud_storage():
+        url = f"{SUPABASE_URL}/storage/v1/object/authenticated/{STORAGE_BUCKET}/{path}"
+        headers = {
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "apikey": SUPABASE_KEY,
+        }
+        response = httpx.get(url, headers=headers, timeout=60.0)
+        response.raise_for_status()
+        return response.content
+    else:
+        return (Path("uploads") / path).read_bytes()
+
+
 def get_file_url(path: str) -> str:
     """
     Get the public URL for a stored file.
@@ -0,0 +1,148 @@
+"""
+Background auto clock-out at site schedule end.
+
+Every SWEEP_INTERVAL seconds, open segments whose site work_end_time has passed
+are checked out at the schedule end, together with their running break and
+geofence pauses. Overdue segments are grouped by close time (timesheet date +
+site work_end_time). Each group is closed with four set-based UPDATEs, so the
+read endpoints (active-shift, active-workers) never have to write. Each
+auto clock-out is also appended to the shift event log (app/shift_events.py).
+
+A segment that started after its schedule end is left alone; this matches the
+old guard against zombie segments.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, List, Set
+
+from sqlalchemy import DateTime, case, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Timesheet, TimesheetSegment, ConstructionSite, GeofencePause
+from app.segment_time import epoch, break_pause_overlap_sql
+from app.timezone import now_ro
+from app import shift_registry, shift_events
+
+SWEEP_INTERVAL = 60
+
+_stop = threading.Event()
+
+
+def _close_group(db: Session, seg_ids: List[str], close_at: datetime) -> Set[str]:
+    """Check out `seg_ids` at `close_at` (no commit). Returns the ids actually
+    closed: a segment the worker checked out in the meantime is skipped."""
+    seg = TimesheetSegment.__table__
+    gp = GeofencePause.__table__
+    at = literal(close_at, DateTime)
+    still_open = seg.c.id.in_(seg_ids) & seg.c.check_out_time.is_(None)
+
+    # 1. Add the running part of open geofence pauses to the segment total
+    running = select(func.coalesce(func.sum(case(
+        (gp.c.pause_start < at, epoch(at) - epoch(gp.c.pause_start)),
+        else_=0.0
+    )), 0.0)).where(
+        gp.c.segment_id == seg.c.id,
+        gp.c.pause_end.is_(None)
+    ).scalar_subquery()
+    db.execute(update(seg).where(still_open).values(
+        geofence_pause_seconds=seg.c.geofence_pause_seconds + running
+    ))
+
+    # 2. Close the pauses themselves
+    db.execute(update(gp).where(
+        gp.c.segment_id.in_(seg_ids),
+        gp.c.pause_end.is_(None)
+    ).values(pause_end=case((gp.c.pause_start < at, at), else_=gp.c.pause_start)))
+
+    # 3. End running meal breaks
+    db.execute(update(seg).where(
+        still_open,
+        seg.c.break_start_time.isnot(None),
+        seg.c.break_end_time.is_(None)
+    ).values(
+        break_end_time=case((seg.c.break_start_time < at, at), else_=seg.c.break_start_time),
+        break_seconds=case((seg.c.break_start_time < at, epoch(at) - epoch(seg.c.break_start_time)), else_=0.0)
+    ))
+
+    # 4. Check out and finalize worked time (pause time inside the break counts once)
+    worked = (epoch(at) - epoch(seg.c.check_in_time) - seg.c.break_seconds - seg.c.geofence_pause_seconds
+              + break_pause_overlap_sql(seg, gp))
+    closed = db.execute(update(seg).where(still_open).values(
+        check_out_time=at,
+        worked_seconds=case((worked < 0, 0.0), else_=worked)
+    ).returning(seg.c.id)).scalars().all()
+    return set(closed)
+
+
+def sweep(db: Session, now: datetime = None) -> int:
+    """Close every overdue open segment. Returns the number of segments closed."""
+    now = now or now_ro()
+    rows = db.query(
+        TimesheetSegment.id,
+        TimesheetSegment.check_in_time,
+        TimesheetSegment.site_id,
+        Timesheet.owner_user_id,
+        Timesheet.organization_id,
+        Timesheet.date,
+        ConstructionSite.work_end_time
+    ).join(
+        Timesheet, Timesheet.id == TimesheetSegment.timesheet_id
+    ).join(
+        ConstructionSite, ConstructionSite.id == TimesheetSegment.site_id
+    ).filter(
+        TimesheetSegment.check_out_time == None,
+        ConstructionSite.work_end_time != None
+    ).all()
+
+    groups: Dict[datetime, list] = {}
+    for row in rows:
+        close_at = datetime.combine(row.date, row.work_end_time)
+        if now > close_at and row.check_in_time < close_at:
+            groups.setdefault(close_at, []).append(row)
+
+    if not groups:
+        return 0
+    events = []
+    owner_ids = set()
+    for close_at, group in sorted(groups.items()):
+        closed = _close_group(db, [row.id for row in group], close_at)
+        # Only what the guarded UPDATE closed: a worker may have checked out since the read
+        for row in group:
+            if row.id in closed:
+                owner_ids.add(row.owner_user_id)
+                events.append({
+                    "organization_id": row.organization_id, "user_id": row.owner_user_id, "type": "check_out",
+                    "occurred_at": close_at, "segment_id": row.id, "site_id": row.site_id,
+                    "detail": f"{shift_events.hours_detail(row.check_in_time, close_at)} (automat)"
+                })
+    shift_events.record_many(db, events)
+    db.commit()
+    shift_registry.drop_shifts(owner_ids)
+    return len(events)
+
+
+def _sweep_loop():
+    """Background thread: auto clock-out every SWEEP_INTERVAL seconds."""
+    from app.database import SessionLocal
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                closed = sweep(db)
+            finally:
+                db.close()
+            if closed:
+                print(f"🕔 Auto clock-out: closed {closed} segments at schedule end")
+        except Exception as e:
+            print(f"⚠️  Auto clock-out sweep error: {e}")
+        if _stop.wait(SWEEP_INTERVAL):
+            break
+
+
+def start() -> None:
+    _stop.clear()
+    threading.Thread(target=_sweep_loop, daemon=True).start()
+
+
+def stop() -> None:
+    _stop.set()
@@ -16,3 +16,11 @@ def now_ro() -> datetime:
 def today_ro() -> date:
     """Current date in Romania"""
     return datetime.now(RO_TZ).date()
+
+
+def to_ro_naive(dt: datetime) -> datetime:
+    """Convert a client timestamp to naive Romanian time (DB storage format).
+    Naive inputs are assumed to already be in Romanian time."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(RO_TZ).replace(tzinfo=None)
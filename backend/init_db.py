@@ -2,16 +2,18 @@
 Database initialization script
 Creates tables and seeds initial data
 """
-from app.database import engine, Base
+from app.database import engine
 from app.models import Organization, Role, User
 from app.auth import hash_pin
 from sqlalchemy.orm import Session
 import uuid
 
+from migrate import migrate
+
 def init_db():
     """Initialize database with tables and seed data"""
     print("🗄️  Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    migrate()
     print("✅ Tables created!")
     
     # Seed data
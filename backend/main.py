@@ -11,7 +11,8 @@ from pathlib import Path
 load_dotenv()
 
 # Import routers
-from app.api import auth, admin_auth, admin_users, admin_sites, admin_roles, admin_reports, clockin, timesheets, teams, sites, photo_upload, site_photos, admin_teams
+from app.api import auth, admin_auth, admin_users, admin_sites, admin_roles, admin_reports, clockin, timesheets, teams, sites, photo_upload, site_photos, admin_teams, admin_metrics, admin_exports, admin_stats, admin_occupancy, admin_live, shift_live
+from app.instrumentation import SQLTimingMiddleware, instrument_engine
 
 import threading
 
@@ -45,21 +46,62 @@ def _daily_clockin_loop():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup — auto-create tables (needed for fresh PostgreSQL)
-    from app.database import engine, Base, warmup_pool
-    from app import models  # noqa: ensure all models are imported
-    Base.metadata.create_all(bind=engine)
+    # Startup — migrations run at deploy time (migrate.py); only check the version here
+    from app.database import engine, warmup_pool
+    from app import schema
     warmup_pool()
+    print(f"🗄️  Database schema at {schema.check(engine)}")
     print("🚀 Starting Pontaj Digital API...")
 
+    # Rebuild the in-memory registry of open shifts
+    from app.database import SessionLocal
+    from app import shift_registry, revocations
+    db = SessionLocal()
+    try:
+        print(f"⏱️  Loaded {shift_registry.load_from_db(db)} active shifts")
+        print(f"🔐 Loaded {revocations.sync(db)} token revocations")
+    finally:
+        db.close()
+
     # Start daily scheduler
     t = threading.Thread(target=_daily_clockin_loop, daemon=True)
     t.start()
     print("📅 Daily auto-clock-in scheduler started")
 
+    # Start write-behind flusher for location pings
+    from app import ping_buffer
+    ping_buffer.start()
+
+    # Start auto clock-out sweeper (site schedule end)
+    from app import sweeper
+    sweeper.start()
+    print("🕔 Auto clock-out sweeper started")
+
+    # Start daily rollup refresh (closed days)
+    from app import rollups
+    rollups.start()
+    print("📊 Daily rollup refresh started")
+
+    # Keep the token revocation list in sync with other workers
+    revocations.start()
+
+    # Start the live stream fan-out (SSE for admin dashboards)
+    from app import live_bus
+    live_bus.start()
+    print("📡 Live stream bus started")
+
     yield
     # Shutdown
     _scheduler_stop.set()
+    sweeper.stop()
+    rollups.stop()
+    revocations.stop()
+    await live_bus.stop()
+    ping_buffer.stop()
+    from app import export_jobs
+    export_jobs.stop()
+    from app.database import async_engine
+    await async_engine.dispose()
     print("👋 Shutting down Pontaj Digital API...")
 
 app = FastAPI(
@@ -70,6 +112,12 @@ app = FastAPI(
     redirect_slashes=False
 )
 
+# Per-request SQL timing (Server-Timing header + /api/admin/metrics/requests)
+from app.database import engine as _engine, async_engine as _async_engine
+instrument_engine(_engine)
+instrument_engine(_async_engine.sync_engine)
+app.add_middleware(SQLTimingMiddleware)
+
 # CORS
 origins = os.getenv("CORS_ORIGINS", "http://localhost:6001").split(",")
 app.add_middleware(
@@ -78,6 +126,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 @app.get("/api")
@@ -123,11 +172,17 @@ app.include_router(admin_roles.router, prefix="/api", tags=["admin-roles"])
 app.include_router(photo_upload.router, prefix="/api", tags=["photos"])
 app.include_router(admin_reports.router, prefix="/api/admin/reports", tags=["admin-reports"])
 app.include_router(clockin.router, prefix="/api", tags=["clockin"])
+app.include_router(shift_live.router, prefix="/api", tags=["clockin"])
 app.include_router(timesheets.router, prefix="/api", tags=["timesheets"])
 app.include_router(teams.router, prefix="/api", tags=["teams"])
 app.include_router(sites.router, prefix="/api", tags=["sites"])
 app.include_router(site_photos.router, prefix="/api", tags=["site-photos"])
 app.include_router(admin_teams.router, prefix="/api", tags=["admin-teams"])
+app.include_router(admin_metrics.router, prefix="/api", tags=["admin-metrics"])
+app.include_router(admin_exports.router, prefix="/api", tags=["admin-exports"])
+app.include_router(admin_stats.router, prefix="/api", tags=["admin-stats"])
+app.include_router(admin_occupancy.router, prefix="/api", tags=["admin-occupancy"])
+app.include_router(admin_live.router, prefix="/api", tags=["admin-live"])
 
 # Serve uploaded files (ID cards, etc.)
 uploads_dir = Path(__file__).parent / "uploads"
@@ -0,0 +1,86 @@
+"""
+Apply the database migrations (alembic/versions/) up to the latest revision.
+
+Run once per deploy, before the new web process starts (preDeployCommand in
+render.yaml: it has the service's environment, the build step may not reach
+the database), and locally after pulling schema changes (start.sh does it):
+
+    python migrate.py
+
+A database created by create_all before migrations existed is stamped at
+the baseline revision (0000) once all of the baseline's tables and columns
+are found in it, then upgraded: later revisions add what is missing and
+skip what an older release already created. A database that doesn't have
+the baseline schema is left alone and reported.
+"""
+import sys
+import time
+from typing import Dict, List, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from alembic import command  # noqa: E402
+from sqlalchemy import create_engine, inspect  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app import schema  # noqa: E402
+
+BASELINE = "0000"
+
+
+def _tables(bind) -> Dict[str, Set[str]]:
+    insp = inspect(bind)
+    return {
+        table: {column["name"] for column in insp.get_columns(table)}
+        for table in insp.get_table_names() if table != "alembic_version"
+    }
+
+
+def baseline_schema() -> Dict[str, Set[str]]:
+    """Tables and columns of the baseline revision, built in a scratch database"""
+    scratch = create_engine("sqlite://")
+    config = schema.alembic_config()
+    with scratch.begin() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, BASELINE)
+        return _tables(conn)
+
+
+def missing_from_baseline() -> List[str]:
+    """Baseline tables / columns the database doesn't have"""
+    present = _tables(engine)
+    missing = []
+    for table, columns in sorted(baseline_schema().items()):
+        if table not in present:
+            missing.append(table)
+        else:
+            missing.extend(f"{table}.{column}" for column in sorted(columns - present[table]))
+    return missing
+
+
+def migrate() -> str:
+    started = time.perf_counter()
+    config = schema.alembic_config()
+    if schema.current_revision(engine) is None and inspect(engine).has_table("users"):
+        missing = missing_from_baseline()
+        if missing:
+            raise RuntimeError(
+                f"Database predates migrations but lacks the baseline schema ({', '.join(missing)}): "
+                f"bring it to revision {BASELINE} by hand, then run `alembic stamp {BASELINE}`"
+            )
+        print(f"📌 Database predates migrations: stamping baseline {BASELINE}")
+        command.stamp(config, BASELINE)
+    command.upgrade(config, "head")
+    revision = schema.current_revision(engine)
+    print(f"✅ Database schema at {revision} ({time.perf_counter() - started:.1f}s)")
+    return revision
+
+
+if __name__ == "__main__":
+    try:
+        migrate()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
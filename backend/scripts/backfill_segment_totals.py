@@ -0,0 +1,53 @@
+"""
+Backfill break_seconds, geofence_pause_seconds and worked_seconds on
+timesheet_segments (added by alembic/versions/0001_segment_time_totals.py).
+Set-based UPDATEs, safe to re-run; works on SQLite and PostgreSQL.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import case, update
+
+from app.database import SessionLocal
+from app.models import TimesheetSegment, GeofencePause
+from app.segment_time import epoch, break_pause_overlap_sql, raw_break_seconds_sql, closed_pause_seconds_sql
+
+
+def backfill():
+    db = SessionLocal()
+    seg = TimesheetSegment.__table__
+    gp = GeofencePause.__table__
+
+    try:
+        # 1. Meal break (one per segment)
+        db.execute(update(seg).values(break_seconds=raw_break_seconds_sql(seg)))
+
+        # 2. Closed geofence pauses
+        db.execute(update(seg).values(geofence_pause_seconds=closed_pause_seconds_sql(seg, gp)))
+
+        # 3. Worked time of closed segments (pause time inside the break counts once)
+        worked = (epoch(seg.c.check_out_time) - epoch(seg.c.check_in_time)
+                  - seg.c.break_seconds - seg.c.geofence_pause_seconds
+                  + break_pause_overlap_sql(seg, gp))
+        db.execute(update(seg).values(worked_seconds=case(
+            (seg.c.check_out_time.is_(None), None),
+            (worked < 0, 0.0),
+            else_=worked
+        )))
+
+        db.commit()
+        total = db.query(TimesheetSegment).count()
+        print(f"✅ Backfilled time totals on {total} segments")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    backfill()
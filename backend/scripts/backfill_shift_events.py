@@ -0,0 +1,65 @@
+"""
+Seed the shift event log (alembic/versions/0003_shift_events.py) from existing
+segments: check-in, break start/end and check-out events, in time order.
+Segments that already have events are skipped, so it is safe to re-run.
+
+    python scripts/backfill_shift_events.py                  # last 7 days
+    python scripts/backfill_shift_events.py --from 2025-01-01
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import SessionLocal
+from app.models import Timesheet, TimesheetSegment, ShiftEvent
+from app import shift_events
+from app.timezone import today_ro
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the shift event log")
+    parser.add_argument("--from", dest="date_from", help="First day (YYYY-MM-DD), default: 7 days ago")
+    args = parser.parse_args()
+    start = date.fromisoformat(args.date_from) if args.date_from else today_ro() - timedelta(days=7)
+
+    db = SessionLocal()
+    try:
+        logged = db.query(ShiftEvent.segment_id).filter(ShiftEvent.segment_id != None)
+        rows = db.query(TimesheetSegment, Timesheet.organization_id, Timesheet.owner_user_id).join(
+            Timesheet, Timesheet.id == TimesheetSegment.timesheet_id
+        ).filter(
+            Timesheet.owner_type == "USER",
+            Timesheet.date >= start,
+            TimesheetSegment.id.notin_(logged)
+        ).all()
+
+        events = []
+        for seg, org_id, user_id in rows:
+            base = {"organization_id": org_id, "user_id": user_id, "segment_id": seg.id, "site_id": seg.site_id}
+            events.append({**base, "type": "check_in", "occurred_at": seg.check_in_time, "detail": None})
+            if seg.break_start_time:
+                events.append({**base, "type": "break_start", "occurred_at": seg.break_start_time, "detail": None})
+            if seg.break_end_time:
+                events.append({**base, "type": "break_end", "occurred_at": seg.break_end_time, "detail": None})
+            if seg.check_out_time:
+                events.append({**base, "type": "check_out", "occurred_at": seg.check_out_time,
+                               "detail": shift_events.hours_detail(seg.check_in_time, seg.check_out_time)})
+        events.sort(key=lambda e: e["occurred_at"])
+
+        shift_events.record_many(db, events)
+        db.commit()
+        print(f"✅ Logged {len(events)} events for {len(rows)} segments since {start}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Concurrency benchmark: clock-in ping latency while admin reports run.
+
+Seeds a throwaway SQLite database, then measures POST /timesheets/location-ping
+latency twice: idle, and while report/dashboard requests hammer the API
+concurrently. Report routes run on the async session (or the threadpool), so
+ping latency should stay roughly flat. If a report blocked the event loop,
+the p95/max under load would jump to the report's duration.
+
+Usage:
+    python scripts/bench_event_loop.py [--workers 100] [--days 20] [--pings 300]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx  # noqa: E402
+from datetime import datetime, time as dtime, timedelta  # noqa: E402
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app import models as m  # noqa: E402
+from app.auth import hash_pin  # noqa: E402
+from app.segment_time import refresh_totals  # noqa: E402
+from app.timezone import today_ro  # noqa: E402
+
+
+def seed(workers: int, days: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    org = m.Organization(name="Bench")
+    db.add(org)
+    db.flush()
+    role = m.Role(organization_id=org.id, code="WORKER", name="Muncitor", is_employee=True)
+    db.add(role)
+    site = m.ConstructionSite(organization_id=org.id, name="Bench site", latitude=45.0, longitude=25.0,
+                              geofence_radius=300, work_start_time=dtime(0, 30), work_end_time=dtime(23, 59),
+                              status="active")
+    db.add(site)
+    db.add(m.Admin(email="bench@test.com", password_hash=__import__("hashlib").sha256(b"bench").hexdigest(),
+                   full_name="Bench", organization_id=org.id))
+    db.flush()
+    pin = hash_pin("1234")
+    today = today_ro()
+    for i in range(workers):
+        user = m.User(organization_id=org.id, role_id=role.id, employee_code=f"B{i:04d}",
+                      pin_hash=pin, full_name=f"Bench Worker {i}")
+        db.add(user)
+        db.flush()
+        for d in range(1, days + 1):
+            day = today - timedelta(days=d)
+            ts = m.Timesheet(organization_id=org.id, date=day, owner_type="USER", owner_user_id=user.id,
+                             team_category="NO_TEAM", status="DRAFT")
+            db.add(ts)
+            db.flush()
+            start = datetime.combine(day, dtime(7, 0))
+            seg = m.TimesheetSegment(timesheet_id=ts.id, site_id=site.id, check_in_time=start,
+                                     check_out_time=start + timedelta(hours=9),
+                                     break_start_time=start + timedelta(hours=5),
+                                     break_end_time=start + timedelta(hours=5, minutes=30))
+            refresh_totals(seg)
+            db.add(seg)
+        db.commit()
+    db.close()
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def measure_pings(client, headers, count):
+    latencies = []
+    for _ in range(count):
+        t = time.perf_counter()
+        r = await client.post("/api/timesheets/location-ping", json={"latitude": 45.0, "longitude": 25.0},
+                              headers=headers)
+        latencies.append((time.perf_counter() - t) * 1000)
+        assert r.status_code == 200, r.text
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def hammer(client, headers, stop: asyncio.Event, durations):
+    paths = ["/api/admin/reports/timesheets/preview", "/api/admin/dashboard-stats",
+             "/api/admin/timesheets/pending?status=DRAFT", "/api/admin/timesheets/active-workers"]
+    i = 0
+    while not stop.is_set():
+        t = time.perf_counter()
+        r = await client.get(paths[i % len(paths)], headers=headers)
+        durations.append((time.perf_counter() - t) * 1000)
+        assert r.status_code == 200, r.text
+        i += 1
+
+
+def report(label, latencies):
+    print(f"  {label:<22} p50={statistics.median(latencies):7.1f} ms  "
+          f"p95={pct(latencies, 0.95):7.1f} ms  max={max(latencies):7.1f} ms")
+
+
+async def run(pings: int, concurrency: int):
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        r = await client.post("/api/auth/login", json={"employee_code": "B0000", "pin": "1234"})
+        worker = {"Authorization": "Bearer " + r.json()["access_token"]}
+        r = await client.post("/api/admin/login", json={"email": "bench@test.com", "password": "bench"})
+        admin = {"Authorization": "Bearer " + r.json()["access_token"]}
+        r = await client.post("/api/timesheets/clock-in", json={"site_id": _site_id(), "latitude": 45.0,
+                                                                 "longitude": 25.0}, headers=worker)
+        assert r.status_code == 200, r.text
+
+        idle = await measure_pings(client, worker, pings)
+
+        stop = asyncio.Event()
+        durations = []
+        loaders = [asyncio.create_task(hammer(client, admin, stop, durations)) for _ in range(concurrency)]
+        loaded = await measure_pings(client, worker, pings)
+        stop.set()
+        await asyncio.gather(*loaders)
+
+    print("\nlocation-ping latency")
+    report("idle", idle)
+    report(f"{concurrency} report clients", loaded)
+    print(f"\nreport requests completed: {len(durations)}, "
+          f"p50={statistics.median(durations):.0f} ms, max={max(durations):.0f} ms")
+
+
+def _site_id():
+    db = SessionLocal()
+    try:
+        return db.query(m.ConstructionSite.id).scalar()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=100)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--pings", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    seed(args.workers, args.days)
+    print(f"Seeded {args.workers} workers x {args.days} days in {time.perf_counter() - t:.1f}s ({DB_PATH})")
+    asyncio.run(run(args.pings, args.concurrency))
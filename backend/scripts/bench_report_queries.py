@@ -0,0 +1,103 @@
+"""
+Report builder benchmark: query count and time vs date range.
+
+Seeds a throwaway SQLite database and runs admin_reports._build_report_data
+over growing date ranges. The builder is a bulk pipeline, so the number of
+SQL statements must not depend on the range; the script fails if it does.
+
+Usage:
+    python scripts/bench_report_queries.py [--workers 300] [--days 60]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from datetime import datetime, time as dtime, timedelta  # noqa: E402
+from decimal import Decimal  # noqa: E402
+
+from sqlalchemy import event  # noqa: E402
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app import models as m  # noqa: E402
+from app.api.admin_reports import _build_report_data  # noqa: E402
+from app.segment_time import refresh_totals  # noqa: E402
+from app.timezone import today_ro  # noqa: E402
+
+
+def seed(workers: int, days: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    org = m.Organization(name="Bench")
+    db.add(org)
+    db.flush()
+    role = m.Role(organization_id=org.id, code="WORKER", name="Muncitor", is_employee=True)
+    sites = [m.ConstructionSite(organization_id=org.id, name=f"Șantier {i}", latitude=45.0, longitude=25.0,
+                                geofence_radius=300, status="active") for i in range(5)]
+    activity = m.Activity(organization_id=org.id, name="Săpătură", unit_type="m")
+    db.add_all([role, activity, *sites])
+    db.flush()
+    today = today_ro()
+    for i in range(workers):
+        user = m.User(organization_id=org.id, role_id=role.id, employee_code=f"B{i:04d}",
+                      pin_hash="-", full_name=f"Bench Worker {i}")
+        db.add(user)
+        db.flush()
+        for d in range(1, days + 1):
+            day = today - timedelta(days=d)
+            ts = m.Timesheet(organization_id=org.id, date=day, owner_type="USER", owner_user_id=user.id,
+                             team_category="NO_TEAM", status="DRAFT")
+            db.add(ts)
+            db.flush()
+            start = datetime.combine(day, dtime(7, 0))
+            seg = m.TimesheetSegment(timesheet_id=ts.id, site_id=sites[(i + d) % len(sites)].id,
+                                     check_in_time=start, check_out_time=start + timedelta(hours=9),
+                                     break_start_time=start + timedelta(hours=5),
+                                     break_end_time=start + timedelta(hours=5, minutes=30))
+            refresh_totals(seg)
+            db.add(seg)
+            db.flush()
+            db.add(m.TimesheetLine(timesheet_id=ts.id, segment_id=seg.id, activity_id=activity.id,
+                                   quantity_numeric=Decimal("12"), unit_type="m"))
+        db.commit()
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=300)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    seed(args.workers, args.days)
+    print(f"Seeded {args.workers} workers x {args.days} days in {time.perf_counter() - t:.1f}s ({DB_PATH})\n")
+
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.__setitem__(0, statements[0] + 1))
+
+    today = today_ro()
+    site_id = SessionLocal().query(m.ConstructionSite.id).first()[0]
+    counts = set()
+    for days in sorted({1, 7, 30, args.days}):
+        for label, site in (("all sites", None), ("one site", site_id)):
+            db = SessionLocal()
+            statements[0] = 0
+            t = time.perf_counter()
+            rows = _build_report_data(db, str(today - timedelta(days=days)), str(today), None, site)
+            elapsed = (time.perf_counter() - t) * 1000
+            db.close()
+            counts.add(statements[0])
+            print(f"  {days:>4} days, {label:<9} {len(rows):>7} rows  {statements[0]:>3} queries  {elapsed:8.1f} ms")
+
+    assert len(counts) == 1, f"query count depends on the range: {sorted(counts)}"
+    print(f"\nOK: {counts.pop()} queries for every range")
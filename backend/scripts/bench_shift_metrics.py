@@ -0,0 +1,248 @@
+"""
+Shift-metrics benchmark: vectorized engine vs the per-segment loop.
+
+Builds N synthetic segments (open and closed, with meal breaks and geofence
+pauses, some overlapping the break) in memory and computes worked / break /
+pause time per timesheet, once with app.shift_metrics.compute() and once with
+a plain Python loop applying the same rules. The script fails if the two
+disagree. Engine time is split into building the arrays from objects (which
+load_segments() skips by selecting epoch seconds in SQL) and the computation.
+
+The segments are then written to a scratch SQLite database (closed ones
+with their stored totals) and timed end to end, as the endpoints run:
+loading ORM objects for the per-segment loop or for metrics_for(), against
+load_segments() + compute(), which builds no objects at all.
+
+A sample of the segments is also written to a scratch SQLite database, the
+closed ones without stored totals (as before the backfill), and the script
+fails unless timesheet_totals() (epoch seconds from SQL) and metrics_for()
+(loaded segments) agree with the loop.
+
+Usage:
+    python scripts/bench_shift_metrics.py [--segments 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app import shift_metrics  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import TimesheetSegment, GeofencePause  # noqa: E402
+
+
+def build(n: int, now: datetime):
+    rng = random.Random(42)
+    segments, pauses = [], []
+    for i in range(n):
+        check_in = now - timedelta(minutes=rng.randint(30, 60 * 24 * 30))
+        is_open = rng.random() < 0.05
+        check_out = None if is_open else check_in + timedelta(minutes=rng.randint(20, 720))
+        end = check_out or now
+        break_start = break_end = None
+        if rng.random() < 0.6 and (end - check_in) > timedelta(minutes=60):
+            break_start = check_in + (end - check_in) / 3
+            break_end = None if is_open and rng.random() < 0.3 else break_start + timedelta(minutes=rng.randint(5, 45))
+        seg_pauses = []
+        for _ in range(rng.choice((0, 0, 0, 1, 2))):
+            start = check_in + (end - check_in) * rng.random()
+            stop = None if is_open and rng.random() < 0.2 else min(end, start + timedelta(minutes=rng.randint(1, 40)))
+            seg_pauses.append((f"s{i}", start, stop))
+        closed_geo = sum((p[2] - p[1]).total_seconds() for p in seg_pauses if p[2])
+        break_seconds = (break_end - break_start).total_seconds() if break_start and break_end else 0.0
+        seg = SimpleNamespace(
+            id=f"s{i}", timesheet_id=f"t{i // 2}", site_id="site", check_in_time=check_in, check_out_time=check_out,
+            break_start_time=break_start, break_end_time=break_end, break_seconds=break_seconds,
+            geofence_pause_seconds=closed_geo, worked_seconds=None,
+        )
+        segments.append(seg)
+        pauses.extend(seg_pauses)
+    return segments, pauses
+
+
+def by_segment(pauses) -> dict:
+    by_seg = {}
+    for p in pauses:
+        by_seg.setdefault(p[0], []).append(p)
+    return by_seg
+
+
+def loop_segment(seg, seg_pauses, now):
+    """Reference: (worked, break, pause) of one segment"""
+    end = seg.check_out_time or now
+    elapsed = (end - seg.check_in_time).total_seconds()
+    brk = seg.break_seconds
+    if seg.check_out_time is None and seg.break_start_time and not seg.break_end_time:
+        brk = (now - seg.break_start_time).total_seconds()
+    geo = seg.geofence_pause_seconds
+    overlap = 0.0
+    for _, start, stop in seg_pauses:
+        stop_eff = stop or now
+        if stop is None and seg.check_out_time is None:
+            geo += max(0.0, (now - start).total_seconds())
+        if seg.break_start_time:
+            b_end = seg.break_end_time or end
+            overlap += max(0.0, (min(stop_eff, b_end) - max(start, seg.break_start_time)).total_seconds())
+    return max(0.0, elapsed - max(0.0, brk) - max(0.0, geo) + overlap), brk, geo
+
+
+def loop_totals(segments, pauses, now):
+    """Reference: the same rules, one segment at a time"""
+    by_seg = by_segment(pauses)
+    totals = {}
+    for seg in segments:
+        worked, brk, geo = loop_segment(seg, by_seg.get(seg.id, []), now)
+        t = totals.setdefault(seg.timesheet_id, [0.0, 0.0, 0.0])
+        t[0] += worked
+        t[1] += max(0.0, brk)
+        t[2] += max(0.0, geo)
+    return totals
+
+
+def mismatch(totals, expected, tolerance: float):
+    """First timesheet whose totals differ from the loop's, None if all match"""
+    for ts_id, (worked, brk, geo) in expected.items():
+        t = totals[ts_id]
+        if abs(t.worked - worked) > tolerance or abs(t.break_ - brk) > tolerance or abs(t.geofence - geo) > tolerance:
+            return f"{ts_id}: {t} vs loop {(worked, brk, geo)}"
+    return None
+
+
+def scratch_engine():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def bench_database(segments, pauses, now, expected) -> None:
+    """End to end from SQLite: ORM objects + loop / metrics_for vs load_segments"""
+    engine = scratch_engine()
+    by_seg = by_segment(pauses)
+    with engine.begin() as conn:
+        conn.execute(insert(TimesheetSegment.__table__), [dict(
+            id=s.id, timesheet_id=s.timesheet_id, site_id=s.site_id, check_in_time=s.check_in_time,
+            check_out_time=s.check_out_time, break_start_time=s.break_start_time,
+            break_end_time=s.break_end_time, break_seconds=s.break_seconds,
+            geofence_pause_seconds=s.geofence_pause_seconds,
+            worked_seconds=loop_segment(s, by_seg.get(s.id, []), now)[0] if s.check_out_time else None,
+        ) for s in segments])
+        conn.execute(insert(GeofencePause.__table__), [
+            dict(segment_id=p[0], pause_start=p[1], pause_end=p[2]) for p in pauses
+        ])
+
+    with Session(engine) as db:
+        start = time.perf_counter()
+        loaded = db.query(TimesheetSegment).all()
+        pause_rows = db.query(GeofencePause.segment_id, GeofencePause.pause_start, GeofencePause.pause_end).all()
+        loop_totals(loaded, pause_rows, now)
+        loop_s = time.perf_counter() - start
+        db.expunge_all()
+
+        start = time.perf_counter()
+        loaded = db.query(TimesheetSegment).all()
+        shift_metrics.metrics_for(db, loaded, now).totals()
+        orm_s = time.perf_counter() - start
+        db.expunge_all()
+
+        start = time.perf_counter()
+        arrays = shift_metrics.load_segments(db)
+        totals = shift_metrics.compute(arrays, now, shift_metrics.load_pauses(db, arrays)).totals()
+        sql_s = time.perf_counter() - start
+
+    bad = mismatch(totals, expected, 1e-2)
+    if bad:
+        raise SystemExit(f"❌ load_segments mismatch for {bad}")
+    print("   from the database (SQLite, end to end):")
+    print(f"     ORM objects + loop       : {loop_s * 1000:8.1f} ms")
+    print(f"     ORM objects + metrics_for: {orm_s * 1000:8.1f} ms  ({loop_s / orm_s:.1f}x)")
+    print(f"     load_segments + compute  : {sql_s * 1000:8.1f} ms  ({loop_s / sql_s:.1f}x)")
+
+
+def check_sql(segments, pauses, now, expected, sample: int = 2000):
+    """timesheet_totals() and metrics_for() on a database copy vs the loop,
+    closed segments without stored totals (as before the backfill)"""
+    engine = scratch_engine()
+    segments = segments[:sample]
+    ids = {s.id for s in segments}
+    with Session(engine) as db:
+        db.add_all(TimesheetSegment(
+            id=s.id, timesheet_id=s.timesheet_id, site_id=s.site_id, check_in_time=s.check_in_time,
+            check_out_time=s.check_out_time, break_start_time=s.break_start_time,
+            break_end_time=s.break_end_time, break_seconds=0, geofence_pause_seconds=0,
+            worked_seconds=None,
+        ) if s.check_out_time else TimesheetSegment(
+            id=s.id, timesheet_id=s.timesheet_id, site_id=s.site_id, check_in_time=s.check_in_time,
+            break_start_time=s.break_start_time, break_end_time=s.break_end_time,
+            break_seconds=s.break_seconds, geofence_pause_seconds=s.geofence_pause_seconds,
+        ) for s in segments)
+        db.add_all(GeofencePause(segment_id=p[0], pause_start=p[1], pause_end=p[2])
+                   for p in pauses if p[0] in ids)
+        db.commit()
+
+        timesheet_ids = sorted({s.timesheet_id for s in segments})
+        loaded = db.query(TimesheetSegment).all()
+        checks = {
+            "timesheet_totals": shift_metrics.timesheet_totals(db, timesheet_ids, now),
+            "metrics_for": shift_metrics.metrics_for(db, loaded, now).totals(),
+        }
+    for name, totals in checks.items():
+        bad = mismatch(totals, {ts_id: expected[ts_id] for ts_id in timesheet_ids}, 1e-2)
+        if bad:
+            raise SystemExit(f"❌ {name} mismatch for {bad}")
+    print(f"✅ SQL paths match the loop on {len(timesheet_ids)} timesheets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shift-metrics engine")
+    parser.add_argument("--segments", type=int, default=100_000)
+    args = parser.parse_args()
+
+    now = datetime(2026, 3, 2, 14, 30)
+    segments, pauses = build(args.segments, now)
+    print(f"📦 {len(segments)} segments, {len(pauses)} geofence pauses")
+
+    start = time.perf_counter()
+    expected = loop_totals(segments, pauses, now)
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    arrays = shift_metrics.SegmentArrays.of(segments)
+    pause_arrays = shift_metrics.pauses_of(arrays, pauses)
+    convert_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    totals = shift_metrics.compute(arrays, now, pause_arrays).totals()
+    compute_s = time.perf_counter() - start
+    engine_s = convert_s + compute_s
+
+    bad = mismatch(totals, expected, 1e-3)
+    if bad:
+        raise SystemExit(f"❌ Engine mismatch for {bad}")
+
+    print("   in memory (from objects):")
+    print(f"     per-segment loop         : {loop_s * 1000:8.1f} ms")
+    print(f"     vectorized engine        : {engine_s * 1000:8.1f} ms  ({loop_s / engine_s:.1f}x)")
+    print(f"       objects → arrays       : {convert_s * 1000:8.1f} ms")
+    print(f"       compute + totals       : {compute_s * 1000:8.1f} ms  ({loop_s / compute_s:.1f}x)")
+    bench_database(segments, pauses, now, expected)
+    print(f"✅ {len(totals)} timesheet totals match")
+
+    check_sql(segments, pauses, now, expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Query plan check for the hot endpoints: fails when one falls back to a
+sequential scan.
+
+Calls the code behind the admin report (preview, keyset pages), the active
+workers view, the notification feed, the worker's active shift and the
+registry load, the worker's history and the site photo list, records every
+SELECT they send to the database (before_cursor_execute) and runs EXPLAIN
+on those exact statements. It fails if any of them reads one of the
+growing tables without an index (`Seq Scan on` in PostgreSQL, a plain
+`SCAN <table>` in SQLite). See alembic/versions/0005_hot_path_indexes.py.
+
+By default the schema is built in a throwaway SQLite database by the
+migrations (`alembic upgrade head`, as in production) and a small shift is
+seeded so every code path reaches its queries. Pass --database-url to check
+a real database instead (e.g. a staging copy after `python migrate.py`); it
+is only read, using its latest USER timesheet. On PostgreSQL sequential
+scans are switched off for the session, so the check reports whether an
+index is usable even when the tables are small enough to scan.
+
+Usage:
+    python scripts/check_query_plans.py [--database-url URL] [--verbose]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+_args = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+_args.add_argument("--database-url", help="database to check (default: throwaway SQLite)")
+_args.add_argument("--verbose", action="store_true", help="print every statement and plan")
+args = _args.parse_args()
+
+os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+os.environ.setdefault("JWT_SECRET_KEY", "plans")
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from contextlib import contextmanager  # noqa: E402
+from datetime import timedelta, time as dtime  # noqa: E402
+from decimal import Decimal  # noqa: E402
+
+from alembic import command  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import engine, SessionLocal  # noqa: E402
+from app.models import (  # noqa: E402
+    Organization, Role, User, ConstructionSite, Activity, Timesheet, TimesheetSegment,
+    TimesheetLine, GeofencePause, ShiftEvent, SitePhoto
+)
+from app import schema, shift_events, shift_registry  # noqa: E402
+from app.api.admin_reports import _build_report_data  # noqa: E402
+from app.api.timesheets import build_active_workers, list_my_timesheets  # noqa: E402
+from app.api.site_photos import list_site_photos  # noqa: E402
+from app.timezone import now_ro  # noqa: E402
+
+# Tables that grow with every shift: these must never be read in full
+HOT_TABLES = {"timesheets", "timesheet_segments", "geofence_pauses", "timesheet_lines",
+              "shift_events", "site_photos"}
+
+
+def seed(db) -> None:
+    """One worker's day: a closed and an open segment, pauses, a line, events, a photo"""
+    now = now_ro().replace(microsecond=0)
+    org = Organization(name="Plans")
+    db.add(org)
+    db.flush()
+    role = Role(organization_id=org.id, code="WORKER", name="Muncitor", is_employee=True)
+    site = ConstructionSite(organization_id=org.id, name="Șantier", latitude=45.0, longitude=25.0,
+                            work_start_time=dtime(0, 0), work_end_time=dtime(23, 59))
+    db.add_all([role, site])
+    db.flush()
+    user = User(organization_id=org.id, role_id=role.id, employee_code="PLANS", full_name="Plan Check")
+    activity = Activity(organization_id=org.id, name="Zidărie", unit_type="mp")
+    db.add_all([user, activity])
+    db.flush()
+    ts = Timesheet(organization_id=org.id, date=now.date(), owner_type="USER",
+                   owner_user_id=user.id, status="DRAFT")
+    db.add(ts)
+    db.flush()
+    start = now - timedelta(minutes=30)
+    closed = TimesheetSegment(timesheet_id=ts.id, site_id=site.id, check_in_time=start,
+                              check_out_time=start + timedelta(minutes=10), worked_seconds=600)
+    open_ = TimesheetSegment(timesheet_id=ts.id, site_id=site.id, check_in_time=start + timedelta(minutes=15))
+    db.add_all([closed, open_])
+    db.flush()
+    db.add_all([
+        GeofencePause(segment_id=closed.id, pause_start=start + timedelta(minutes=2),
+                      pause_end=start + timedelta(minutes=3)),
+        GeofencePause(segment_id=open_.id, pause_start=now - timedelta(minutes=1)),
+        TimesheetLine(timesheet_id=ts.id, segment_id=closed.id, activity_id=activity.id,
+                      quantity_numeric=Decimal("2"), unit_type="mp"),
+        ShiftEvent(organization_id=org.id, user_id=user.id, type="check_in", occurred_at=start,
+                   segment_id=closed.id, site_id=site.id),
+        SitePhoto(site_id=site.id, uploaded_by_user_id=user.id, photo_path="plans.jpg"),
+    ])
+    db.commit()
+
+
+def code_paths(db) -> list:
+    """(name, call) for every read path checked, driven by the latest USER timesheet"""
+    ts = db.query(Timesheet).filter(Timesheet.owner_type == "USER").order_by(Timesheet.date.desc()).first()
+    if ts is None:
+        raise SystemExit("❌ No USER timesheet to drive the endpoints with")
+    user = db.get(User, ts.owner_user_id)
+    site_id = db.query(TimesheetSegment.site_id).filter(TimesheetSegment.timesheet_id == ts.id).limit(1).scalar()
+    day = ts.date.isoformat()
+    after = (ts.date + timedelta(days=1)).isoformat()  # a cursor the timesheet comes after
+    return [
+        ("report preview", lambda: _build_report_data(db, day, day)),
+        ("report page after a keyset cursor", lambda: _build_report_data(db, day, day, limit=51, cursor=f"{after}_")),
+        ("report of one worker", lambda: _build_report_data(db, day, day, employee_id=user.id)),
+        ("active workers", lambda: build_active_workers(db, day)),
+        ("active workers (live stream, one organization)", lambda: build_active_workers(db, day, ts.organization_id)),
+        ("notification feed", lambda: shift_events.feed(db, ts.organization_id)),
+        ("notification feed poll (after)", lambda: shift_events.feed(db, ts.organization_id, after=0)),
+        ("notification feed history (before)", lambda: shift_events.feed(db, ts.organization_id, before=2 ** 31)),
+        ("active shift (registry miss)", lambda: shift_registry.load_shift(db, user)),
+        ("registry load at startup", lambda: shift_registry.load_from_db(db)),
+        ("worker history by status", lambda: list_my_timesheets(
+            date_from=day, date_to=None, status=ts.status, page=1, page_size=20, db=db, current_user=user)),
+        ("site photos of a site", lambda: list_site_photos(
+            site_id=site_id, page=1, per_page=20, principal=None, db=db)),
+    ]
+
+
+@contextmanager
+def captured(statements: list):
+    """Record the SELECTs sent to the database: (statement, parameters)"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(conn, statement: str, parameters) -> list:
+    if engine.dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+    return [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)]
+
+
+def scanned_tables(plan: list) -> set:
+    """Hot tables the plan reads without an index"""
+    scanned = set()
+    for line in plan:
+        line = line.strip().lstrip("-> ")
+        for table in HOT_TABLES:
+            if f"Seq Scan on {table} " in line + " ":  # also Parallel Seq Scan
+                scanned.add(table)
+        words = line.split()
+        if len(words) > 1 and words[0] == "SCAN" and words[1] in HOT_TABLES and "USING" not in line:
+            scanned.add(words[1])
+    return scanned
+
+
+def main() -> int:
+    if not args.database_url:
+        command.upgrade(schema.alembic_config(), "head")
+        db = SessionLocal()
+        try:
+            seed(db)
+        finally:
+            db.close()
+
+    failures = []
+    checked = 0
+    db = SessionLocal()
+    try:
+        for name, call in code_paths(db):
+            with captured([]) as statements:
+                call()
+            db.rollback()  # the paths only read; drop the session's snapshot
+            if not statements:
+                print(f"❌ {name}: no statements captured")
+                failures.append(name)
+                continue
+
+            unique = {}
+            for statement, parameters in statements:
+                unique.setdefault(statement, parameters)  # same shape, first parameters
+
+            plans = []
+            with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    conn.exec_driver_sql("SET enable_seqscan = off")
+                for statement, parameters in unique.items():
+                    plan = explain(conn, statement, parameters)
+                    plans.append((statement, plan, scanned_tables(plan)))
+            checked += len(plans)
+
+            bad = sorted({table for _, _, tables in plans for table in tables})
+            print(f"{'❌' if bad else '✅'} {name} ({len(unique)} statements)"
+                  + (f": sequential scan of {', '.join(bad)}" if bad else ""))
+            for statement, plan, tables in plans:
+                if tables or args.verbose:
+                    print(f"      {' '.join(statement.split())[:160]}")
+                    for line in plan:
+                        print(f"         {line}")
+            if bad:
+                failures.append(name)
+    finally:
+        db.close()
+
+    if failures:
+        print(f"\n{len(failures)} hot path{'' if len(failures) == 1 else 's'} without an index")
+        return 1
+    print(f"\nAll {checked} statements of the hot paths use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
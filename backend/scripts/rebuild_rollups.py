@@ -0,0 +1,50 @@
+"""
+Rebuild the daily rollups (see app/rollups.py, alembic/versions/0002_daily_rollups.py).
+Closed days only; days with open segments and today are left to live reads.
+
+    python scripts/rebuild_rollups.py                      # whole history
+    python scripts/rebuild_rollups.py --from 2025-01-01 --to 2025-12-31
+    python scripts/rebuild_rollups.py --changed            # only days whose data changed
+"""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.models import Timesheet
+from app import rollups
+from app.timezone import today_ro
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild daily rollups")
+    parser.add_argument("--from", dest="date_from", help="First day (YYYY-MM-DD), default: first timesheet")
+    parser.add_argument("--to", dest="date_to", help="Last day (YYYY-MM-DD), default: yesterday")
+    parser.add_argument("--changed", action="store_true", help="Only rebuild days whose source data changed")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start = date.fromisoformat(args.date_from) if args.date_from else db.query(func.min(Timesheet.date)).scalar()
+        end = date.fromisoformat(args.date_to) if args.date_to else today_ro()
+        if start is None:
+            print("ℹ️  No timesheets, nothing to roll up")
+            return
+        rebuilt = rollups.refresh(db, start, end, force=not args.changed)
+        print(f"✅ Rebuilt rollups for {rebuilt} days ({start} → {min(end, today_ro())})")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Rollup rebuild failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
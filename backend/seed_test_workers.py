@@ -16,6 +16,7 @@ from app.models import (
     ConstructionSite as Site, Activity
 )
 from app.auth import hash_pin
+from app.segment_time import refresh_totals
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 import random
@@ -153,6 +154,7 @@ def auto_clockin_today(db, users):
             check_out_longitude=getattr(site, 'longitude', None) if actual_co else None,
             is_within_geofence=True,
         )
+        refresh_totals(seg)
         db.add(seg)
         db.flush()
 
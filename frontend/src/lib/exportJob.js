@@ -0,0 +1,35 @@
+import api from './api'
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
+/**
+ * Run a background Excel export and save the file.
+ * Enqueues the job, polls its progress, then downloads the workbook.
+ *
+ * @param {object} payload - { kind: 'timesheets' | 'report', date_from, date_to, employee_id, site_id }
+ * @param {string} filename - name for the downloaded file
+ * @param {(progress: number) => void} [onProgress] - 0..1
+ */
+export async function runExportJob(payload, filename, onProgress) {
+    let { data: job } = await api.post('/admin/exports/', payload)
+
+    while (job.status === 'queued' || job.status === 'running') {
+        onProgress?.(job.progress)
+        await sleep(1000)
+        job = (await api.get(`/admin/exports/${job.id}`)).data
+    }
+    if (job.status !== 'done') {
+        throw new Error(job.error || 'Exportul a eșuat')
+    }
+    onProgress?.(1)
+
+    const response = await api.get(`/admin/exports/${job.id}/download`, { responseType: 'blob' })
+    const url = window.URL.createObjectURL(new Blob([response.data]))
+    const link = document.createElement('a')
+    link.href = url
+    link.setAttribute('download', filename)
+    document.body.appendChild(link)
+    link.click()
+    link.remove()
+    window.URL.revokeObjectURL(url)
+}
@@ -0,0 +1,63 @@
+// Server-Sent Events over fetch (EventSource can't send the Authorization header).
+// openLiveStream('/admin/live/stream', token, { snapshot: fn, worker: fn }) → close()
+// Reconnects with backoff; onStatus(true|false) reports whether the stream is up.
+
+const parseBlock = (block) => {
+    let event = 'message'
+    const data = []
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) data.push(line.slice(5).trimStart())
+    }
+    return data.length ? { event, data: data.join('\n') } : null
+}
+
+export function storedToken(storageKey, field) {
+    try {
+        const parsed = JSON.parse(localStorage.getItem(storageKey) || 'null')
+        return parsed?.state?.[field] || null
+    } catch { return null }
+}
+
+export function openLiveStream(path, token, handlers, onStatus = () => { }) {
+    let controller = null
+    let closed = false
+    let retry = 1000
+
+    const connect = async () => {
+        controller = new AbortController()
+        try {
+            const res = await fetch(`/api${path}`, {
+                headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' },
+                signal: controller.signal,
+            })
+            if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`)
+            onStatus(true)
+            retry = 1000
+            const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+            let buffer = ''
+            while (true) {
+                const { value, done } = await reader.read()
+                if (done) break
+                buffer += value
+                let end
+                while ((end = buffer.indexOf('\n\n')) >= 0) {
+                    const msg = parseBlock(buffer.slice(0, end))
+                    buffer = buffer.slice(end + 2)
+                    if (msg && handlers[msg.event]) handlers[msg.event](JSON.parse(msg.data))
+                }
+            }
+        } catch (e) { /* reconnect below */ }
+        onStatus(false)
+        if (!closed) {
+            setTimeout(connect, retry)
+            retry = Math.min(retry * 2, 30000)
+        }
+    }
+
+    connect()
+    return () => {
+        closed = true
+        controller?.abort()
+    }
+}
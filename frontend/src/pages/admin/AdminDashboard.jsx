@@ -24,13 +24,21 @@ export default function AdminDashboard() {
         navigate('/admin/login')
     }
 
-    // Fetch notifications
+    // Fetch notifications: latest page first, then only events after the cursor
+    const notifCursor = useRef(null)
     const fetchNotifications = async () => {
         try {
-            const res = await api.get('/admin/notifications/feed')
+            const after = notifCursor.current
+            const res = await api.get('/admin/notifications/feed', { params: after != null ? { after } : {} })
             const events = res.data?.events || []
-            setNotifications(events)
-            setNotifCount(events.length)
+            if (res.data?.cursor != null) notifCursor.current = res.data.cursor
+            if (after == null) {
+                setNotifications(events)
+                setNotifCount(events.length)
+            } else if (events.length) {
+                setNotifications(prev => [...events, ...prev].slice(0, 50))
+                setNotifCount(c => c + events.length)
+            }
         } catch (e) { /* silently fail */ }
     }
 
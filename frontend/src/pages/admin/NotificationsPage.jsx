@@ -1,9 +1,9 @@
-import { useState, useEffect, useCallback } from 'react'
+import { useState, useEffect, useCallback, useRef } from 'react'
 import api from '../../lib/api'
 import {
     Bell, Loader2, RefreshCw, Filter, Calendar, Clock, User,
     LogIn, LogOut, Coffee, RotateCcw, ChevronLeft, ChevronRight,
-    Building2, Search
+    Building2, Search, MapPin, Wrench
 } from 'lucide-react'
 
 const API_BASE = import.meta.env.VITE_API_URL || ''
@@ -13,6 +13,9 @@ const EVENT_STYLES = {
     check_out: { bg: 'bg-red-50', border: 'border-red-200', text: 'text-red-700', label: 'Ieșire', Icon: LogOut },
     break_start: { bg: 'bg-amber-50', border: 'border-amber-200', text: 'text-amber-700', label: 'Pauză', Icon: Coffee },
     break_end: { bg: 'bg-blue-50', border: 'border-blue-200', text: 'text-blue-700', label: 'Revenire', Icon: RotateCcw },
+    geofence_exit: { bg: 'bg-rose-50', border: 'border-rose-200', text: 'text-rose-700', label: 'Ieșire din zonă', Icon: MapPin },
+    geofence_return: { bg: 'bg-teal-50', border: 'border-teal-200', text: 'text-teal-700', label: 'Revenire în zonă', Icon: MapPin },
+    activity_added: { bg: 'bg-violet-50', border: 'border-violet-200', text: 'text-violet-700', label: 'Activitate', Icon: Wrench },
 }
 
 function AvatarImg({ path, name, size = 'w-9 h-9' }) {
@@ -32,27 +35,59 @@ function AvatarImg({ path, name, size = 'w-9 h-9' }) {
 export default function NotificationsPage() {
     const [events, setEvents] = useState([])
     const [loading, setLoading] = useState(true)
-    const [total, setTotal] = useState(0)
+    const [loadingMore, setLoadingMore] = useState(false)
+    const [hasOlder, setHasOlder] = useState(false)
     const [typeFilter, setTypeFilter] = useState('')
     const [searchQuery, setSearchQuery] = useState('')
+    const cursor = useRef(null)  // newest event id loaded
+    const oldest = useRef(null)  // oldest event id loaded
 
+    // Full load: latest page of events
     const fetchEvents = useCallback(async () => {
         try {
             setLoading(true)
             const res = await api.get('/admin/notifications/feed')
             setEvents(res.data.events || [])
-            setTotal(res.data.total || 0)
+            cursor.current = res.data.cursor
+            oldest.current = res.data.oldest
+            setHasOlder(res.data.has_more)
         } catch (e) { console.error(e) }
         finally { setLoading(false) }
     }, [])
 
+    // Poll: only events newer than the cursor
+    const fetchNewEvents = useCallback(async () => {
+        if (cursor.current == null) return fetchEvents()
+        try {
+            const res = await api.get('/admin/notifications/feed', { params: { after: cursor.current } })
+            const fresh = res.data.events || []
+            if (fresh.length) {
+                setEvents(prev => [...fresh, ...prev.filter(e => !fresh.some(f => f.id === e.id))])
+                cursor.current = res.data.cursor
+            }
+            if (res.data.has_more) fetchNewEvents()
+        } catch (e) { console.error(e) }
+    }, [fetchEvents])
+
+    // History: the page before the oldest loaded event
+    const fetchOlderEvents = async () => {
+        try {
+            setLoadingMore(true)
+            const res = await api.get('/admin/notifications/feed', { params: { before: oldest.current } })
+            setEvents(prev => [...prev, ...(res.data.events || [])])
+            oldest.current = res.data.oldest
+            setHasOlder(res.data.has_more)
+        } catch (e) { console.error(e) }
+        finally { setLoadingMore(false) }
+    }
+
     useEffect(() => { fetchEvents() }, [fetchEvents])
 
     // Auto-refresh every 30 seconds
     useEffect(() => {
-        const t = setInterval(fetchEvents, 30000)
+        const t = setInterval(fetchNewEvents, 30000)
         return () => clearInterval(t)
-    }, [fetchEvents])
+    }, [fetchNewEvents])
 
     const formatTime = (t) => {
         try {
@@ -89,7 +124,7 @@ export default function NotificationsPage() {
                             <Bell className="w-5 h-5 text-white" />
                         </div>
                         Notificări
-                        <span className="text-base font-normal text-slate-400">({total} evenimente)</span>
+                        <span className="text-base font-normal text-slate-400">({events.length} evenimente)</span>
                     </h1>
                     <button
                         onClick={fetchEvents}
@@ -128,6 +163,9 @@ export default function NotificationsPage() {
                                 <option value="check_out">🔴 Ieșiri</option>
                                 <option value="break_start">☕ Pauze</option>
                                 <option value="break_end">🔄 Reveniri</option>
+                                <option value="geofence_exit">🚷 Ieșiri din zonă</option>
+                                <option value="geofence_return">📍 Reveniri în zonă</option>
+                                <option value="activity_added">🛠️ Activități</option>
                             </select>
                         </div>
                         {/* Today date badge */}
@@ -149,7 +187,7 @@ export default function NotificationsPage() {
                             <Bell className="w-8 h-8 text-slate-400" />
                         </div>
                         <p className="text-lg font-semibold text-slate-600">Niciun eveniment</p>
-                        <p className="text-sm text-slate-400 mt-1">{searchQuery || typeFilter ? 'Încearcă alte filtre' : 'Evenimentele de azi vor apărea aici'}</p>
+                        <p className="text-sm text-slate-400 mt-1">{searchQuery || typeFilter ? 'Încearcă alte filtre' : 'Evenimentele vor apărea aici'}</p>
                     </div>
                 ) : (
                     <div className="bg-white rounded-2xl shadow-sm overflow-hidden">
@@ -165,11 +203,11 @@ export default function NotificationsPage() {
                                 </tr>
                             </thead>
                             <tbody>
-                                {filtered.map((evt, i) => {
+                                {filtered.map((evt) => {
                                     const style = EVENT_STYLES[evt.type] || { bg: 'bg-slate-50', border: 'border-slate-200', text: 'text-slate-600', label: evt.type, Icon: Bell }
                                     const { Icon } = style
                                     return (
-                                        <tr key={i} className="border-b border-slate-50 hover:bg-slate-50/50 transition-colors">
+                                        <tr key={evt.id} className="border-b border-slate-50 hover:bg-slate-50/50 transition-colors">
                                             {/* Type badge */}
                                             <td className="px-5 py-3.5">
                                                 <span className={`inline-flex items-center gap-1.5 px-2.5 py-1 rounded-lg text-xs font-semibold ${style.bg} ${style.text} ${style.border} border`}>
@@ -212,7 +250,18 @@ export default function NotificationsPage() {
                         </table>
                         {/* Footer */}
                         <div className="px-5 py-3 bg-slate-50/50 border-t border-slate-100 text-xs text-slate-500 flex items-center justify-between">
-                            <span>{filtered.length} din {total} evenimente afișate</span>
+                            <span className="flex items-center gap-3">
+                                {filtered.length} din {events.length} evenimente afișate
+                                {hasOlder && (
+                                    <button
+                                        onClick={fetchOlderEvents}
+                                        disabled={loadingMore}
+                                        className="font-semibold text-blue-600 hover:text-blue-700"
+                                    >
+                                        {loadingMore ? 'Se încarcă...' : 'Încarcă mai multe'}
+                                    </button>
+                                )}
+                            </span>
                             <span className="flex items-center gap-1.5">
                                 <RefreshCw className="w-3 h-3" /> Se actualizează automat la 30 secunde
                             </span>
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import { useAdminStore } from '../../store/adminStore'
 import api from '../../lib/api'
+import { runExportJob } from '../../lib/exportJob'
 import {
     FileDown, Calendar, Users, Building2, Loader2, Download, Eye,
     BarChart3, Clock, TrendingUp, Activity, Filter, PieChart as PieChartIcon
@@ -84,16 +85,7 @@ export default function ReportsPage() {
             if (selectedEmployee) params.employee_id = selectedEmployee
             if (selectedSite) params.site_id = selectedSite
 
-            const res = await api.get('/admin/reports/timesheets/excel', { params, responseType: 'blob' })
-            const blob = new Blob([res.data], { type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' })
-            const url = window.URL.createObjectURL(blob)
-            const link = document.createElement('a')
-            link.href = url
-            link.download = `pontaje_${dateFrom}_${dateTo}.xlsx`
-            document.body.appendChild(link)
-            link.click()
-            document.body.removeChild(link)
-            window.URL.revokeObjectURL(url)
+            await runExportJob({ kind: 'report', ...params }, `pontaje_${dateFrom}_${dateTo}.xlsx`)
         } catch (e) { console.error(e) }
         finally { setLoading(false) }
     }
@@ -1,5 +1,7 @@
 import { useState, useEffect, useRef } from 'react'
 import api from '../../lib/api'
+import { runExportJob } from '../../lib/exportJob'
+import { openLiveStream, storedToken } from '../../lib/liveStream'
 import { Calendar, Clock, Users, Coffee, Building2, Activity, RefreshCw, CheckCircle, Loader2, Timer, Image, X, ChevronLeft, ChevronRight, Phone, Mail, MapPin, FileText, ArrowLeft, FileDown, FileSpreadsheet } from 'lucide-react'
 
 const API_BASE = import.meta.env.VITE_API_URL?.replace('/api', '') || ''
@@ -30,6 +32,7 @@ export default function TimesheetApprovalPage() {
     const [activePeriod, setActivePeriod] = useState('today')
     const [lastRefresh, setLastRefresh] = useState(null)
     const refreshTimer = useRef(null)
+    const streamLive = useRef(false) // SSE connected: skip the 30s poll
     const isRange = dateFrom !== dateTo
 
     // Worker detail drawer
@@ -55,8 +58,33 @@ export default function TimesheetApprovalPage() {
     useEffect(() => {
         fetchWorkers()
         fetchPhotos()
-        refreshTimer.current = setInterval(fetchWorkers, 30000)
-        return () => clearInterval(refreshTimer.current)
+        refreshTimer.current = setInterval(() => { if (!streamLive.current) fetchWorkers() }, 30000)
+
+        // Today: live push (snapshot + per-worker deltas); polling is only the fallback
+        const token = storedToken('admin-storage', 'token')
+        const viewingToday = dateFrom === today && dateTo === today
+        const close = viewingToday && token ? openLiveStream('/admin/live/stream', token, {
+            snapshot: (data) => {
+                setWorkers(data.active_workers || [])
+                setLastRefresh(new Date())
+                setLoading(false)
+            },
+            worker: (delta) => {
+                setWorkers(prev => prev.map(w => w.worker_id === delta.worker_id ? {
+                    ...w,
+                    status: delta.status,
+                    is_on_break: delta.is_on_break,
+                    is_outside_geofence: delta.is_outside_geofence,
+                } : w))
+                setLastRefresh(new Date())
+            },
+        }, (up) => { streamLive.current = up }) : null
+
+        return () => {
+            clearInterval(refreshTimer.current)
+            streamLive.current = false
+            close?.()
+        }
     }, [dateFrom, dateTo])
 
     const fetchWorkers = async () => {
@@ -211,18 +239,10 @@ export default function TimesheetApprovalPage() {
                     <button
                         onClick={async () => {
                             try {
-                                const response = await api.get('/admin/timesheets/export/excel', {
-                                    params: { date_from: dateFrom, date_to: dateTo },
-                                    responseType: 'blob'
-                                })
-                                const url = window.URL.createObjectURL(new Blob([response.data]))
-                                const link = document.createElement('a')
-                                link.href = url
-                                link.setAttribute('download', `pontaje_${dateFrom}_${dateTo}.xlsx`)
-                                document.body.appendChild(link)
-                                link.click()
-                                link.remove()
-                                window.URL.revokeObjectURL(url)
+                                await runExportJob(
+                                    { kind: 'timesheets', date_from: dateFrom, date_to: dateTo },
+                                    `pontaje_${dateFrom}_${dateTo}.xlsx`
+                                )
                             } catch (error) {
                                 alert('Eroare la export: ' + (error.response?.data?.detail || error.message))
                             }
@@ -2,6 +2,7 @@ import { useState, useEffect, useRef, useMemo, useCallback } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { useAuthStore } from '../../store/authStore'
 import api from '../../lib/api'
+import { openLiveStream } from '../../lib/liveStream'
 import {
     Clock, Play, Square, Coffee, MapPin, Loader2, Timer, Calendar,
     ClipboardList, Plus, Trash2, CheckCircle, CheckCircle2, AlertCircle, ShieldAlert,
@@ -42,6 +43,29 @@ const userIcon = new L.Icon({
     shadowSize: [41, 41]
 })
 
+// Offline GPS fix queue — fixes taken while the network is down are kept
+// here and replayed through /timesheets/location-ping/batch when it returns
+const PING_QUEUE_KEY = 'pending-location-pings'
+const PING_QUEUE_MAX = 2880 // 24h of 30s pings
+
+function loadPingQueue() {
+    try {
+        return JSON.parse(localStorage.getItem(PING_QUEUE_KEY)) || []
+    } catch (e) {
+        return []
+    }
+}
+
+function savePingQueue(queue) {
+    try {
+        if (queue.length) {
+            localStorage.setItem(PING_QUEUE_KEY, JSON.stringify(queue.slice(-PING_QUEUE_MAX)))
+        } else {
+            localStorage.removeItem(PING_QUEUE_KEY)
+        }
+    } catch (e) { }
+}
+
 // Component to auto-fit map bounds
 function MapAutoFit({ userPos, sitePos }) {
     const map = useMap()
@@ -94,6 +118,7 @@ export default function ClockInPage() {
     const [clockOutResult, setClockOutResult] = useState(null)
     const [errorMessage, setErrorMessage] = useState(null)
     const [breakMessage, setBreakMessage] = useState(null)
+    const [shiftNotice, setShiftNotice] = useState(null) // pushed: schedule end, long break, auto clock-out
     const [activeTab, setActiveTab] = useState('pontaj')
     const [teamInfo, setTeamInfo] = useState(null)
     const [geofencePing, setGeofencePing] = useState(null) // latest ping response
@@ -123,6 +148,8 @@ export default function ClockInPage() {
     }
 
     const timerInterval = useRef(null)
+    const streamLive = useRef(false) // shift stream connected: pushes replace re-fetching
+    const shiftTimesheetId = useRef(null)
 
     // Auto-dismiss error message after 5 seconds
     useEffect(() => {
@@ -131,6 +158,25 @@ export default function ClockInPage() {
         return () => clearTimeout(timeout)
     }, [errorMessage])
 
+    useEffect(() => {
+        if (!shiftNotice) return
+        const timeout = setTimeout(() => setShiftNotice(null), 10000)
+        return () => clearTimeout(timeout)
+    }, [shiftNotice])
+
+    // Shift push channel: state on every transition (clock-in/out, breaks,
+    // geofence, auto clock-out) plus scheduled notices; timers tick locally
+    useEffect(() => {
+        if (!accessToken) return
+        return openLiveStream('/timesheets/active-shift/stream', accessToken, {
+            shift: (data) => applyActiveShift(data, data?.timesheet_id !== shiftTimesheetId.current),
+            notice: (notice) => {
+                // Geofence changes already show from the ping response
+                if (!notice.type.startsWith('geofence')) setShiftNotice(notice.message)
+            },
+        }, (up) => { streamLive.current = up })
+    }, [accessToken])
+
     // Auto-refresh user data (for avatar_path etc.)
     useEffect(() => {
         api.get('/auth/me')
@@ -278,23 +324,43 @@ export default function ClockInPage() {
         }
 
         const sendPing = async () => {
+            const fix = {
+                latitude: location.latitude,
+                longitude: location.longitude,
+                recorded_at: new Date().toISOString()
+            }
+            const queue = loadPingQueue()
             try {
-                const res = await api.post('/timesheets/location-ping', {
-                    latitude: location.latitude,
-                    longitude: location.longitude
-                })
+                let res
+                if (queue.length) {
+                    // Back online — replay buffered fixes plus this one in order
+                    res = await api.post('/timesheets/location-ping/batch', {
+                        fixes: [...queue, fix].slice(-PING_QUEUE_MAX)
+                    })
+                    savePingQueue([])
+                } else {
+                    res = await api.post('/timesheets/location-ping', {
+                        latitude: fix.latitude,
+                        longitude: fix.longitude
+                    })
+                }
                 const data = res.data
                 if (data.geofence_applicable) {
                     setGeofencePing(data)
                     if (data.total_geofence_pause_seconds !== undefined) {
                         setGeofencePauseTime(data.total_geofence_pause_seconds)
                     }
-                    // Refresh shift data if status changed
-                    if (data.status_changed) {
+                    // Refresh shift data if status changed (the stream pushes it when connected)
+                    if (data.status_changed && !streamLive.current) {
                         fetchActiveShift()
                     }
                 }
-            } catch (e) { /* silently fail */ }
+            } catch (e) {
+                // No response at all (dead zone) — keep the fix for later replay
+                if (!e.response) {
+                    savePingQueue([...queue, fix])
+                }
+            }
         }
 
         // Send immediately, then every 30s
@@ -303,20 +369,25 @@ export default function ClockInPage() {
         return () => clearInterval(interval)
     }, [activeShift?.segment_id, location?.latitude, location?.longitude])
 
+    const applyActiveShift = async (shift, refreshActivities = true) => {
+        setActiveShift(shift)
+        if (shift?.timesheet_id) {
+            if (refreshActivities) await fetchAddedActivities(shift.timesheet_id)
+            setHadPreviousShift(false)
+        } else {
+            // No active shift — check if had completed shifts today
+            try {
+                const histRes = await api.get('/timesheets/my-today')
+                setHadPreviousShift(histRes.data?.has_completed_segments || false)
+            } catch { setHadPreviousShift(false) }
+        }
+        shiftTimesheetId.current = shift?.timesheet_id || null
+    }
+
     const fetchActiveShift = async () => {
         try {
             const response = await api.get('/timesheets/active-shift')
-            setActiveShift(response.data)
-            if (response.data?.timesheet_id) {
-                await fetchAddedActivities(response.data.timesheet_id)
-                setHadPreviousShift(false)
-            } else {
-                // No active shift — check if had completed shifts today
-                try {
-                    const histRes = await api.get('/timesheets/my-today')
-                    setHadPreviousShift(histRes.data?.has_completed_segments || false)
-                } catch { setHadPreviousShift(false) }
-            }
+            await applyActiveShift(response.data)
             return response.data
         } catch (error) {
             console.error('Error fetching active shift:', error)
@@ -334,6 +405,18 @@ export default function ClockInPage() {
         }
     }
 
+    // Once GPS is known, narrow the list to the closest sites (nearest first)
+    const nearbyFetched = useRef(false)
+    useEffect(() => {
+        if (!location || nearbyFetched.current) return
+        nearbyFetched.current = true
+        api.get('/sites/nearby', { params: { lat: location.latitude, lon: location.longitude, limit: 20 } })
+            .then(res => {
+                if (res.data?.length) setSites(res.data)
+            })
+            .catch(() => { })
+    }, [location])
+
     const fetchActivities = async () => {
         try {
             const response = await api.get('/activities/')
@@ -601,6 +684,24 @@ export default function ClockInPage() {
                 </div>
             )}
 
+            {/* Pushed shift notice (schedule end, long break, auto clock-out) */}
+            {shiftNotice && !errorMessage && (
+                <div className="fixed top-4 left-1/2 -translate-x-1/2 z-[9999] max-w-sm w-[90%] animate-[slideDown_0.3s_ease-out]">
+                    <div className="bg-amber-500 text-white rounded-2xl shadow-2xl px-5 py-4 flex items-start gap-3">
+                        <Clock className="w-5 h-5 mt-0.5 flex-shrink-0" />
+                        <div className="flex-1">
+                            <p className="text-sm font-medium">{shiftNotice}</p>
+                        </div>
+                        <button
+                            onClick={() => setShiftNotice(null)}
+                            className="text-white/70 hover:text-white transition-colors ml-2 mt-0.5"
+                        >
+                            <XCircle className="w-5 h-5" />
+                        </button>
+                    </div>
+                </div>
+            )}
+
             {/* Header with Profile */}
             <div className="bg-gradient-to-r from-blue-600 to-indigo-700 text-white p-4 shadow-lg">
                 <div className="flex items-center justify-between max-w-md mx-auto">
@@ -1135,7 +1236,7 @@ export default function ClockInPage() {
                                     <option value="">Alege șantier...</option>
                                     {sites.map((site) => (
                                         <option key={site.id} value={site.id}>
-                                            {site.name}
+                                            {site.name}{site.distance_m != null ? ` (${site.distance_m < 1000 ? `${Math.round(site.distance_m)}m` : `${(site.distance_m / 1000).toFixed(1)}km`})` : ''}
                                         </option>
                                     ))}
                                 </select>
@@ -11,7 +11,7 @@ echo ""
 
 # Backend
 echo "📦 Pornesc backend (port 6001)..."
-(cd "$ROOT/backend" && python3 -m uvicorn main:app --host 0.0.0.0 --port 6001 --reload) &
+(cd "$ROOT/backend" && python3 migrate.py && python3 -m uvicorn main:app --host 0.0.0.0 --port 6001 --reload) &
 BACKEND_PID=$!
 sleep 3
 